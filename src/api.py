@@ -1,28 +1,32 @@
 """API FastAPI - Endpoints"""
 from fastapi import FastAPI, HTTPException, status, Depends, Request
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from src.schemas import PedidoLAIInput, DeteccaoResponse, StatusResponse
 from src.workers import task_detectar_pii
-from src.database import engine
-from src.models import Base
+from src.database import engine, aplicar_migracoes, get_db
+from src.models import Base, PedidoProcessado
 from src.iam.iam_man import get_current_user
 from src.audit import router as audit_router
+from src.status_store import StatusStore, calcular_etag
+from src.queue_metrics import classe_do_pedido, FILAS_POR_CLASSE, CABECALHO_CLASSE
+from src import metrics, tracing
+from src.metrics import STATUS_ESCRITA, cronometrar
 from uuid import uuid4, UUID
 from datetime import datetime
 from sqlalchemy import text
+from sqlalchemy.orm import Session
 import redis
 import json
 import os
+import time
 import logging
 import traceback
 import sys
 
-# Rate Limiting
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+# Rate Limiting (token bucket no Redis, por usuário IAM)
+from src.rate_limit import RateLimiter
 
 # Configuração de Logs
 logging.basicConfig(
@@ -38,6 +42,9 @@ async def lifespan(app: FastAPI):
     try:
         logger.info("🚀 INICIANDO API - Verificando Banco de Dados...")
         Base.metadata.create_all(bind=engine)
+        aplicadas = aplicar_migracoes()
+        if aplicadas:
+            logger.info(f"🗄️ Migrações aplicadas: {', '.join(aplicadas)}")
         logger.info("✅ Tabelas verificadas/criadas com sucesso!")
     except Exception as e:
         logger.error(f"❌ ERRO CRÍTICO ao conectar no Banco: {e}")
@@ -75,7 +82,7 @@ app = FastAPI(
     
     ### 🔒 Segurança
     *   Autenticação via Bearer Token (IAM).
-    *   Rate Limiting por IP.
+    *   Rate Limiting por usuário (token bucket no Redis, com tiers por perfil).
     *   Dados sensíveis nunca são persistidos em texto claro.
     
     ### 📚 Documentação
@@ -96,9 +103,7 @@ app = FastAPI(
 )
 
 # Configuração Limiter
-limiter = Limiter(key_func=get_remote_address)
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+limite_deteccao = RateLimiter('detectar-pii')
 
 app.add_middleware(
     CORSMiddleware,
@@ -110,11 +115,15 @@ app.add_middleware(
 
 app.include_router(audit_router)
 
+# Rastreamento distribuído (opcional, SIGILO_TRACING_EXPORTER): o contexto segue nos cabeçalhos do Celery
+tracing.configurar('sigilo-api', app=app, engine=engine)
+
 # Conexão Redis
 try:
     redis_url = os.getenv('REDIS_URL', 'redis://sigilo-redis:6379/0')
     logger.info(f"🔌 Conectando ao Redis (Cache): {redis_url}")
     redis_client = redis.from_url(redis_url)
+    status_store = StatusStore(redis_client)
     redis_client.ping()
     logger.info("✅ Conexão Redis OK!")
 except Exception as e:
@@ -144,34 +153,31 @@ async def dashboard():
     summary="Enviar pedido para análise",
     description="Recebe um texto de pedido LAI, enfileira para processamento assíncrono e retorna um ID para acompanhamento."
 )
-@limiter.limit("10/minute") 
 async def detectar_pii(
     request: Request,
     pedido: PedidoLAIInput,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(limite_deteccao)
 ):
     request_id = str(uuid4())
     user_id = current_user.get('sub') or current_user.get('email') or 'unknown'
     logger.info(f"📥 [POST] Novo pedido recebido de {user_id}. ID Gerado: {request_id}")
     
+    # Interativo (cidadão) x lote (integração/backfill): filas separadas, o lote pausa com backlog interativo
+    classe = classe_do_pedido(current_user, request.headers.get(CABECALHO_CLASSE))
+    fila = FILAS_POR_CLASSE[classe]
+    tracing.marcar(origem_id=request_id, classe=classe)
+
     try:
-        logger.info(f"📤 Enviando mensagem para RabbitMQ (Fila: deteccao)...")
+        logger.info(f"📤 Enviando mensagem para RabbitMQ (Fila: {fila})...")
         task_detectar_pii.apply_async(
             args=[request_id, pedido.texto, pedido.protocolo, user_id],
-            queue='deteccao'
+            kwargs={'classe': classe, 'enfileirado_em': time.time()},
+            queue=fila
         )
         logger.info(f"✅ Mensagem enviada para RabbitMQ com sucesso!")
         
-        now = datetime.utcnow().isoformat()
-        status_inicial = {
-            'origem_id': request_id,
-            'status': 'processing',
-            'step': 'queued',
-            'progress': 0,
-            'created_at': now,
-            'updated_at': now
-        }
-        redis_client.setex(f"status:{request_id}", 3600, json.dumps(status_inicial))
+        with cronometrar(STATUS_ESCRITA, operacao='criar'):
+            status_store.criar(request_id)
         logger.info(f"💾 Status inicial salvo no Redis para ID: {request_id}")
         
         return DeteccaoResponse(
@@ -191,7 +197,7 @@ async def detectar_pii(
     response_model=StatusResponse,
     tags=["Detecção"],
     summary="Consultar status do processamento",
-    description="Retorna o estado atual do pedido. Se concluído, inclui o texto anonimizado, resumo da IA e auditoria."
+    description="Retorna o estado atual do pedido (poucos bytes). Quando concluído, o resultado fica em /resultado/{origem_id}."
 )
 async def consultar_status(
     origem_id: UUID,
@@ -200,15 +206,13 @@ async def consultar_status(
     logger.info(f"🔍 [GET] Consultando status para ID: {origem_id} (User: {current_user.get('sub')})")
     
     try:
-        status_key = f"status:{origem_id}"
-        status_data = redis_client.get(status_key)
+        data = status_store.ler(origem_id)
         
-        if not status_data:
+        if not data:
             logger.warning(f"⚠️ Status NÃO ENCONTRADO no Redis para ID: {origem_id}")
             raise HTTPException(status_code=404, detail="Processamento não encontrado")
         
         logger.info(f"✅ Status recuperado do Redis para ID: {origem_id}")
-        data = json.loads(status_data)
         
         updated_at_str = data.get('updated_at') or data.get('created_at') or datetime.utcnow().isoformat()
         
@@ -218,6 +222,7 @@ async def consultar_status(
             step=data.get('step'),
             progress=data.get('progress', 0),
             result=data.get('result'),
+            result_url=f"/resultado/{origem_id}" if data['status'] == 'completed' else None,
             error=data.get('error'),
             updated_at=datetime.fromisoformat(updated_at_str)
         )
@@ -229,6 +234,77 @@ async def consultar_status(
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+def _resultado_do_banco(db: Session, origem_id: UUID):
+    """Resultado reconstruído do PostgreSQL (quando a chave no Redis já expirou)"""
+    pedido = db.query(PedidoProcessado).filter_by(origem_id=origem_id).first()
+    if not pedido or pedido.tempo_processamento_ms is None:
+        return None
+
+    resultado = {
+        'origem_id': str(pedido.origem_id),
+        'protocolo': pedido.protocolo,
+        'texto_anonimizado': pedido.texto_anonimizado,
+        'resumo_inteligente': pedido.resumo_llm or {},
+        'estatisticas': {
+            'total_entidades': pedido.total_entidades,
+            'por_tipo': pedido.entidades_por_tipo,
+            'nivel_risco': pedido.nivel_risco
+        },
+        'processamento': {
+            'tempo_ms': pedido.tempo_processamento_ms,
+            'timestamp': pedido.processed_at.isoformat() if pedido.processed_at else None
+        },
+        'auditoria': pedido.auditoria or {}
+    }
+    corpo = json.dumps(resultado, ensure_ascii=False, sort_keys=True, default=str).encode()
+    return corpo, calcular_etag(corpo)
+
+def _etag_confere(if_none_match: str, etag: str) -> bool:
+    return if_none_match is not None and (if_none_match.strip() == '*' or etag in if_none_match)
+
+@app.get(
+    "/resultado/{origem_id}",
+    tags=["Detecção"],
+    summary="Obter resultado do processamento",
+    description="Texto anonimizado, resumo da IA e auditoria de um pedido concluído. Suporta ETag/If-None-Match (304).",
+    responses={304: {"description": "Resultado não mudou desde o ETag informado"}}
+)
+async def obter_resultado(
+    origem_id: UUID,
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    logger.info(f"📦 [GET] Resultado solicitado para ID: {origem_id} (User: {current_user.get('sub')})")
+    if_none_match = request.headers.get('if-none-match')
+
+    try:
+        # Revalidação barata: o ETag fica no hash de status, sem ler o resultado
+        if if_none_match:
+            etag = status_store.etag_resultado(origem_id)
+            if etag and _etag_confere(if_none_match, etag):
+                return Response(status_code=304, headers={'ETag': etag})
+
+        encontrado = status_store.ler_resultado(origem_id)
+        if encontrado is None:
+            logger.info(f"🐘 Resultado de {origem_id} fora do Redis. Buscando no PostgreSQL...")
+            encontrado = _resultado_do_banco(db, origem_id)
+        if encontrado is None:
+            raise HTTPException(status_code=404, detail="Resultado não encontrado ou ainda em processamento")
+
+        corpo, etag = encontrado
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if _etag_confere(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=corpo, media_type='application/json', headers=headers)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ ERRO ao obter resultado {origem_id}: {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get(
     "/health", 
     tags=["Sistema"],
@@ -248,7 +324,6 @@ async def health_check():
     
     # PostgreSQL
     try:
-        from src.database import engine
         with engine.connect() as conn:
             conn.execute(text("SELECT 1"))
         services_status['postgres'] = 'ok'
@@ -271,4 +346,18 @@ async def health_check():
         "version": "2.0.0",
         "services": services_status,
         "timestamp": datetime.utcnow().isoformat()
-    }
\ No newline at end of file
+    }
+
+@app.get(
+    "/metrics",
+    tags=["Sistema"],
+    summary="Métricas Prometheus",
+    description="Histogramas por estágio (espera nas filas, camadas do detector, banco, Ollama, status) no formato texto do Prometheus.",
+    response_class=Response
+)
+async def metricas_prometheus():
+    exportado = metrics.exportar()
+    if exportado is None:
+        raise HTTPException(status_code=503, detail="prometheus_client não instalado")
+    corpo, content_type = exportado
+    return Response(content=corpo, media_type=content_type)
@@ -5,12 +5,18 @@ from typing import List, Optional
 from src.database import get_db
 from src.models import PedidoProcessado, EntidadeDetectada
 from src.iam.iam_man import admin_required
+from src.celery_app import celery_app
+from src.queue_metrics import MetricasFila, FILAS_POR_CLASSE, profundidade_fila
 from pydantic import BaseModel, Field
 from datetime import datetime
 from uuid import UUID
+import os
+import redis
 
 router = APIRouter(prefix="/auditoria", tags=["Auditoria"])
 
+metricas_fila = MetricasFila(redis.from_url(os.getenv('REDIS_URL', 'redis://sigilo-redis:6379/0')))
+
 # Schemas de Resposta (apenas para leitura)
 class AuditoriaResumo(BaseModel):
     origem_id: UUID
@@ -26,6 +32,27 @@ class AuditoriaDetalhe(AuditoriaResumo):
     auditoria_tecnica: dict
     resumo_llm: Optional[dict]
 
+class MetricasFilaClasse(BaseModel):
+    classe: str
+    fila: str
+    profundidade: Optional[int] = Field(None, description="Mensagens prontas na fila (None se o broker não respondeu)")
+    amostras: int
+    espera_p50_s: Optional[float]
+    espera_p95_s: Optional[float]
+    espera_p99_s: Optional[float]
+    sla_s: Optional[float]
+    dentro_sla_pct: Optional[float] = Field(None, description="% das últimas amostras com espera dentro do SLA")
+
+class EstadoFila(BaseModel):
+    fila: str
+    profundidade: Optional[int] = Field(None, description="Mensagens prontas na fila (None se o broker não respondeu)")
+    idade_mais_antiga_s: float = Field(..., description="Há quanto tempo a mensagem mais antiga ainda não iniciada foi publicada")
+    amostras_servico: int
+    servico_p50_s: Optional[float]
+    servico_p95_s: Optional[float]
+    espera_estimada_s: Optional[float] = Field(None, description="Profundidade x serviço p50 / processos informados")
+    sugestao: str = Field(..., description="aumentar | manter | reduzir")
+
 @router.get(
     "/pedidos", 
     response_model=List[AuditoriaResumo],
@@ -84,4 +111,34 @@ async def detalhar_pedido(
         entidades_por_tipo=pedido.entidades_por_tipo,
         auditoria_tecnica=pedido.auditoria,
         resumo_llm=pedido.resumo_llm
-    )
\ No newline at end of file
+    )
+
+@router.get(
+    "/filas",
+    response_model=List[MetricasFilaClasse],
+    summary="Latência de fila por classe",
+    description="Profundidade e espera na fila (p50/p95/p99) das classes interativo e lote, com a aderência ao SLA interativo. Requer privilégios de administrador."
+)
+async def metricas_filas(user: dict = Depends(admin_required)):
+    return [
+        MetricasFilaClasse(
+            **metricas_fila.resumo(classe),
+            profundidade=profundidade_fila(celery_app, fila, max_idade_s=0)
+        ) for classe, fila in FILAS_POR_CLASSE.items()
+    ]
+
+@router.get(
+    "/filas/capacidade",
+    response_model=List[EstadoFila],
+    summary="Dicas de escala por fila",
+    description="Profundidade, idade da mensagem mais antiga e tempo de serviço de cada fila do Celery, com uma sugestão de escala. Requer privilégios de administrador."
+)
+async def capacidade_filas(
+    processos: Optional[int] = Query(None, description="Processos consumindo cada fila (para a espera estimada)"),
+    user: dict = Depends(admin_required)
+):
+    filas = sorted({rota['queue'] for rota in celery_app.conf.task_routes.values()} | set(FILAS_POR_CLASSE.values()))
+    return [
+        EstadoFila(**metricas_fila.estado_fila(fila, profundidade_fila(celery_app, fila, max_idade_s=0), processos))
+        for fila in filas
+    ]
@@ -0,0 +1,129 @@
+"""Autoscaler do Celery guiado pela latência das filas e pela memória disponível"""
+import os
+import time
+import logging
+import sys
+from typing import List, Optional
+
+import redis
+from celery.worker.autoscale import Autoscaler
+
+from src.queue_metrics import MetricasFila, profundidade_fila, ALVO_ESPERA_S
+
+# Configuração de Logs
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger("AUTOSCALER")
+
+# Memória estimada de cada processo do pool e a folga mínima que deve sobrar no container/host
+MB_POR_PROCESSO = float(os.getenv('SIGILO_AUTOSCALE_MB_POR_PROCESSO', '300'))
+RESERVA_MB = float(os.getenv('SIGILO_AUTOSCALE_RESERVA_MB', '256'))
+# Sinais externos (broker/Redis) são lidos no máximo uma vez por intervalo: maybe_scale roda
+# a cada mensagem recebida, no loop de eventos do worker
+INTERVALO_S = float(os.getenv('SIGILO_AUTOSCALE_INTERVALO_S', '5'))
+
+
+def _ler_numero(caminho: str) -> Optional[float]:
+    try:
+        with open(caminho) as f:
+            valor = f.read().strip()
+    except OSError:
+        return None
+    return None if valor == 'max' or not valor.isdigit() else float(valor)
+
+
+def memoria_disponivel_mb() -> Optional[float]:
+    """Memória livre para novos processos: limite do cgroup (v2/v1) se houver, senão MemAvailable"""
+    for limite, uso in (
+        ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory.current'),
+        ('/sys/fs/cgroup/memory/memory.limit_in_bytes', '/sys/fs/cgroup/memory/memory.usage_in_bytes'),
+    ):
+        total, usado = _ler_numero(limite), _ler_numero(uso)
+        # cgroup v1 sem limite reporta um valor gigante (~2^63)
+        if total is not None and usado is not None and total < 2 ** 60:
+            return (total - usado) / 1024 / 1024
+    try:
+        with open('/proc/meminfo') as f:
+            for linha in f:
+                if linha.startswith('MemAvailable:'):
+                    return float(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class AutoscalerSigilo(Autoscaler):
+    """
+    Política de --autoscale=max,min para os workers prefork (banco, llm...).
+
+    O Autoscaler padrão só olha as tarefas já reservadas pelo worker. Este também considera:
+    - latência das filas consumidas: mensagem mais antiga ou espera estimada acima do alvo
+      (SIGILO_AUTOSCALE_ALVO_S) pede mais processos, um de cada vez
+    - memória: só cresce se couber mais um processo acima da reserva; abaixo da reserva encolhe
+    Reduções respeitam o keepalive do Celery (AUTOSCALE_KEEPALIVE), exceto sob pressão de memória.
+
+    O pool de threads (worker-deteccao) não cresce/encolhe; lá a concorrência é o pool de processos.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metricas = MetricasFila(redis.from_url(os.getenv('REDIS_URL', 'redis://sigilo-redis:6379/0')))
+        self._ultima_leitura = 0.0
+        self._processos_pela_fila = 0
+
+    def _filas(self) -> List[str]:
+        if self.worker is None:
+            return []
+        return list(self.worker.app.amqp.queues.consume_from or [])
+
+    def _processos_pela_latencia(self, procs: int) -> int:
+        """Processos pedidos pelas filas (cacheado por INTERVALO_S); 0 quando a latência está no alvo"""
+        agora = time.monotonic()
+        if agora - self._ultima_leitura < INTERVALO_S:
+            return self._processos_pela_fila
+        self._ultima_leitura = agora
+
+        desejado = 0
+        try:
+            for fila in self._filas():
+                profundidade = profundidade_fila(self.worker.app, fila) or 0
+                atrasada = self.metricas.idade_mais_antiga(fila) > ALVO_ESPERA_S
+                necessarios = self.metricas.processos_para_alvo(fila, profundidade) or 0
+                if atrasada or necessarios > procs:
+                    desejado = max(desejado, procs + 1)
+        except Exception as e:
+            logger.warning(f"⚠️ Autoscaler sem métricas de fila: {e}")
+        self._processos_pela_fila = desejado
+        return desejado
+
+    def _alvo(self, procs: int):
+        """(processos desejados, memória abaixo da reserva?)"""
+        alvo = max(self.qty, self._processos_pela_latencia(procs), self.min_concurrency)
+
+        livre = memoria_disponivel_mb()
+        sem_memoria = livre is not None and livre < RESERVA_MB
+        if sem_memoria:
+            alvo = min(alvo, procs - 1)
+        elif livre is not None and livre < RESERVA_MB + MB_POR_PROCESSO:
+            alvo = min(alvo, procs)
+
+        return max(self.min_concurrency, min(alvo, self.max_concurrency)), sem_memoria
+
+    def _maybe_scale(self, req=None):
+        procs = self.processes
+        alvo, sem_memoria = self._alvo(procs)
+        if alvo > procs:
+            logger.info(f"📈 Autoscaler: {procs} -> {alvo} processos (reservadas={self.qty})")
+            self.scale_up(alvo - procs)
+            return True
+        if alvo < procs:
+            if sem_memoria:
+                # Pressão de memória não espera o keepalive
+                logger.warning(f"⚠️ Autoscaler: memória abaixo da reserva, {procs} -> {alvo} processos")
+                self._shrink(procs - alvo)
+            else:
+                self.scale_down(procs - alvo)
+            return True
@@ -0,0 +1,125 @@
+"""Circuit breaker compartilhado entre processos (estado no Redis)"""
+import time
+import logging
+import sys
+
+# Configuração de Logs
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger("CIRCUIT_BREAKER")
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker com estado compartilhado no Redis.
+
+    Estados:
+    1. Fechado - chamadas liberadas; sucessos/falhas contados em janelas de tempo
+    2. Aberto - chamadas bloqueadas (fail fast) até expirar `tempo_aberto_s`
+    3. Meio-aberto - apenas UMA chamada de sonda por vez; sucesso fecha, falha reabre
+
+    Chamadas mais lentas que `latencia_max_s` contam como falha, mesmo com resposta.
+    Se o Redis estiver indisponível, o breaker não bloqueia nada (fail open).
+    """
+
+    def __init__(
+        self,
+        nome: str,
+        redis_client,
+        limiar_falhas: float = 0.5,
+        minimo_chamadas: int = 5,
+        janela_s: int = 60,
+        latencia_max_s: float = 10.0,
+        tempo_aberto_s: int = 30,
+    ):
+        self.nome = nome
+        self.redis = redis_client
+        self.limiar_falhas = limiar_falhas
+        self.minimo_chamadas = minimo_chamadas
+        self.janela_s = janela_s
+        self.latencia_max_s = latencia_max_s
+        self.tempo_aberto_s = tempo_aberto_s
+
+        self._chave_aberto = f"cb:{nome}:aberto"
+        self._chave_meio_aberto = f"cb:{nome}:meio_aberto"
+        self._chave_sonda = f"cb:{nome}:sonda"
+
+    def _chave_janela(self) -> str:
+        return f"cb:{self.nome}:janela:{int(time.time() // self.janela_s)}"
+
+    def esta_aberto(self) -> bool:
+        """Consulta (sem efeitos colaterais) se o circuito está bloqueando chamadas"""
+        try:
+            return bool(self.redis.exists(self._chave_aberto))
+        except Exception as e:
+            logger.warning(f"⚠️ Redis indisponível para o breaker '{self.nome}': {e}")
+            return False
+
+    def permitir(self) -> bool:
+        """Decide se a chamada pode seguir. No meio-aberto, reserva a sonda."""
+        try:
+            if self.redis.exists(self._chave_aberto):
+                return False
+            if self.redis.exists(self._chave_meio_aberto):
+                # Apenas um processo faz a sonda; os demais continuam em fail fast
+                sonda = self.redis.set(self._chave_sonda, 1, nx=True, ex=max(int(self.latencia_max_s * 3), 1))
+                if sonda:
+                    logger.info(f"🔎 Breaker '{self.nome}' MEIO-ABERTO: enviando sonda de recuperação")
+                return bool(sonda)
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Redis indisponível para o breaker '{self.nome}': {e}")
+            return True
+
+    def registrar_sucesso(self, latencia_s: float):
+        """Registra uma chamada concluída. Chamadas lentas contam como falha."""
+        if latencia_s > self.latencia_max_s:
+            logger.warning(f"🐢 Chamada lenta em '{self.nome}' ({latencia_s:.1f}s) contada como falha")
+            self.registrar_falha()
+            return
+
+        try:
+            if self.redis.exists(self._chave_meio_aberto):
+                logger.info(f"✅ Breaker '{self.nome}' FECHADO: sonda bem-sucedida")
+                self.redis.delete(self._chave_meio_aberto, self._chave_sonda, self._chave_janela())
+                return
+
+            pipe = self.redis.pipeline()
+            chave = self._chave_janela()
+            pipe.hincrby(chave, 'total', 1)
+            pipe.expire(chave, self.janela_s * 2)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao registrar sucesso no breaker '{self.nome}': {e}")
+
+    def registrar_falha(self):
+        """Registra uma falha e abre o circuito se o limiar for atingido"""
+        try:
+            if self.redis.exists(self._chave_meio_aberto):
+                logger.warning(f"⚡ Breaker '{self.nome}' REABERTO: sonda falhou")
+                self._abrir()
+                return
+
+            pipe = self.redis.pipeline()
+            chave = self._chave_janela()
+            pipe.hincrby(chave, 'total', 1)
+            pipe.hincrby(chave, 'falhas', 1)
+            pipe.expire(chave, self.janela_s * 2)
+            total, falhas, _ = pipe.execute()
+
+            if total >= self.minimo_chamadas and falhas / total >= self.limiar_falhas:
+                logger.warning(f"⚡ Breaker '{self.nome}' ABERTO: {falhas}/{total} falhas na janela")
+                self._abrir()
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao registrar falha no breaker '{self.nome}': {e}")
+
+    def _abrir(self):
+        pipe = self.redis.pipeline()
+        pipe.set(self._chave_aberto, 1, ex=self.tempo_aberto_s)
+        # Após o tempo aberto, o circuito fica meio-aberto até uma sonda decidir
+        pipe.set(self._chave_meio_aberto, 1, ex=self.tempo_aberto_s + 86400)
+        pipe.delete(self._chave_sonda, self._chave_janela())
+        pipe.execute()
@@ -1,9 +1,15 @@
 """Detector de PII com 3 camadas - Versão Robusta"""
 import re
+import os
+import time
 import logging
 import sys
 import hashlib
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from src.recognizers.registry import PatternRegistry
+from src.spans import Span
+from src import tracing
+from typing import List, Dict, Any, Optional, Set, Tuple
 
 # Configuração de Logs
 logging.basicConfig(
@@ -13,15 +19,51 @@ logging.basicConfig(
 )
 logger = logging.getLogger("DETECTOR")
 
+# Palavras funcionais mais frequentes por idioma (identificação barata de idioma)
+STOPWORDS_IDIOMA = {
+    'pt': frozenset(
+        'de a o que e do da em um para é com não uma os no se na por mais as dos como mas foi ao '
+        'ele das tem à seu sua ou ser quando muito há nos já está eu também só pelo pela até isso '
+        'ela entre era depois sem mesmo aos ter seus quem nas me esse eles estão você essa num nem '
+        'suas meu às minha numa pelos elas seja qual será nós tenho lhe deles essas esses pelas '
+        'este dele sobre solicito informações pedido'.split()
+    ),
+    'en': frozenset(
+        'the of and to in is that it for was on are as with be by at this have from or an they '
+        'which you one had not but what all were when we there can your has more if will their '
+        'would so about out up into than them may its only our other these some her him his my '
+        'please request information'.split()
+    ),
+    'es': frozenset(
+        'el la de que y en los del se las por un para con no una su al lo como más pero sus le ya '
+        'o este sí porque esta entre cuando muy sin sobre también me hasta hay donde quien desde '
+        'todo nos durante todos uno les ni contra otros ese eso ante ellos solicito información'.split()
+    ),
+}
+PALAVRA_RE = re.compile(r'[a-zà-ÿ]+')
+
+# Sequências de 2+ palavras capitalizadas (candidatas a nome próprio para o GLiNER)
+NOME_CANDIDATO_RE = re.compile(r'\b[A-ZÀ-Ú][a-zà-ú]+(?:\s+(?:d[aeo]s?\s+)?[A-ZÀ-Ú][a-zà-ú]+)+')
+SENTENCA_RE = re.compile(r'[^.!?\n]+[.!?]?')
+
+# Rótulos do GLiNER -> tipos do SIGILO
+GLINER_LABELS = {
+    'person': 'PESSOA',
+    'address': 'ENDERECO',
+    'phone number': 'TELEFONE',
+    'email': 'EMAIL',
+}
+
 
 class PIIDetectorLAI:
     """
     Detector de PII (Personally Identifiable Information) para pedidos LAI.
 
-    Usa 3 camadas de detecção:
+    Usa 4 camadas de detecção:
     1. Presidio Analyzer (Microsoft) - quando disponível
     2. Regex patterns para formatos brasileiros
     3. Detecção contextual de nomes
+    4. GLiNER - opcional, só quando sobram nomes capitalizados não resolvidos
     """
 
     def __init__(self):
@@ -30,6 +72,7 @@ class PIIDetectorLAI:
         self.presidio_available = False
         self.analyzer = None
         self.anonymizer = None
+        self.idiomas_nlp: List[str] = []
 
         # Tentar inicializar Presidio (pode falhar se spaCy não estiver instalado)
         try:
@@ -40,106 +83,97 @@ class PIIDetectorLAI:
             logger.warning(f"⚠️ Presidio não disponível: {e}")
             logger.info("📋 Usando modo REGEX-ONLY (funcional)")
 
-        # Padrões Regex para dados brasileiros (ORDEM IMPORTA - mais específicos primeiro)
-        self.regex_patterns = {
-            # Cartão de crédito: 4 grupos de 4 dígitos (PRIMEIRO - mais específico)
-            'CARTAO_CREDITO': r'\b\d{4}[\s.-]\d{4}[\s.-]\d{4}[\s.-]\d{4}\b',
-            # CPF: 123.456.789-00 (com formatação) ou 12345678900 (11 dígitos)
-            'CPF': r'\b\d{3}\.\d{3}\.\d{3}-\d{2}\b|\b\d{11}\b',
-            # CNPJ: 12.345.678/0001-99 ou 12345678000199 (14 dígitos)
-            'CNPJ': r'\b\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}\b|\b\d{14}\b',
-            # Email
-            'EMAIL': r'\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b',
-            # Telefone: com DDD obrigatório ou 8-9 dígitos com separador
-            # Captura prefixo +55 e parênteses do DDD corretamente
-            'TELEFONE': r'(?:\+55\s?)?\(?\d{2}\)?[\s.-]?\d{4,5}[\s.-]?\d{4}(?!\d)|\b\d{4,5}[\s.-]\d{4}\b|\b\d{10,11}\b',
-            # RG: APENAS com formatação (XX.XXX.XXX-X)
-            'RG': r'\b\d{1,2}\.\d{3}\.\d{3}-[\dxX]\b',
-            # CEP: 12345-678 (com hífen obrigatório para evitar conflito)
-            'CEP': r'\b\d{5}-\d{3}\b',
-            # Data de nascimento: 01/01/1990 ou 01-01-1990
-            'DATA_NASCIMENTO': r'\b\d{2}[/-]\d{2}[/-]\d{4}\b',
-            # PIS/PASEP: 123.45678.90-1 (com formatação)
-            'PIS_PASEP': r'\b\d{3}\.\d{5}\.\d{2}-\d\b',
-            # Título de eleitor: 12 dígitos com espaços
-            'TITULO_ELEITOR': r'\b\d{4}\s\d{4}\s\d{4}\b',
-            # Placa de veículo: ABC-1234 ou ABC1D23
-            'PLACA_VEICULO': r'\b[A-Z]{3}-?\d[A-Z\d]\d{2}\b',
-        }
-
-        # Padrões contextuais para detectar nomes
-        self.nome_patterns = [
-            # "meu nome é X" / "me chamo X" / "sou X"
-            r'(?:meu\s+nome\s+[eé]\s*|me\s+chamo\s*|sou\s+o?\s*)([A-ZÀ-Ú][a-zà-ú]+(?:\s+[A-ZÀ-Ú][a-zà-ú]+)*)',
-            # "nome: X" / "nome X"
-            r'(?:nome\s*[:=]\s*)([A-ZÀ-Ú][a-zà-ú]+(?:\s+[A-ZÀ-Ú][a-zà-ú]+)*)',
-            # "requerente: X" / "solicitante: X"
-            r'(?:requerente|solicitante|cidadão|cidadã|servidor|servidora)\s*[:=]?\s*([A-ZÀ-Ú][a-zà-ú]+(?:\s+[A-ZÀ-Ú][a-zà-ú]+)*)',
-            # "Sr./Sra. X" / "senhor/senhora X"
-            r'(?:sr\.?a?|sra\.?|senhor|senhora)\s+([A-ZÀ-Ú][a-zà-ú]+(?:\s+[A-ZÀ-Ú][a-zà-ú]+)*)',
-            # "assinado por X" / "assinatura de X"
-            r'(?:assinado\s+por|assinatura\s+de)\s+([A-ZÀ-Ú][a-zà-ú]+(?:\s+[A-ZÀ-Ú][a-zà-ú]+)*)',
-        ]
-
-        # Padrões contextuais para endereços
-        self.endereco_patterns = [
-            # "rua X, nº Y" / "avenida X"
-            r'(?:rua|av\.?|avenida|alameda|travessa|praça)\s+[A-ZÀ-Úa-zà-ú\s]+,?\s*(?:n[ºo°]?\s*\d+)?',
-            # "endereço: X"
-            r'(?:endereço|endereco|resid[êe]ncia)\s*[:=]\s*[A-ZÀ-Úa-zà-ú0-9\s,.-]+',
-            # "mora em X" / "residente em X"
-            r'(?:mora\s+em|residente\s+em|reside\s+em)\s+[A-ZÀ-Úa-zà-ú\s]+',
-        ]
+        # Textos longos são processados em janelas sobrepostas
+        self.chunk_tamanho = int(os.getenv('SIGILO_CHUNK_TAMANHO', '8000'))
+        self.chunk_sobreposicao = min(int(os.getenv('SIGILO_CHUNK_SOBREPOSICAO', '300')), self.chunk_tamanho // 4)
+        self.chunk_workers = int(os.getenv('SIGILO_CHUNK_WORKERS', '1'))
+        self._chunk_executor = None
+        # Distribuidor externo de chunks (ex: pool de processos do DetectionExecutor)
+        self.chunk_mapper = None
+
+        # GLiNER é opcional (SIGILO_GLINER_MODEL vazio = desativado)
+        self.gliner = None
+        self.gliner_available = False
+        if os.getenv('SIGILO_GLINER_MODEL'):
+            try:
+                self._init_gliner()
+                self.gliner_available = True
+                logger.info("✅ GLiNER inicializado com sucesso!")
+            except Exception as e:
+                logger.warning(f"⚠️ GLiNER não disponível: {e}")
 
-        # Padrões contextuais para telefone (quando tem palavra-chave + número)
-        self.telefone_contextual_patterns = [
-            # "telefone: 12345678" / "tel: 12345678"
-            r'(?:telefone|tel\.?|fone|celular|whatsapp?|zap)\s*[:=]?\s*(\d{8,11})',
-            # "numero 12345678" / "nº 12345678" (quando claramente é telefone pelo contexto)
-            r'(?:n[úu]mero|n[ºo])\s*[:=]?\s*(\d{8,11})',
-        ]
+        # Padrões regex (documentos, nomes, endereços, telefones) vêm de pacotes
+        # configuráveis, compilados uma única vez aqui
+        self.patterns = PatternRegistry()
 
         logger.info("✅ Detector pronto!")
 
     def _init_presidio(self):
-        """Inicializa o Presidio Analyzer com spaCy"""
+        """
+        Inicializa o Presidio Analyzer com os modelos spaCy configurados.
+
+        O modelo é explícito (SIGILO_SPACY_MODELS, formato "lang:modelo,..."): se não
+        estiver instalado, o Presidio fica indisponível em vez de cair em outro modelo.
+        Componentes que o Presidio não usa (SIGILO_SPACY_EXCLUDE) nem são carregados.
+        """
+        import spacy
         from presidio_analyzer import AnalyzerEngine, RecognizerRegistry
-        from presidio_analyzer.nlp_engine import NlpEngineProvider
+        from presidio_analyzer.nlp_engine import SpacyNlpEngine
         from presidio_anonymizer import AnonymizerEngine
 
-        # Tenta múltiplos modelos spaCy em ordem de preferência
-        models_to_try = [
-            ("en_core_web_lg", "en"),
-            ("en_core_web_md", "en"),
-            ("en_core_web_sm", "en"),
-            ("pt_core_news_lg", "pt"),
-            ("pt_core_news_md", "pt"),
-            ("pt_core_news_sm", "pt"),
-        ]
+        modelos = []
+        for item in os.getenv('SIGILO_SPACY_MODELS', 'en:en_core_web_lg').split(','):
+            if item.strip():
+                lang, model_name = item.strip().split(':', 1)
+                modelos.append((lang.strip(), model_name.strip()))
 
-        nlp_engine = None
-        for model_name, lang in models_to_try:
-            try:
-                configuration = {
-                    "nlp_engine_name": "spacy",
-                    "models": [{"lang_code": lang, "model_name": model_name}]
-                }
-                provider = NlpEngineProvider(nlp_configuration=configuration)
-                nlp_engine = provider.create_engine()
-                logger.info(f"   📦 Usando modelo spaCy: {model_name}")
-                break
-            except Exception:
-                continue
+        excluir = [
+            c.strip()
+            for c in os.getenv('SIGILO_SPACY_EXCLUDE', 'parser').split(',')
+            if c.strip()
+        ]
 
-        if nlp_engine is None:
-            raise RuntimeError("Nenhum modelo spaCy disponível")
+        nlp_engine = SpacyNlpEngine(models=[{"lang_code": lang, "model_name": m} for lang, m in modelos])
+        # Carrega direto (em vez de nlp_engine.load()) para aplicar o exclude e
+        # evitar o download automático de modelos ausentes feito pelo Presidio
+        nlp_engine.nlp = {}
+        for lang, model_name in modelos:
+            inicio = time.perf_counter()
+            nlp_engine.nlp[lang] = spacy.load(model_name, exclude=excluir)
+            logger.info(
+                f"   📦 spaCy '{model_name}' ({lang}) carregado em {(time.perf_counter() - inicio) * 1000:.0f}ms "
+                f"- pipeline: {nlp_engine.nlp[lang].pipe_names}"
+            )
+            # O reforço de score por palavras de contexto do Presidio (LemmaContextAwareEnhancer) compara lemas;
+            # o lematizador por regras depende das classes gramaticais do tagger/attribute_ruler
+            if not any('lemmatizer' in c for c in nlp_engine.nlp[lang].pipe_names):
+                logger.warning(
+                    f"⚠️ spaCy '{model_name}' sem lematizador: o reforço por contexto do Presidio fica desligado"
+                )
 
-        registry = RecognizerRegistry()
-        registry.load_predefined_recognizers(nlp_engine=nlp_engine)
+        # Registry e analyzer apenas com os idiomas realmente carregados (o primeiro é o padrão)
+        idiomas = [lang for lang, _ in modelos]
+        registry = RecognizerRegistry(supported_languages=idiomas)
+        registry.load_predefined_recognizers(languages=idiomas, nlp_engine=nlp_engine)
 
-        self.analyzer = AnalyzerEngine(nlp_engine=nlp_engine, registry=registry)
+        self.analyzer = AnalyzerEngine(nlp_engine=nlp_engine, registry=registry, supported_languages=idiomas)
+        self.idiomas_nlp = idiomas
         self.anonymizer = AnonymizerEngine()
 
+    def _init_gliner(self):
+        """Carrega o modelo GLiNER em CPU com número de threads configurável"""
+        import torch
+        from gliner import GLiNER
+
+        torch.set_num_threads(int(os.getenv('SIGILO_GLINER_THREADS', '2')))
+        self.gliner_batch = int(os.getenv('SIGILO_GLINER_BATCH', '8'))
+        self.gliner_threshold = float(os.getenv('SIGILO_GLINER_THRESHOLD', '0.5'))
+
+        inicio = time.perf_counter()
+        self.gliner = GLiNER.from_pretrained(os.getenv('SIGILO_GLINER_MODEL'))
+        self.gliner.eval()
+        logger.info(f"   📦 GLiNER carregado em {(time.perf_counter() - inicio) * 1000:.0f}ms")
+
     def _registrar_falha_critica(self, texto: str, erro: Exception):
         """Registra falha crítica sem expor PII"""
         try:
@@ -148,67 +182,90 @@ class PIIDetectorLAI:
         except Exception as e:
             logger.critical(f"🚨 FALHA CRÍTICA (Erro ao gerar hash): {e}")
 
-    def _detect_with_presidio(self, text: str) -> List[Dict[str, Any]]:
-        """Detecta entidades usando Presidio"""
+    def _identificar_idioma(self, text: str) -> str:
+        """
+        Escolhe, entre os idiomas carregados no Presidio, o de mais palavras funcionais
+        no início do texto. Empate (ou nenhuma pista) fica com o idioma padrão.
+        """
+        if len(self.idiomas_nlp) == 1:
+            return self.idiomas_nlp[0]
+
+        contagem = dict.fromkeys(self.idiomas_nlp, 0)
+        for palavra in PALAVRA_RE.findall(text[:2000].lower()):
+            for lang in self.idiomas_nlp:
+                if palavra in STOPWORDS_IDIOMA.get(lang, ()):
+                    contagem[lang] += 1
+
+        return max(self.idiomas_nlp, key=lambda lang: contagem[lang])
+
+    def _detect_with_presidio(self, text: str) -> List[Span]:
+        """Detecta entidades usando Presidio (uma única passada, no idioma identificado)"""
         entities = []
 
         if not self.presidio_available or self.analyzer is None:
             return entities
 
         try:
-            # Tenta português primeiro, depois inglês
-            results = self.analyzer.analyze(text=text, language='pt')
-            if not results:
-                results = self.analyzer.analyze(text=text, language='en')
+            language = self._identificar_idioma(text)
+            results = self.analyzer.analyze(text=text, language=language)
 
             for res in results:
-                entities.append({
-                    'type': res.entity_type,
-                    'value': text[res.start:res.end],
-                    'start': res.start,
-                    'end': res.end,
-                    'confidence': res.score,
-                    'method': 'presidio'
-                })
+                entities.append(Span(res.entity_type, text[res.start:res.end], res.start, res.end, res.score, 'presidio'))
 
-            logger.info(f"   - Presidio encontrou {len(entities)} entidades.")
+            logger.info(f"   - Presidio ({language}) encontrou {len(entities)} entidades.")
 
         except Exception as e:
             logger.warning(f"⚠️ Erro no Presidio: {e}")
 
         return entities
 
-    def _detect_with_regex(self, text: str, existing_entities: List[Dict]) -> List[Dict[str, Any]]:
+    def _detect_with_regex(self, text: str, existing_entities: List[Span], ativos: Optional[Set] = None) -> List[Span]:
         """Detecta entidades usando Regex"""
         entities = []
 
-        for label, pattern in self.regex_patterns.items():
-            for match in re.finditer(pattern, text, re.IGNORECASE):
+        if ativos is None:
+            ativos = self.patterns.ativos(text)
+
+        for rec in self.patterns.familia('regex'):
+            if rec not in ativos:
+                continue
+            inicio = time.perf_counter_ns()
+            hits = 0
+            for match in rec.regex.finditer(text):
+                start, end = match.span(rec.grupo)
                 # Evita duplicatas (se Presidio já pegou na mesma posição)
                 is_duplicate = any(
-                    e['start'] <= match.start() and e['end'] >= match.end()
+                    e.start <= start and e.end >= end
                     for e in existing_entities + entities
                 )
-                if not is_duplicate:
-                    entities.append({
-                        'type': label,
-                        'value': match.group(),
-                        'start': match.start(),
-                        'end': match.end(),
-                        'confidence': 0.95,
-                        'method': 'regex'
-                    })
+                if is_duplicate:
+                    continue
+
+                valor = match.group(rec.grupo)
+                # Dígito verificador (CPF, CNPJ, cartão...): ajusta confiança ou descarta
+                confianca = rec.confianca_para(text, start, valor)
+                if confianca is not None:
+                    hits += 1
+                    entities.append(Span(rec.entidade, valor, start, end, confianca, 'regex'))
+            rec.registrar(hits, time.perf_counter_ns() - inicio)
 
         logger.info(f"   - Regex encontrou {len(entities)} novas entidades.")
         return entities
 
-    def _detect_names_contextual(self, text: str, existing_entities: List[Dict]) -> List[Dict[str, Any]]:
+    def _detect_names_contextual(self, text: str, existing_entities: List[Span], ativos: Optional[Set] = None) -> List[Span]:
         """Detecta nomes usando padrões contextuais"""
         entities = []
 
-        for pattern in self.nome_patterns:
-            for match in re.finditer(pattern, text, re.IGNORECASE | re.UNICODE):
-                nome = match.group(1).strip() if match.groups() else match.group().strip()
+        if ativos is None:
+            ativos = self.patterns.ativos(text)
+
+        for rec in self.patterns.familia('nome'):
+            if rec not in ativos:
+                continue
+            inicio = time.perf_counter_ns()
+            hits = 0
+            for match in rec.regex.finditer(text):
+                nome = match.group(rec.grupo).strip() if match.groups() else match.group().strip()
 
                 # Ignora nomes muito curtos (provavelmente falsos positivos)
                 if len(nome) < 3:
@@ -222,56 +279,60 @@ class PIIDetectorLAI:
 
                 # Evita duplicatas
                 is_duplicate = any(
-                    e['start'] <= nome_start and e['end'] >= nome_end
+                    e.start <= nome_start and e.end >= nome_end
                     for e in existing_entities + entities
                 )
                 if not is_duplicate:
-                    entities.append({
-                        'type': 'PESSOA',
-                        'value': nome,
-                        'start': nome_start,
-                        'end': nome_end,
-                        'confidence': 0.85,
-                        'method': 'contextual'
-                    })
+                    hits += 1
+                    entities.append(Span(rec.entidade, nome, nome_start, nome_end, rec.confianca, 'contextual'))
+            rec.registrar(hits, time.perf_counter_ns() - inicio)
 
         logger.info(f"   - Detecção contextual encontrou {len(entities)} nomes.")
         return entities
 
-    def _detect_addresses_contextual(self, text: str, existing_entities: List[Dict]) -> List[Dict[str, Any]]:
+    def _detect_addresses_contextual(self, text: str, existing_entities: List[Span], ativos: Optional[Set] = None) -> List[Span]:
         """Detecta endereços usando padrões contextuais"""
         entities = []
 
-        for pattern in self.endereco_patterns:
-            for match in re.finditer(pattern, text, re.IGNORECASE | re.UNICODE):
+        if ativos is None:
+            ativos = self.patterns.ativos(text)
+
+        for rec in self.patterns.familia('endereco'):
+            if rec not in ativos:
+                continue
+            inicio = time.perf_counter_ns()
+            hits = 0
+            for match in rec.regex.finditer(text):
                 endereco = match.group().strip()
 
                 # Evita duplicatas
                 is_duplicate = any(
-                    e['start'] <= match.start() and e['end'] >= match.end()
+                    e.start <= match.start() and e.end >= match.end()
                     for e in existing_entities + entities
                 )
                 if not is_duplicate:
-                    entities.append({
-                        'type': 'ENDERECO',
-                        'value': endereco,
-                        'start': match.start(),
-                        'end': match.end(),
-                        'confidence': 0.80,
-                        'method': 'contextual'
-                    })
+                    hits += 1
+                    entities.append(Span(rec.entidade, endereco, match.start(), match.end(), rec.confianca, 'contextual'))
+            rec.registrar(hits, time.perf_counter_ns() - inicio)
 
         logger.info(f"   - Detecção contextual encontrou {len(entities)} endereços.")
         return entities
 
-    def _detect_phones_contextual(self, text: str, existing_entities: List[Dict]) -> List[Dict[str, Any]]:
+    def _detect_phones_contextual(self, text: str, existing_entities: List[Span], ativos: Optional[Set] = None) -> List[Span]:
         """Detecta telefones usando contexto (palavra-chave + número)"""
         entities = []
 
-        for pattern in self.telefone_contextual_patterns:
-            for match in re.finditer(pattern, text, re.IGNORECASE | re.UNICODE):
+        if ativos is None:
+            ativos = self.patterns.ativos(text)
+
+        for rec in self.patterns.familia('telefone'):
+            if rec not in ativos:
+                continue
+            inicio = time.perf_counter_ns()
+            hits = 0
+            for match in rec.regex.finditer(text):
                 # Extrai o número do grupo de captura
-                numero = match.group(1) if match.groups() else match.group()
+                numero = match.group(rec.grupo) if match.groups() else match.group()
 
                 # Encontra a posição do número no texto
                 numero_start = text.find(numero, match.start())
@@ -281,38 +342,220 @@ class PIIDetectorLAI:
 
                 # Evita duplicatas
                 is_duplicate = any(
-                    e['start'] <= numero_start and e['end'] >= numero_end
+                    e.start <= numero_start and e.end >= numero_end
                     for e in existing_entities + entities
                 )
                 if not is_duplicate:
-                    entities.append({
-                        'type': 'TELEFONE',
-                        'value': numero,
-                        'start': numero_start,
-                        'end': numero_end,
-                        'confidence': 0.90,
-                        'method': 'contextual'
-                    })
+                    hits += 1
+                    entities.append(Span(rec.entidade, numero, numero_start, numero_end, rec.confianca, 'contextual'))
+            rec.registrar(hits, time.perf_counter_ns() - inicio)
 
         logger.info(f"   - Detecção contextual encontrou {len(entities)} telefones.")
         return entities
 
-    def _anonymize_text(self, text: str, entities: List[Dict[str, Any]]) -> str:
+    def _gliner_candidatos(self, text: str, existing_entities: List[Span]) -> List[tuple]:
+        """
+        Heurística barata que decide se o GLiNER precisa rodar: retorna as sentenças
+        (início, fim) com nomes capitalizados que as camadas anteriores não cobriram.
+        """
+        sentencas = []
+        for sent in SENTENCA_RE.finditer(text):
+            for cand in NOME_CANDIDATO_RE.finditer(text, sent.start(), sent.end()):
+                coberto = any(
+                    e.start <= cand.start() and e.end >= cand.end()
+                    for e in existing_entities
+                )
+                if not coberto:
+                    sentencas.append((sent.start(), sent.end()))
+                    break
+        return sentencas
+
+    def _detect_with_gliner(self, text: str, existing_entities: List[Span]) -> List[Span]:
+        """Detecta entidades com GLiNER, em lote, apenas nas sentenças candidatas"""
+        entities = []
+
+        if not self.gliner_available:
+            return entities
+
+        sentencas = self._gliner_candidatos(text, existing_entities)
+        if not sentencas:
+            return entities
+
+        try:
+            labels = list(GLINER_LABELS)
+            for i in range(0, len(sentencas), self.gliner_batch):
+                lote = sentencas[i:i + self.gliner_batch]
+                textos = [text[ini:fim] for ini, fim in lote]
+                if hasattr(self.gliner, 'batch_predict_entities'):
+                    previsoes = self.gliner.batch_predict_entities(textos, labels, threshold=self.gliner_threshold)
+                else:
+                    previsoes = [self.gliner.predict_entities(t, labels, threshold=self.gliner_threshold) for t in textos]
+
+                for (offset, _), ents in zip(lote, previsoes):
+                    for ent in ents:
+                        start, end = offset + ent['start'], offset + ent['end']
+                        is_duplicate = any(
+                            e.start <= start and e.end >= end
+                            for e in existing_entities + entities
+                        )
+                        if not is_duplicate:
+                            entities.append(Span(GLINER_LABELS.get(ent['label'], ent['label'].upper()), text[start:end], start, end, float(ent['score']), 'gliner'))
+
+            logger.info(f"   - GLiNER ({len(sentencas)} sentenças) encontrou {len(entities)} entidades.")
+
+        except Exception as e:
+            logger.warning(f"⚠️ Erro no GLiNER: {e}")
+
+        return entities
+
+    def pattern_stats(self) -> List[Dict[str, Any]]:
+        """Acertos e tempo acumulados por padrão regex (para achar padrões caros ou inúteis)"""
+        return self.patterns.stats()
+
+    def _anonymize_text(self, text: str, entities: List[Span]) -> str:
         """Anonimiza o texto substituindo entidades por placeholders"""
         # Ordena entidades por posição (do fim para o início para não afetar índices)
-        sorted_entities = sorted(entities, key=lambda x: x['start'], reverse=True)
+        sorted_entities = sorted(entities, key=lambda x: x.start, reverse=True)
 
         texto_anonimizado = text
         for ent in sorted_entities:
-            placeholder = f"<{ent['type']}>"
+            placeholder = f"<{ent.type}>"
             texto_anonimizado = (
-                texto_anonimizado[:ent['start']] +
+                texto_anonimizado[:ent.start] +
                 placeholder +
-                texto_anonimizado[ent['end']:]
+                texto_anonimizado[ent.end:]
             )
 
         return texto_anonimizado
 
+    def _detect_layers(self, text: str) -> Tuple[List[Span], Dict[str, Dict]]:
+        """Executa todas as camadas sobre um texto (ou chunk). Retorna (entidades, layer_stats)."""
+        all_entities = []
+        layer_stats = {}
+
+        def _camada(nome: str, detectar, *args):
+            # Latência e contribuição (entidades novas) de cada camada, reportadas separadamente
+            inicio = time.perf_counter()
+            with tracing.span(f'detector.{nome}') as span_camada:
+                entidades = detectar(*args)
+                span_camada.set_attribute('sigilo.entidades', len(entidades))
+            layer_stats[nome] = {
+                'tempo_ms': round((time.perf_counter() - inicio) * 1000, 2),
+                'entidades': len(entidades)
+            }
+            all_entities.extend(entidades)
+
+        # Camada 1: Presidio (NLP)
+        _camada('presidio', self._detect_with_presidio, text)
+
+        # Pré-filtro por palavras-gatilho: decide numa passada quais padrões podem casar
+        ativos = self.patterns.ativos(text)
+
+        # Camada 2: Regex (padrões brasileiros)
+        _camada('regex', self._detect_with_regex, text, all_entities, ativos)
+
+        # Camada 3: Detecção contextual (nomes, endereços e telefones)
+        # Famílias sem nenhum padrão ativo nem são chamadas
+        for camada, familia, detectar in (
+            ('contextual_nomes', 'nome', self._detect_names_contextual),
+            ('contextual_enderecos', 'endereco', self._detect_addresses_contextual),
+            ('contextual_telefones', 'telefone', self._detect_phones_contextual),
+        ):
+            if ativos.isdisjoint(self.patterns.familia(familia)):
+                _camada(camada, list)
+            else:
+                _camada(camada, detectar, text, all_entities, ativos)
+
+        # Camada 4: GLiNER (opcional, só para nomes capitalizados não resolvidos)
+        if self.gliner_available:
+            _camada('gliner', self._detect_with_gliner, text, all_entities)
+
+        return all_entities, layer_stats
+
+    def _dividir_chunks(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Divide o texto em janelas (início, fim) de até `chunk_tamanho` caracteres,
+        cortando de preferência em parágrafo, depois em fim de frase e por último em espaço.
+        Janelas consecutivas se sobrepõem em ~`chunk_sobreposicao` caracteres.
+        """
+        chunks = []
+        n = len(text)
+        inicio = 0
+        while inicio < n:
+            fim = min(inicio + self.chunk_tamanho, n)
+            if fim < n:
+                for separador in ('\n\n', '\n', '. ', ' '):
+                    pos = text.rfind(separador, inicio + self.chunk_tamanho // 2, fim)
+                    if pos != -1:
+                        fim = pos + len(separador)
+                        break
+            chunks.append((inicio, fim))
+            if fim >= n:
+                break
+
+            # Próxima janela recua a sobreposição, alinhada em um espaço
+            proximo = max(fim - self.chunk_sobreposicao, inicio + 1)
+            espaco = text.find(' ', proximo, fim)
+            inicio = espaco + 1 if espaco != -1 else proximo
+        return chunks
+
+    def _detect_chunked(self, text: str) -> Tuple[List[Span], Dict[str, Dict]]:
+        """Detecta por chunks (em paralelo se configurado) e funde as entidades em offsets globais"""
+        chunks = self._dividir_chunks(text)
+        logger.info(f"   ✂️ Texto dividido em {len(chunks)} chunks")
+
+        if self.chunk_mapper is not None and len(chunks) > 1:
+            resultados = self.chunk_mapper([text[ini:fim] for ini, fim in chunks])
+        elif self.chunk_workers > 1 and len(chunks) > 1:
+            if self._chunk_executor is None:
+                self._chunk_executor = ThreadPoolExecutor(max_workers=self.chunk_workers)
+            # Threads do pool não herdam o contexto do trace: as camadas de cada chunk ficam sob detector.detect
+            carrier = tracing.contexto_atual()
+
+            def _chunk(c):
+                with tracing.contexto(carrier):
+                    return self._detect_layers(text[c[0]:c[1]])
+
+            resultados = list(self._chunk_executor.map(_chunk, chunks))
+        else:
+            resultados = [self._detect_layers(text[ini:fim]) for ini, fim in chunks]
+
+        return self._merge_chunks(text, chunks, resultados)
+
+    def _merge_chunks(self, text: str, chunks: List[Tuple[int, int]], resultados: List[Tuple[List[Span], Dict]]) -> Tuple[List[Span], Dict[str, Dict]]:
+        """Converte offsets para o texto inteiro e remove as entidades repetidas nas sobreposições"""
+        candidatas = []
+        layer_stats = {'chunks': {'total': len(chunks)}}
+        for indice, ((offset, _), (entidades, stats)) in enumerate(zip(chunks, resultados)):
+            for e in entidades:
+                candidatas.append((indice, Span(e.type, e.value, e.start + offset, e.end + offset, e.confidence, e.method)))
+            for camada, valores in stats.items():
+                acumulado = layer_stats.setdefault(camada, {'tempo_ms': 0.0, 'entidades': 0})
+                acumulado['tempo_ms'] = round(acumulado['tempo_ms'] + valores['tempo_ms'], 2)
+                acumulado['entidades'] += valores['entidades']
+
+        # Só se deduplica entre chunks diferentes e do mesmo tipo: a cópia idêntica (ou contida) vista
+        # pelo chunk vizinho sai e trechos parciais cortados na borda se unem. Entidades de tipos
+        # diferentes que se sobrepõem ficam, como no caminho sem chunks (ex: CPF dentro de um ENDERECO).
+        candidatas.sort(key=lambda c: (c[1].start, -(c[1].end - c[1].start)))
+        entidades = []
+        # Por tipo: entidade aceita de maior fim e os chunks que a reportaram
+        abertas: Dict[str, Tuple[Span, Set[int]]] = {}
+        for indice, e in candidatas:
+            aberta = abertas.get(e.type)
+            if aberta and e.start < aberta[0].end and indice not in aberta[1]:
+                ultima, origens = aberta
+                if e.end > ultima.end:
+                    # Mesma entidade vista parcialmente por chunks vizinhos: une os trechos
+                    ultima.end = e.end
+                    ultima.value = text[ultima.start:ultima.end]
+                origens.add(indice)
+                continue
+            entidades.append(e)
+            if not aberta or e.end > aberta[0].end:
+                abertas[e.type] = (e, {indice})
+        return entidades, layer_stats
+
     def detect(self, text: str) -> Dict[str, Any]:
         """
         Detecta e anonimiza PII no texto.
@@ -320,48 +563,43 @@ class PIIDetectorLAI:
         Returns:
             Dict com:
             - anonymized_text: texto com PII mascarado
-            - entities: lista de entidades detectadas
+            - entities: lista de Span (converter com spans_para_compacto/spans_para_dicts na borda)
             - entities_detected: contagem total
             - entity_types: contagem por tipo
             - risk_level: baixo/medio/alto
+            - layer_stats: tempo (ms) e entidades novas por camada
         """
         logger.info(f"🔍 Analisando texto de {len(text)} caracteres...")
 
         all_entities = []
+        layer_stats = {}
 
-        try:
-            # Camada 1: Presidio (NLP)
-            presidio_entities = self._detect_with_presidio(text)
-            all_entities.extend(presidio_entities)
-
-            # Camada 2: Regex (padrões brasileiros)
-            regex_entities = self._detect_with_regex(text, all_entities)
-            all_entities.extend(regex_entities)
-
-            # Camada 3: Detecção contextual (nomes, endereços e telefones)
-            name_entities = self._detect_names_contextual(text, all_entities)
-            all_entities.extend(name_entities)
-
-            address_entities = self._detect_addresses_contextual(text, all_entities)
-            all_entities.extend(address_entities)
-
-            phone_entities = self._detect_phones_contextual(text, all_entities)
-            all_entities.extend(phone_entities)
-
-            # Anonimização
-            texto_anonimizado = self._anonymize_text(text, all_entities)
-
-        except Exception as e:
-            logger.error(f"❌ Falha crítica na detecção: {e}")
-            # Em caso de falha, mascara TUDO para garantir segurança
-            texto_anonimizado = "[ERRO: Texto não processado por segurança - contém dados sensíveis protegidos]"
-            self._registrar_falha_critica(text, e)
-            all_entities = []
+        # No trace, o texto só aparece como hash (o mesmo de _registrar_falha_critica)
+        with tracing.span('detector.detect', **{'sigilo.texto_tamanho': len(text)}) as span_deteccao:
+            if span_deteccao.is_recording():
+                span_deteccao.set_attribute('sigilo.texto_sha256', tracing.hash_texto(text))
+            try:
+                # Textos longos: janelas com sobreposição, memória limitada por chunk
+                if len(text) > self.chunk_tamanho:
+                    all_entities, layer_stats = self._detect_chunked(text)
+                else:
+                    all_entities, layer_stats = self._detect_layers(text)
+
+                # Anonimização
+                texto_anonimizado = self._anonymize_text(text, all_entities)
+
+            except Exception as e:
+                logger.error(f"❌ Falha crítica na detecção: {e}")
+                # Em caso de falha, mascara TUDO para garantir segurança
+                texto_anonimizado = "[ERRO: Texto não processado por segurança - contém dados sensíveis protegidos]"
+                self._registrar_falha_critica(text, e)
+                all_entities = []
+            span_deteccao.set_attribute('sigilo.entidades', len(all_entities))
 
         # Estatísticas
         entity_types = {}
         for e in all_entities:
-            entity_types[e['type']] = entity_types.get(e['type'], 0) + 1
+            entity_types[e.type] = entity_types.get(e.type, 0) + 1
 
         # Cálculo de risco baseado em tipo e quantidade de PII
         risk_level = 'baixo'
@@ -369,7 +607,7 @@ class PIIDetectorLAI:
         # Tipos de alto risco (documentos de identificação pessoal)
         high_risk_types = {'CPF', 'CARTAO_CREDITO', 'CREDIT_CARD', 'CNH', 'RG', 'PIS_PASEP'}
         # Tipos de risco médio (identificadores empresariais ou dados de contato combinados)
-        medium_risk_types = {'CNPJ', 'PESSOA', 'ENDERECO', 'DATA_NASCIMENTO'}
+        medium_risk_types = {'CNPJ', 'PESSOA', 'ENDERECO', 'DATA_NASCIMENTO', 'CARTAO_SUS', 'OAB'}
         # Tipos de baixo risco (dados de contato isolados)
         low_risk_types = {'EMAIL', 'TELEFONE', 'CEP', 'PLACA_VEICULO', 'TITULO_ELEITOR'}
 
@@ -397,5 +635,6 @@ class PIIDetectorLAI:
             'entities': all_entities,
             'entities_detected': len(all_entities),
             'entity_types': entity_types,
-            'risk_level': risk_level
+            'risk_level': risk_level,
+            'layer_stats': layer_stats
         }
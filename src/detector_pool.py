@@ -0,0 +1,159 @@
+"""Execução paralela da detecção em um pool de processos (fork copy-on-write)"""
+import multiprocessing
+import os
+import resource
+import threading
+import logging
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from src import tracing
+
+# Configuração de Logs
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger("DETECTOR_POOL")
+
+# Detector herdado pelos processos filhos no fork (nunca é serializado)
+_detector = None
+
+
+def _init_filho():
+    # Nos filhos o detector roda tudo localmente; só o pai distribui chunks
+    _detector.chunk_mapper = None
+    # Contadores dos padrões herdados do pai já são dele: o filho só devolve o que contar daqui em diante
+    _detector.patterns.drenar()
+
+
+def _rss_kb() -> int:
+    """RSS atual do processo (KB), inclusive as páginas do modelo compartilhadas com o pai"""
+    try:
+        with open('/proc/self/status') as f:
+            for linha in f:
+                if linha.startswith('VmRSS:'):
+                    return int(linha.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+# Cada item leva o contexto do trace do pai: os spans das camadas continuam o trace da tarefa.
+# Os filhos devolvem, junto com o resultado, o próprio RSS (para o pai decidir a reciclagem)
+# e os contadores dos padrões regex desde a última tarefa (somados no registro do pai).
+def _detect_no_filho(item) -> Tuple[Dict[str, Any], int, Dict[str, List[int]]]:
+    texto, carrier = item
+    with tracing.contexto(carrier):
+        return _detector.detect(texto), _rss_kb(), _detector.patterns.drenar()
+
+
+def _detect_layers_no_filho(item):
+    texto, carrier = item
+    with tracing.contexto(carrier):
+        return _detector._detect_layers(texto), _rss_kb(), _detector.patterns.drenar()
+
+
+def _aquecer(_):
+    return True
+
+
+class DetectionExecutor:
+    """
+    Pool de processos para o detector já carregado no processo atual.
+
+    - Os filhos são criados por fork e herdam o modelo (spaCy/Presidio/GLiNER) sem recarregar
+    - Textos curtos vão inteiros para um filho; textos longos são divididos em chunks
+      pelo pai e os chunks são distribuídos entre os filhos
+    - Back-pressure: no máximo `max_pendentes` submissões em voo; acima disso quem
+      chama espera (casado com o prefetch do Celery, que limita as tarefas reservadas)
+    - Reciclagem: o pool é recriado quando um filho passa de `max_memoria_kb` de RSS ou depois
+      de `max_tarefas` tarefas por processo (0 = sem limite). O Celery não recicla estes filhos:
+      worker_max_memory_per_child só vale para o pool prefork
+    - Só funciona no processo que o criou: os threads de gerência não sobrevivem a um fork
+    """
+
+    def __init__(self, detector, processos: int, max_pendentes: int, max_memoria_kb: int = 0, max_tarefas: int = 0):
+        self.detector = detector
+        self.processos = processos
+        self.max_memoria_kb = max_memoria_kb
+        self.max_tarefas = max_tarefas
+        self.pid = os.getpid()
+        self._pendentes = threading.BoundedSemaphore(max_pendentes)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._tarefas = 0
+        self._criar_pool()
+        detector.chunk_mapper = self.map_chunks
+
+    def _criar_pool(self):
+        global _detector
+        _detector = self.detector
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.processos,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_init_filho,
+        )
+        self._tarefas = 0
+        # Força o fork de todos os filhos agora (e não no meio de uma tarefa)
+        list(self._pool.map(_aquecer, range(self.processos)))
+        logger.info(f"🧵 Pool de detecção pronto com {self.processos} processos")
+
+    def _reciclar(self, pool, motivo: str):
+        """Troca o pool por um novo; as tarefas já submetidas ao antigo terminam normalmente"""
+        with self._lock:
+            if self._pool is not pool:
+                return  # outra thread já reciclou
+            logger.info(f"♻️ Reciclando pool de detecção: {motivo}")
+            self._criar_pool()
+        pool.shutdown(wait=False)
+
+    def _executar(self, fn: Callable, args: Iterable) -> List[Any]:
+        if os.getpid() != self.pid:
+            raise RuntimeError("DetectionExecutor herdado por fork: crie um executor no processo atual")
+        args = list(args)
+        with self._pendentes:
+            with self._lock:
+                pool = self._pool
+                futuros = [pool.submit(fn, a) for a in args]
+                self._tarefas += len(futuros)
+                tarefas = self._tarefas
+            try:
+                respostas = [f.result() for f in futuros]
+            except BrokenProcessPool:
+                # Um filho morreu (OOM, sinal...): recria o pool e tenta uma vez mais
+                logger.warning("⚠️ Pool de detecção quebrado. Recriando processos...")
+                with self._lock:
+                    if self._pool is pool:
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        self._criar_pool()
+                    pool = self._pool
+                    futuros = [pool.submit(fn, a) for a in args]
+                respostas = [f.result() for f in futuros]
+
+        for _, _, contadores in respostas:
+            self.detector.patterns.acumular(contadores)
+
+        rss_kb = max(rss for _, rss, _ in respostas)
+        if self.max_memoria_kb and rss_kb > self.max_memoria_kb:
+            self._reciclar(pool, f"filho com {rss_kb // 1024}MB de RSS (limite {self.max_memoria_kb // 1024}MB)")
+        elif self.max_tarefas and tarefas >= self.max_tarefas * self.processos:
+            self._reciclar(pool, f"{tarefas} tarefas executadas")
+        return [resultado for resultado, _, _ in respostas]
+
+    def detect(self, texto: str) -> Dict[str, Any]:
+        if len(texto) > self.detector.chunk_tamanho:
+            # O pai divide e junta; os chunks rodam em paralelo via map_chunks
+            return self.detector.detect(texto)
+        return self._executar(_detect_no_filho, [(texto, tracing.contexto_atual())])[0]
+
+    def map_chunks(self, textos: List[str]):
+        carrier = tracing.contexto_atual()
+        return self._executar(_detect_layers_no_filho, [(texto, carrier) for texto in textos])
+
+    def shutdown(self):
+        self.detector.chunk_mapper = None
+        self._pool.shutdown(wait=True)
@@ -3,7 +3,10 @@ Gerenciador Central de IAM (Identity & Access Management)
 Suporta múltiplos provedores: Mock, Keycloak, Google, etc.
 """
 import os
+import time
 import logging
+import threading
+import requests
 from typing import Optional, Dict, List
 from fastapi import HTTPException, status, Security, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -11,6 +14,7 @@ from jose import jwt, JWTError
 from keycloak import KeycloakOpenID
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
+from src.iam.token_cache import TokenCache
 
 # Configuração de Logs
 logger = logging.getLogger("IAM")
@@ -28,9 +32,26 @@ class IAMManager:
         self.keycloak_realm = os.getenv("KEYCLOAK_REALM")
         self.keycloak_client_id = os.getenv("KEYCLOAK_CLIENT_ID")
         self.keycloak_client_secret = os.getenv("KEYCLOAK_CLIENT_SECRET")
+        self.keycloak_audience = os.getenv("KEYCLOAK_AUDIENCE")
+        self.keycloak_issuer = os.getenv("KEYCLOAK_ISSUER")
+        self.jwks_ttl = int(os.getenv("KEYCLOAK_JWKS_TTL", "3600"))
+        self.jwks_refresh_min = int(os.getenv("KEYCLOAK_JWKS_REFRESH_MIN_S", "30"))
+        self._keycloak_openid = None
+        self._jwks: Dict[str, Dict] = {}
+        self._jwks_fetched_at = float("-inf")
+        self._jwks_lock = threading.Lock()
         
-        # Configurações Google
+        # Configurações Google (sessão HTTP reaproveitada entre validações)
         self.google_client_id = os.getenv("GOOGLE_CLIENT_ID")
+        self._google_request = google_requests.Request(session=requests.Session())
+
+        # Cache de tokens verificados
+        self.token_cache = TokenCache(
+            max_itens=int(os.getenv("IAM_CACHE_MAX_ITENS", "10000")),
+            ttl_s=int(os.getenv("IAM_CACHE_TTL", "300")),
+            ttl_negativo_s=int(os.getenv("IAM_CACHE_TTL_NEGATIVO", "10")),
+            redis_url=os.getenv("IAM_CACHE_REDIS_URL"),
+        )
 
     def verify_token(self, credentials: HTTPAuthorizationCredentials = Security(security)) -> Dict:
         """
@@ -38,7 +59,30 @@ class IAMManager:
         Retorna o payload do token (dict) se válido.
         """
         token = credentials.credentials
-        
+
+        cached = self.token_cache.get(token)
+        if cached is not None:
+            valido, valor = cached
+            if valido:
+                return valor
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail=valor,
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        try:
+            claims = self._validate(token)
+        except HTTPException as e:
+            if e.status_code == status.HTTP_401_UNAUTHORIZED:
+                self.token_cache.set_invalido(token, e.detail)
+            raise
+
+        self.token_cache.set_valido(token, claims)
+        return claims
+
+    def _validate(self, token: str) -> Dict:
+        """Despacha a validação para o provedor configurado"""
         try:
             if self.provider == "mock":
                 return self._validate_mock(token)
@@ -82,23 +126,16 @@ class IAMManager:
         raise HTTPException(status_code=401, detail="Token Mock inválido (deve começar com 'mock-')")
 
     def _validate_keycloak(self, token: str) -> Dict:
-        """Valida token via Introspection ou decodificação local"""
+        """Valida token JWT localmente (JWKS em cache) ou via Introspection (tokens opacos)"""
         if not self.keycloak_url:
             raise ValueError("KEYCLOAK_URL não configurada")
 
         try:
-            keycloak_openid = KeycloakOpenID(
-                server_url=self.keycloak_url,
-                client_id=self.keycloak_client_id,
-                realm_name=self.keycloak_realm,
-                client_secret_key=self.keycloak_client_secret
-            )
-            
-            token_info = keycloak_openid.introspect(token)
-            
-            if not token_info.get("active"):
-                raise Exception("Token inativo")
-            
+            if token.count(".") == 2:
+                token_info = self._decode_keycloak_jwt(token)
+            else:
+                token_info = self._introspect_keycloak(token)
+
             # Normaliza roles do Keycloak (realm_access.roles)
             roles = token_info.get("realm_access", {}).get("roles", [])
             token_info["roles"] = roles
@@ -109,6 +146,71 @@ class IAMManager:
             logger.warning(f"Falha na validação Keycloak: {e}")
             raise HTTPException(status_code=401, detail="Token Keycloak inválido")
 
+    def _keycloak_issuer(self) -> str:
+        return self.keycloak_issuer or f"{self.keycloak_url.rstrip('/')}/realms/{self.keycloak_realm}"
+
+    def _decode_keycloak_jwt(self, token: str) -> Dict:
+        """Valida assinatura RS256, expiração, emissor e (opcional) audiência sem ir à rede"""
+        header = jwt.get_unverified_header(token)
+        if header.get("alg") != "RS256":
+            raise JWTError(f"Algoritmo não suportado: {header.get('alg')}")
+
+        key = self._get_jwk(header.get("kid"))
+        return jwt.decode(
+            token,
+            key,
+            algorithms=["RS256"],
+            audience=self.keycloak_audience,
+            issuer=self._keycloak_issuer(),
+            options={"verify_aud": bool(self.keycloak_audience), "verify_at_hash": False},
+        )
+
+    def _get_jwk(self, kid: Optional[str]) -> Dict:
+        """Retorna a chave pública do kid a partir do JWKS em cache"""
+        idade = time.monotonic() - self._jwks_fetched_at
+        key = self._jwks.get(kid)
+        if key is None or idade > self.jwks_ttl:
+            with self._jwks_lock:
+                idade = time.monotonic() - self._jwks_fetched_at
+                key = self._jwks.get(kid)
+                # Recarrega ao expirar o TTL ou em rotação de chaves (kid desconhecido),
+                # respeitando um intervalo mínimo para não martelar o Keycloak com kids inválidos
+                if idade > self.jwks_ttl or (key is None and idade > self.jwks_refresh_min):
+                    self._refresh_jwks()
+                    key = self._jwks.get(kid)
+
+        if key is None:
+            raise JWTError(f"Chave de assinatura desconhecida (kid={kid})")
+        return key
+
+    def _refresh_jwks(self):
+        url = f"{self.keycloak_url.rstrip('/')}/realms/{self.keycloak_realm}/protocol/openid-connect/certs"
+        try:
+            res = requests.get(url, timeout=5)
+            res.raise_for_status()
+            self._jwks = {k.get("kid"): k for k in res.json().get("keys", []) if k.get("use", "sig") == "sig"}
+            logger.info(f"🔑 JWKS do Keycloak atualizado ({len(self._jwks)} chaves)")
+        except Exception as e:
+            # Mantém as chaves antigas; só falha se o kid realmente não existir
+            logger.warning(f"⚠️ Falha ao atualizar JWKS do Keycloak: {e}")
+        finally:
+            self._jwks_fetched_at = time.monotonic()
+
+    def _introspect_keycloak(self, token: str) -> Dict:
+        """Fallback para tokens opacos: Introspection via HTTP"""
+        if self._keycloak_openid is None:
+            self._keycloak_openid = KeycloakOpenID(
+                server_url=self.keycloak_url,
+                client_id=self.keycloak_client_id,
+                realm_name=self.keycloak_realm,
+                client_secret_key=self.keycloak_client_secret
+            )
+
+        token_info = self._keycloak_openid.introspect(token)
+        if not token_info.get("active"):
+            raise Exception("Token inativo")
+        return token_info
+
     def _validate_google(self, token: str) -> Dict:
         """Valida token ID do Google"""
         if not self.google_client_id:
@@ -117,7 +219,7 @@ class IAMManager:
         try:
             id_info = id_token.verify_oauth2_token(
                 token, 
-                google_requests.Request(), 
+                self._google_request, 
                 self.google_client_id
             )
             # Google não tem roles padrão, assume user
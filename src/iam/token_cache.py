@@ -0,0 +1,109 @@
+"""
+Cache de tokens já verificados (LRU em memória, opcionalmente compartilhado via Redis).
+A chave é o SHA256 do token; o token em si nunca é armazenado.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger("IAM")
+
+
+class TokenCache:
+    """
+    Mapeia hash do token -> claims verificadas.
+
+    - TTL positivo limitado pelo `exp` do token (nunca aceita token expirado)
+    - Rejeições ficam em cache negativo por pouco tempo (evita martelar o IdP)
+    - Com `redis_url`, réplicas/workers da API compartilham as verificações
+    """
+
+    def __init__(
+        self,
+        max_itens: int = 10000,
+        ttl_s: int = 300,
+        ttl_negativo_s: int = 10,
+        redis_url: Optional[str] = None,
+    ):
+        self.max_itens = max_itens
+        self.ttl_s = ttl_s
+        self.ttl_negativo_s = ttl_negativo_s
+        self._itens: "OrderedDict[str, Tuple[float, bool, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.redis = None
+
+        if redis_url:
+            try:
+                import redis
+                self.redis = redis.from_url(redis_url)
+            except Exception as e:
+                logger.warning(f"⚠️ Cache de tokens sem Redis (apenas local): {e}")
+
+    @staticmethod
+    def _chave(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Tuple[bool, object]]:
+        """Retorna (valido, claims|detalhe_erro) ou None se não estiver em cache"""
+        chave = self._chave(token)
+        agora = time.time()
+
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                expira_em, valido, valor = item
+                if expira_em > agora:
+                    self._itens.move_to_end(chave)
+                    return valido, (dict(valor) if valido else valor)
+                del self._itens[chave]
+
+        if self.redis is not None:
+            try:
+                bruto = self.redis.get(f"iam:token:{chave}")
+                if bruto:
+                    dados = json.loads(bruto)
+                    self._guardar(chave, dados['expira_em'], dados['valido'], dados['valor'])
+                    return dados['valido'], dados['valor']
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao ler cache de tokens no Redis: {e}")
+
+        return None
+
+    def set_valido(self, token: str, claims: Dict):
+        ttl = self.ttl_s
+        exp = claims.get("exp")
+        if exp is not None:
+            ttl = min(ttl, int(exp) - int(time.time()))
+        if ttl > 0:
+            self._salvar(token, ttl, True, claims)
+
+    def set_invalido(self, token: str, detalhe: str):
+        if self.ttl_negativo_s > 0:
+            self._salvar(token, self.ttl_negativo_s, False, detalhe)
+
+    def _salvar(self, token: str, ttl: int, valido: bool, valor):
+        chave = self._chave(token)
+        expira_em = time.time() + ttl
+        self._guardar(chave, expira_em, valido, dict(valor) if valido else valor)
+
+        if self.redis is not None:
+            try:
+                self.redis.setex(
+                    f"iam:token:{chave}",
+                    ttl,
+                    json.dumps({'expira_em': expira_em, 'valido': valido, 'valor': valor}, default=str)
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao gravar cache de tokens no Redis: {e}")
+
+    def _guardar(self, chave: str, expira_em: float, valido: bool, valor):
+        with self._lock:
+            self._itens[chave] = (expira_em, valido, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
@@ -1,10 +1,14 @@
 """Cliente para comunicação com Ollama (Qwen 2.5 1.5B)"""
 import requests
+import redis
 import json
 import os
+import time
 from typing import Dict, Optional
 import logging
 import sys
+from src.circuit_breaker import CircuitBreaker
+from src.metrics import OLLAMA, observar
 
 # Configuração de Logs
 logging.basicConfig(
@@ -14,6 +18,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger("LLM_CLIENT")
 
+# Marcador gravado no resumo de fallback (usado para reprocessar depois)
+OBSERVACAO_FALLBACK = 'Classificação automática indisponível'
+
+# Durações (ns) devolvidas pelo /api/generate -> fase no histograma e na auditoria
+FASES_OLLAMA = {
+    'load_duration': 'carga',
+    'prompt_eval_duration': 'prompt_eval',
+    'eval_duration': 'eval',
+}
+
+
+def resumo_e_fallback(resumo: Optional[Dict]) -> bool:
+    """Indica se o resumo é o placeholder de fallback"""
+    return bool(resumo) and resumo.get('observacao') == OBSERVACAO_FALLBACK
+
 class OllamaClient:
     """Cliente Ollama para geração de resumos com Qwen 2.5"""
     
@@ -21,9 +40,23 @@ class OllamaClient:
         self.base_url = os.getenv('OLLAMA_URL', 'http://sigilo-ollama:11434')
         self.model = os.getenv('MODEL_NAME', 'qwen2.5:1.5b-instruct')
         self.timeout = 30
+        self.breaker = CircuitBreaker(
+            'ollama',
+            redis.from_url(os.getenv('REDIS_URL', 'redis://sigilo-redis:6379/0')),
+            limiar_falhas=float(os.getenv('OLLAMA_CB_LIMIAR_FALHAS', '0.5')),
+            minimo_chamadas=int(os.getenv('OLLAMA_CB_MIN_CHAMADAS', '5')),
+            janela_s=int(os.getenv('OLLAMA_CB_JANELA_S', '60')),
+            latencia_max_s=float(os.getenv('OLLAMA_CB_LATENCIA_MAX_S', '10')),
+            tempo_aberto_s=int(os.getenv('OLLAMA_CB_TEMPO_ABERTO_S', '30')),
+        )
         logger.info(f"🤖 OllamaClient inicializado. URL: {self.base_url} | Modelo: {self.model}")
     
-    def gerar_resumo_lai(self, texto_anonimizado: str, entidades_detectadas: dict) -> Dict:
+    def gerar_resumo_lai(self, texto_anonimizado: str, entidades_detectadas: dict, tempos: Optional[Dict] = None) -> Dict:
+        """Resumo estruturado do pedido. Se `tempos` for passado, recebe as durações (ms) da chamada."""
+        if not self.breaker.permitir():
+            logger.warning("⚡ Circuit breaker ABERTO - Ollama não será chamado")
+            return self._fallback_resumo()
+
         logger.info("📤 Enviando prompt para Ollama...")
         
         prompt = f"""Analise este pedido de Acesso à Informação e gere um resumo estruturado.
@@ -55,6 +88,7 @@ Retorne JSON com:
 Retorne APENAS o JSON, sem markdown ou explicações:"""
 
         try:
+            inicio = time.monotonic()
             response = requests.post(
                 f"{self.base_url}/api/generate",
                 json={
@@ -72,7 +106,10 @@ Retorne APENAS o JSON, sem markdown ou explicações:"""
             )
             
             response.raise_for_status()
+            duracao = time.monotonic() - inicio
+            self.breaker.registrar_sucesso(duracao)
             result = response.json()
+            self._registrar_tempos(duracao, result, tempos)
             
             generated_text = result['response']
             logger.info(f"📥 Resposta recebida do Ollama ({len(generated_text)} chars)")
@@ -90,11 +127,28 @@ Retorne APENAS o JSON, sem markdown ou explicações:"""
             
         except requests.exceptions.Timeout:
             logger.error("❌ Timeout ao chamar Ollama (30s excedido)")
+            self.breaker.registrar_falha()
+            return self._fallback_resumo()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"❌ Ollama indisponível: {e}")
+            self.breaker.registrar_falha()
             return self._fallback_resumo()
         except Exception as e:
             logger.error(f"❌ Erro ao gerar resumo: {e}")
             return self._fallback_resumo()
     
+    def _registrar_tempos(self, duracao_s: float, result: Dict, tempos: Optional[Dict]):
+        observar(OLLAMA, duracao_s, fase='requisicao')
+        if tempos is not None:
+            tempos['ollama_requisicao'] = round(duracao_s * 1000, 2)
+        for campo, fase in FASES_OLLAMA.items():
+            nanos = result.get(campo)
+            if not isinstance(nanos, (int, float)):
+                continue
+            observar(OLLAMA, nanos / 1e9, fase=fase)
+            if tempos is not None:
+                tempos[f'ollama_{fase}'] = round(nanos / 1e6, 2)
+
     def _extract_json(self, text: str) -> str:
         text = text.replace('```json', '').replace('```', '').strip()
         start = text.find('{')
@@ -114,5 +168,5 @@ Retorne APENAS o JSON, sem markdown ou explicações:"""
             'requer_analise_juridica': False,
             'prazo_sugerido': 'Normal',
             'orgao_competente_sugerido': None,
-            'observacao': 'Classificação automática indisponível'
+            'observacao': OBSERVACAO_FALLBACK
         }
\ No newline at end of file
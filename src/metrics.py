@@ -0,0 +1,163 @@
+"""Histogramas Prometheus por estágio do pipeline e contadores por padrão regex (sem prometheus_client, viram no-op)"""
+import os
+import glob
+import time
+import logging
+import sys
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# Em workers prefork cada filho grava seus valores em arquivos deste diretório e o pai os agrega.
+# Precisa existir antes de o primeiro histograma ser criado.
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, start_http_server
+    )
+    from prometheus_client import multiprocess
+except ImportError:
+    Counter = Histogram = None
+
+# Configuração de Logs
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger("METRICAS")
+
+PROMETHEUS_DISPONIVEL = Histogram is not None
+
+# Porta do servidor de métricas dos workers (0 = desligado); a API expõe /metrics na própria porta
+METRICAS_PORTA = int(os.getenv('SIGILO_METRICS_PORT', '0'))
+
+# Do sub-milissegundo (camadas regex, escrita de status) a dezenas de segundos (Ollama, backlog)
+BUCKETS_RAPIDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+BUCKETS_LENTOS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _histograma(nome: str, descricao: str, rotulos=(), buckets=BUCKETS_LENTOS):
+    if not PROMETHEUS_DISPONIVEL:
+        return None
+    return Histogram(nome, descricao, list(rotulos), buckets=buckets)
+
+
+def _contador(nome: str, descricao: str, rotulos=()):
+    if not PROMETHEUS_DISPONIVEL:
+        return None
+    return Counter(nome, descricao, list(rotulos))
+
+
+ESPERA_FILA = _histograma(
+    'sigilo_fila_espera_segundos', 'Publicação da mensagem -> início da tarefa, por fila Celery', ['fila'])
+SERVICO_TAREFA = _histograma(
+    'sigilo_tarefa_segundos', 'Execução de cada tarefa, por fila Celery', ['fila'])
+DETECCAO = _histograma(
+    'sigilo_deteccao_segundos', 'Chamada completa ao detector (todas as camadas + anonimização)')
+CAMADA_DETECTOR = _histograma(
+    'sigilo_detector_camada_segundos', 'Tempo de cada camada do detector (presidio, regex, contextuais, gliner)',
+    ['camada'], BUCKETS_RAPIDOS)
+BANCO_COMMIT = _histograma(
+    'sigilo_banco_commit_segundos', 'Commit no PostgreSQL, por operação', ['operacao'], BUCKETS_RAPIDOS)
+OLLAMA = _histograma(
+    'sigilo_ollama_segundos', 'Chamada ao Ollama: requisição HTTP e durações reportadas (carga, prompt_eval, eval)',
+    ['fase'])
+STATUS_ESCRITA = _histograma(
+    'sigilo_status_escrita_segundos', 'Escrita de status/resultado no Redis, por operação', ['operacao'],
+    BUCKETS_RAPIDOS)
+
+# Por reconhecedor dos pacotes de padrões ("pack.nome"), somando os filhos do pool de detecção
+PADRAO_CHAMADAS = _contador(
+    'sigilo_padrao_chamadas', 'Execuções de cada padrão regex (após o pré-filtro de gatilhos)', ['recognizer'])
+PADRAO_ACERTOS = _contador(
+    'sigilo_padrao_acertos', 'Entidades aceitas de cada padrão regex', ['recognizer'])
+PADRAO_REJEITADOS = _contador(
+    'sigilo_padrao_rejeitados', 'Matches de cada padrão descartados pela validação (dígito verificador)',
+    ['recognizer'])
+PADRAO_SEGUNDOS = _contador(
+    'sigilo_padrao_segundos', 'Tempo gasto em cada padrão regex', ['recognizer'])
+
+
+def observar(histograma, segundos: float, **rotulos):
+    """Registra uma medição; silencioso sem prometheus_client ou se a métrica falhar"""
+    if histograma is None:
+        return
+    try:
+        (histograma.labels(**rotulos) if rotulos else histograma).observe(max(segundos, 0.0))
+    except Exception as e:
+        logger.warning(f"⚠️ Falha ao registrar métrica: {e}")
+
+
+@contextmanager
+def cronometrar(histograma, tempos: Optional[Dict[str, float]] = None, chave: Optional[str] = None, **rotulos):
+    """Mede o bloco no histograma e, se `tempos` for passado, guarda a duração em ms em tempos[chave]"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        observar(histograma, duracao, **rotulos)
+        if tempos is not None and chave:
+            tempos[chave] = round(duracao * 1000, 2)
+
+
+def registrar_padroes(deltas: Dict[str, list]):
+    """Soma nos contadores os deltas de PatternRegistry.drenar(): {recognizer: [chamadas, hits, tempo_ns, rejeitados]}"""
+    if not PROMETHEUS_DISPONIVEL:
+        return
+    try:
+        for recognizer, (chamadas, hits, tempo_ns, rejeitados) in deltas.items():
+            for contador, valor in (
+                (PADRAO_CHAMADAS, chamadas), (PADRAO_ACERTOS, hits),
+                (PADRAO_REJEITADOS, rejeitados), (PADRAO_SEGUNDOS, tempo_ns / 1e9),
+            ):
+                if valor > 0:
+                    contador.labels(recognizer=recognizer).inc(valor)
+    except Exception as e:
+        logger.warning(f"⚠️ Falha ao registrar métricas dos padrões: {e}")
+
+
+def _registro():
+    if MULTIPROC_DIR:
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+        return registro
+    return REGISTRY
+
+
+def exportar() -> Optional[Tuple[bytes, str]]:
+    """(corpo, content-type) no formato texto do Prometheus; None sem prometheus_client"""
+    if not PROMETHEUS_DISPONIVEL:
+        return None
+    return generate_latest(_registro()), CONTENT_TYPE_LATEST
+
+
+def limpar_multiproc():
+    """Apaga os arquivos de uma execução anterior; só no processo pai, antes do fork dos filhos"""
+    if MULTIPROC_DIR:
+        for arquivo in glob.glob(os.path.join(MULTIPROC_DIR, '*.db')):
+            os.remove(arquivo)
+
+
+def processo_encerrado(pid: int):
+    if PROMETHEUS_DISPONIVEL and MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
+
+
+def iniciar_servidor(porta: int = METRICAS_PORTA) -> bool:
+    """Servidor HTTP de /metrics para workers (no pai do prefork, agregando os filhos)"""
+    if not porta:
+        return False
+    if not PROMETHEUS_DISPONIVEL:
+        logger.warning("⚠️ SIGILO_METRICS_PORT definido sem prometheus_client instalado. Métricas desligadas.")
+        return False
+    try:
+        start_http_server(porta, registry=_registro())
+    except OSError as e:
+        logger.warning(f"⚠️ Servidor de métricas não iniciado na porta {porta}: {e}")
+        return False
+    logger.info(f"📊 Métricas Prometheus em :{porta}/metrics")
+    return True
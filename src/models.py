@@ -1,5 +1,5 @@
 """Models SQLAlchemy para banco de dados"""
-from sqlalchemy import Column, String, Integer, Float, DateTime, JSON, Text
+from sqlalchemy import Column, String, Integer, Float, DateTime, JSON, Text, Boolean
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -33,6 +33,8 @@ class PedidoProcessado(Base):
     
     # NOVO: Resumo gerado por LLM
     resumo_llm = Column(JSON, nullable=True)
+    # Resumo de fallback aguardando reprocessamento pelo LLM
+    resumo_pendente = Column(Boolean, default=False, nullable=False, index=True)
 
 class EntidadeDetectada(Base):
     """Entidades PII detectadas"""
@@ -0,0 +1,113 @@
+"""Junção dos ramos paralelos (banco + LLM) por contador atômico no Redis, sem chord"""
+import os
+import logging
+import sys
+from typing import Any, Dict
+
+from src.status_store import EscritasAgrupadas, codificar, decodificar
+
+# Configuração de Logs
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger("PIPELINE")
+
+PIPELINE_TTL_S = int(os.getenv('SIGILO_PIPELINE_TTL_S', '86400'))
+
+# Registra a conclusão de um ramo e decide quem consolida.
+# KEYS[1] = pipeline:{id} | ARGV = ramo, ttl, campo1, valor1, ...
+# - cada ramo decrementa 'pendentes' uma única vez (retries não contam de novo)
+# - o ramo que leva 'pendentes' a 0 recebe o estado completo e reserva a consolidação
+# Retorna: -1 sem estado (mensagem de versão antiga), 0 ainda há ramos pendentes,
+#          ou a lista HGETALL quando este ramo deve consolidar
+REGISTRAR_RAMO_LUA = """
+if redis.call('HEXISTS', KEYS[1], 'pendentes') == 0 then
+    return -1
+end
+
+if redis.call('HSETNX', KEYS[1], 'ramo:' .. ARGV[1], 1) == 1 then
+    if #ARGV > 2 then
+        redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+    end
+    redis.call('HINCRBY', KEYS[1], 'pendentes', -1)
+    redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]))
+end
+
+if tonumber(redis.call('HGET', KEYS[1], 'pendentes')) <= 0
+    and redis.call('HSETNX', KEYS[1], 'consolidando', 1) == 1 then
+    return redis.call('HGETALL', KEYS[1])
+end
+return 0
+"""
+
+SEM_ESTADO = -1
+
+
+class EstadoPipeline:
+    """
+    Estado por pedido em pipeline:{origem_id} (hash).
+
+    A detecção chama iniciar() com o número de ramos; cada ramo chama concluir_ramo()
+    com o que produziu (ex: resumo do LLM). O último ramo recebe o estado de todos e
+    faz a consolidação; se ela falhar, liberar_consolidacao() permite que o retry tente de novo.
+    """
+
+    def __init__(self, redis_client, ttl_s: int = PIPELINE_TTL_S):
+        self.redis = redis_client
+        self.ttl_s = ttl_s
+        self._script = redis_client.register_script(REGISTRAR_RAMO_LUA)
+
+    @staticmethod
+    def _chave(origem_id) -> str:
+        return f"pipeline:{origem_id}"
+
+    def iniciar(self, origem_id, ramos: int, pipe: EscritasAgrupadas = None):
+        """Com `pipe`, vai na mesma ida ao Redis que as escritas já enfileiradas nele (ex: status)"""
+        if pipe is None:
+            pipe = EscritasAgrupadas(self.redis, transaction=True)
+        inicio = len(pipe)
+        pipe.hset(self._chave(origem_id), 'pendentes', ramos)
+        pipe.expire(self._chave(origem_id), self.ttl_s)
+        pipe.executar(a_partir_de=inicio)
+
+    def ramo_concluido(self, origem_id, ramo: str) -> bool:
+        return bool(self.redis.hexists(self._chave(origem_id), f"ramo:{ramo}"))
+
+    def concluir_ramo(self, origem_id, ramo: str, pipe: EscritasAgrupadas = None, **contribuicao) -> Any:
+        """
+        Retorna SEM_ESTADO, None (faltam ramos) ou o dict com as contribuições
+        de todos os ramos quando cabe a este ramo consolidar.
+        Com `pipe`, as escritas já enfileiradas nele vão na mesma ida ao Redis. Falha delas só vai
+        para o log: se derrubasse o ramo, a consolidação já reservada pelo script se perderia.
+        """
+        args = [ramo, self.ttl_s]
+        for campo, valor in contribuicao.items():
+            args += [campo, codificar(valor)]
+        if pipe is None:
+            resposta = self._script(keys=[self._chave(origem_id)], args=args)
+        else:
+            indice = pipe.script(self._script, [self._chave(origem_id)], args)
+            resposta = pipe.executar(a_partir_de=indice)[0]
+
+        if resposta == SEM_ESTADO:
+            return SEM_ESTADO
+        if not resposta:
+            return None
+
+        estado: Dict[str, Any] = {}
+        for campo, valor in zip(resposta[::2], resposta[1::2]):
+            campo = campo.decode()
+            # Campos de controle ficam de fora; o resto são contribuições dos ramos
+            if campo in ('pendentes', 'consolidando') or campo.startswith('ramo:'):
+                continue
+            estado[campo] = decodificar(valor)
+        logger.info(f"🧩 Ramo '{ramo}' foi o último de {origem_id}: consolidando")
+        return estado
+
+    def liberar_consolidacao(self, origem_id):
+        self.redis.hdel(self._chave(origem_id), 'consolidando')
+
+    def finalizar(self, origem_id):
+        self.redis.delete(self._chave(origem_id))
@@ -0,0 +1,214 @@
+"""Classes de fila da detecção (interativo x lote) e métricas das filas: espera, idade e tempo de serviço"""
+import os
+import math
+import time
+import logging
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+# Configuração de Logs
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger("FILAS")
+
+CLASSE_INTERATIVO = 'interativo'
+CLASSE_LOTE = 'lote'
+
+# Filas separadas (e não x-max-priority): trocar os argumentos de uma fila já
+# declarada no RabbitMQ exige recriá-la, e 'deteccao' continua sendo a interativa.
+FILAS_POR_CLASSE = {
+    CLASSE_INTERATIVO: os.getenv('SIGILO_FILA_INTERATIVA', 'deteccao'),
+    CLASSE_LOTE: os.getenv('SIGILO_FILA_LOTE', 'deteccao_lote'),
+}
+
+# Quem chama com estas roles vai para o lote, salvo cabeçalho explícito
+ROLES_LOTE = {r.strip() for r in os.getenv('SIGILO_ROLES_LOTE', 'integracao').split(',') if r.strip()}
+CABECALHO_CLASSE = 'X-Sigilo-Classe'
+
+# Com backlog interativo, o worker que consome as duas classes para de consumir o lote
+# (cancela o consumidor de 'deteccao_lote'); volta depois de LOTE_RETOMAR_LEITURAS leituras
+# seguidas sem backlog. As mensagens de lote ficam na fila: nada é confirmado e republicado.
+LOTE_PAUSA_INTERVALO_S = float(os.getenv('SIGILO_LOTE_PAUSA_INTERVALO_S', '1'))
+LOTE_RETOMAR_LEITURAS = int(os.getenv('SIGILO_LOTE_RETOMAR_LEITURAS', '3'))
+# Profundidade da fila interativa é consultada no broker no máximo uma vez por intervalo
+PROFUNDIDADE_CACHE_S = float(os.getenv('SIGILO_FILA_PROFUNDIDADE_CACHE_S', '1'))
+
+AMOSTRAS_ESPERA = int(os.getenv('SIGILO_FILA_AMOSTRAS', '1000'))
+SLA_INTERATIVO_S = float(os.getenv('SIGILO_SLA_INTERATIVO_S', '5'))
+
+# Mensagens publicadas há mais que isso saem do índice de idade (perdidas/purgadas no broker)
+IDADE_MAX_S = float(os.getenv('SIGILO_FILA_IDADE_MAX_S', '3600'))
+# Espera aceitável numa fila antes de sugerir mais processos (dica de escala e autoscaler)
+ALVO_ESPERA_S = float(os.getenv('SIGILO_AUTOSCALE_ALVO_S', '5'))
+
+
+def classe_do_pedido(user: dict, cabecalho: Optional[str] = None) -> str:
+    """Cabeçalho X-Sigilo-Classe (interativo|lote) tem precedência; senão decide pela role"""
+    if cabecalho:
+        cabecalho = cabecalho.strip().lower()
+        if cabecalho in FILAS_POR_CLASSE:
+            return cabecalho
+    if any(r in ROLES_LOTE for r in user.get('roles', [])):
+        return CLASSE_LOTE
+    return CLASSE_INTERATIVO
+
+
+_profundidades: Dict[str, Tuple[float, int]] = {}
+
+
+def profundidade_fila(celery_app, fila: str, max_idade_s: float = PROFUNDIDADE_CACHE_S) -> Optional[int]:
+    """Mensagens prontas na fila (queue_declare passivo), com cache curto por processo"""
+    agora = time.monotonic()
+    cache = _profundidades.get(fila)
+    if cache and agora - cache[0] < max_idade_s:
+        return cache[1]
+    try:
+        # Conexão própria: um declare passivo numa fila inexistente derruba o canal/conexão
+        with celery_app.connection_for_read() as conn:
+            total = conn.default_channel.queue_declare(queue=fila, passive=True).message_count
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível ler a profundidade da fila '{fila}': {e}")
+        return None
+    _profundidades[fila] = (agora, total)
+    return total
+
+
+class PausaLote:
+    """
+    Decide quando pausar e retomar o consumo da fila de lote pela profundidade da interativa.
+
+    Pausa na primeira leitura com backlog; só retoma depois de `retomar_leituras` leituras
+    seguidas sem backlog, para não alternar o consumidor a cada mensagem interativa.
+    Leitura indisponível (None) mantém o estado atual.
+    """
+
+    def __init__(self, retomar_leituras: int = LOTE_RETOMAR_LEITURAS):
+        self.retomar_leituras = max(1, retomar_leituras)
+        self.pausado = False
+        self._sem_backlog = 0
+
+    def avaliar(self, backlog: Optional[int]) -> Optional[str]:
+        """'pausar', 'retomar' ou None (nada muda)"""
+        if backlog is None:
+            return None
+        if backlog > 0:
+            self._sem_backlog = 0
+            if not self.pausado:
+                self.pausado = True
+                return 'pausar'
+            return None
+        self._sem_backlog += 1
+        if self.pausado and self._sem_backlog >= self.retomar_leituras:
+            self.pausado = False
+            return 'retomar'
+        return None
+
+
+def percentil(valores_ordenados: List[float], p: float) -> Optional[float]:
+    if not valores_ordenados:
+        return None
+    indice = min(len(valores_ordenados) - 1, int(round(p / 100 * (len(valores_ordenados) - 1))))
+    return valores_ordenados[indice]
+
+
+def sugestao_escala(profundidade: Optional[int], idade_s: float, espera_estimada_s: Optional[float],
+                    alvo_s: float = ALVO_ESPERA_S) -> str:
+    """'aumentar' se a fila já atrasa (ou vai atrasar) além do alvo, 'reduzir' se está ociosa"""
+    if idade_s > alvo_s or (espera_estimada_s or 0) > alvo_s:
+        return 'aumentar'
+    if not profundidade and idade_s == 0:
+        return 'reduzir'
+    return 'manter'
+
+
+class MetricasFila:
+    """
+    Métricas das filas no Redis, compartilhadas por API e workers; percentis calculados na leitura.
+
+    - fila:espera:{classe}   últimas esperas (enfileiramento na API -> início) da detecção, por classe
+    - fila:servico:{fila}    últimos tempos de execução das tarefas de cada fila
+    - fila:pendentes:{fila}  zset task_id -> instante de publicação; o menor score é a mensagem mais antiga
+    """
+
+    def __init__(self, redis_client, amostras: int = AMOSTRAS_ESPERA):
+        self.redis = redis_client
+        self.amostras = amostras
+
+    def registrar_espera(self, classe: str, espera_s: float):
+        chave = f"fila:espera:{classe}"
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.lpush(chave, round(max(espera_s, 0.0), 4))
+        pipe.ltrim(chave, 0, self.amostras - 1)
+        pipe.execute()
+
+    def resumo(self, classe: str) -> Dict[str, Any]:
+        esperas = sorted(float(v) for v in self.redis.lrange(f"fila:espera:{classe}", 0, -1))
+        sla = SLA_INTERATIVO_S if classe == CLASSE_INTERATIVO else None
+        dentro_sla = None
+        if sla is not None and esperas:
+            dentro_sla = round(100 * sum(1 for e in esperas if e <= sla) / len(esperas), 2)
+        return {
+            'classe': classe,
+            'fila': FILAS_POR_CLASSE[classe],
+            'amostras': len(esperas),
+            'espera_p50_s': percentil(esperas, 50),
+            'espera_p95_s': percentil(esperas, 95),
+            'espera_p99_s': percentil(esperas, 99),
+            'sla_s': sla,
+            'dentro_sla_pct': dentro_sla,
+        }
+
+    def registrar_publicacao(self, fila: str, task_id: str):
+        agora = time.time()
+        chave = f"fila:pendentes:{fila}"
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zadd(chave, {task_id: agora})
+        pipe.zremrangebyscore(chave, '-inf', agora - IDADE_MAX_S)
+        pipe.execute()
+
+    def registrar_inicio(self, fila: str, task_id: str):
+        self.redis.zrem(f"fila:pendentes:{fila}", task_id)
+
+    def registrar_servico(self, fila: str, duracao_s: float):
+        chave = f"fila:servico:{fila}"
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.lpush(chave, round(max(duracao_s, 0.0), 4))
+        pipe.ltrim(chave, 0, self.amostras - 1)
+        pipe.execute()
+
+    def idade_mais_antiga(self, fila: str) -> float:
+        """Segundos desde a publicação da mensagem mais antiga ainda não iniciada (0 se nenhuma)"""
+        mais_antiga = self.redis.zrange(f"fila:pendentes:{fila}", 0, 0, withscores=True)
+        if not mais_antiga:
+            return 0.0
+        return round(max(time.time() - mais_antiga[0][1], 0.0), 3)
+
+    def estado_fila(self, fila: str, profundidade: Optional[int], processos: Optional[int] = None) -> Dict[str, Any]:
+        servicos = sorted(float(v) for v in self.redis.lrange(f"fila:servico:{fila}", 0, -1))
+        servico_p50 = percentil(servicos, 50)
+        idade = self.idade_mais_antiga(fila)
+        # Tempo para esvaziar a fila no ritmo atual (processos = consumidores conhecidos; 1 se não souber)
+        espera_estimada = None
+        if profundidade is not None and servico_p50 is not None:
+            espera_estimada = round(profundidade * servico_p50 / max(processos or 1, 1), 3)
+        return {
+            'fila': fila,
+            'profundidade': profundidade,
+            'idade_mais_antiga_s': idade,
+            'amostras_servico': len(servicos),
+            'servico_p50_s': servico_p50,
+            'servico_p95_s': percentil(servicos, 95),
+            'espera_estimada_s': espera_estimada,
+            'sugestao': sugestao_escala(profundidade, idade, espera_estimada),
+        }
+
+    def processos_para_alvo(self, fila: str, profundidade: int, alvo_s: float = ALVO_ESPERA_S) -> Optional[int]:
+        """Processos necessários para esvaziar `profundidade` mensagens dentro do alvo (None sem amostras)"""
+        servicos = sorted(float(v) for v in self.redis.lrange(f"fila:servico:{fila}", 0, -1))
+        servico_p50 = percentil(servicos, 50)
+        if servico_p50 is None:
+            return None
+        return math.ceil(profundidade * servico_p50 / max(alvo_s, 0.001))
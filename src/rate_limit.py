@@ -0,0 +1,123 @@
+"""Rate limiting distribuído (token bucket no Redis) por usuário IAM"""
+from fastapi import HTTPException, Depends, Response, status
+from src.iam.iam_man import get_current_user
+from typing import Dict, Tuple
+import redis
+import os
+import math
+import logging
+import sys
+
+# Configuração de Logs
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger("RATE_LIMIT")
+
+# Token bucket atômico. Usa o relógio do próprio Redis (TIME) para que todas as
+# réplicas da API enxerguem o mesmo tempo.
+# KEYS[1] = chave do bucket | ARGV = capacidade, tokens/s, custo
+# Retorna {permitido, tokens_restantes, retry_after_ms}
+TOKEN_BUCKET_LUA = """
+local capacidade = tonumber(ARGV[1])
+local taxa = tonumber(ARGV[2])
+local custo = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local agora = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local estado = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(estado[1])
+local ts = tonumber(estado[2])
+if tokens == nil then
+    tokens = capacidade
+    ts = agora
+end
+
+tokens = math.min(capacidade, tokens + (agora - ts) * taxa / 1000)
+local permitido = 0
+local espera = 0
+if tokens >= custo then
+    tokens = tokens - custo
+    permitido = 1
+else
+    espera = math.ceil((custo - tokens) * 1000 / taxa)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', agora)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacidade * 1000 / taxa) + 1000)
+return {permitido, math.floor(tokens), espera}
+"""
+
+_PERIODOS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def _parse_limite(limite: str) -> Tuple[int, float]:
+    """'10/minute' -> (capacidade=10, tokens_por_segundo=10/60)"""
+    quantidade, periodo = limite.strip().split('/')
+    quantidade = int(quantidade)
+    return quantidade, quantidade / _PERIODOS[periodo.strip()]
+
+
+def _parse_tiers(config: str) -> Dict[str, Tuple[int, float]]:
+    """'user=10/minute,admin=60/minute' -> {role: (capacidade, taxa)}"""
+    tiers = {}
+    for item in config.split(','):
+        if item.strip():
+            role, limite = item.split('=', 1)
+            tiers[role.strip()] = _parse_limite(limite)
+    return tiers
+
+
+class RateLimiter:
+    """
+    Dependência FastAPI: um bucket por (escopo, sub) no Redis.
+    O tier vem da role mais generosa do usuário; sem role conhecida usa 'user'.
+    Se o Redis falhar, a requisição passa (fail open) para não derrubar a API.
+    """
+
+    def __init__(self, escopo: str, tiers: str = None):
+        self.escopo = escopo
+        self.tiers = _parse_tiers(tiers or os.getenv(
+            'SIGILO_RATE_LIMIT_TIERS',
+            'user=10/minute,admin=60/minute,integracao=600/minute'
+        ))
+        self.redis = redis.from_url(os.getenv('REDIS_URL', 'redis://sigilo-redis:6379/0'))
+        self._script = self.redis.register_script(TOKEN_BUCKET_LUA)
+
+    def _tier(self, user: dict) -> Tuple[int, float]:
+        candidatos = [self.tiers[r] for r in user.get('roles', []) if r in self.tiers]
+        if not candidatos:
+            return self.tiers.get('user', next(iter(self.tiers.values())))
+        return max(candidatos, key=lambda t: t[1])
+
+    def __call__(self, response: Response, user: dict = Depends(get_current_user)) -> dict:
+        capacidade, taxa = self._tier(user)
+        sub = user.get('sub') or user.get('email') or 'unknown'
+
+        try:
+            permitido, restantes, espera_ms = self._script(
+                keys=[f"ratelimit:{self.escopo}:{sub}"],
+                args=[capacidade, taxa, 1]
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Rate limit indisponível (Redis): {e}")
+            return user
+
+        response.headers['X-RateLimit-Limit'] = str(capacidade)
+        response.headers['X-RateLimit-Remaining'] = str(restantes)
+
+        if not permitido:
+            retry_after = max(1, math.ceil(espera_ms / 1000))
+            logger.warning(f"🚦 Rate limit excedido para {sub} em '{self.escopo}' (retry em {retry_after}s)")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Limite de requisições excedido. Tente novamente em {retry_after}s.",
+                headers={
+                    'Retry-After': str(retry_after),
+                    'X-RateLimit-Limit': str(capacidade),
+                    'X-RateLimit-Remaining': '0',
+                }
+            )
+        return user
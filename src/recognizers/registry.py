@@ -0,0 +1,209 @@
+"""Registro de reconhecedores por regex carregados de pacotes de padrões (JSON/YAML)"""
+import os
+import re
+import json
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Set
+from src.recognizers.validadores import VALIDADORES
+
+logger = logging.getLogger("DETECTOR")
+
+PACKS_DIR = os.path.join(os.path.dirname(__file__), 'packs')
+PACKS_PADRAO = 'br_documentos,br_contextual'
+
+
+class PatternRecognizer:
+    """Um padrão pré-compilado, com contadores de acertos e tempo gasto"""
+
+    __slots__ = ('nome', 'pack', 'familia', 'entidade', 'regex', 'grupo', 'confianca',
+                 'validador', 'confianca_valido', 'confianca_invalido', 'manter_formatado', 'contexto',
+                 'gatilhos', 'hits', 'tempo_ns', 'chamadas', 'validados', 'rejeitados', 'drenado')
+
+    def __init__(self, pack: str, spec: Dict):
+        flags = 0
+        for flag in spec.get('flags', []):
+            flags |= getattr(re, flag)
+
+        self.nome = spec['nome']
+        self.pack = pack
+        self.familia = spec['familia']
+        self.entidade = spec['entidade']
+        self.regex = re.compile(spec['padrao'], flags)
+        self.grupo = spec.get('grupo', 0)
+        # Trechos que todo match contém (casefold); vazio = sempre executa
+        self.gatilhos = tuple(g.casefold() for g in spec.get('gatilhos', []))
+        self.confianca = spec['confianca']
+
+        # Validação opcional por dígito verificador (ver _aplicar_validacao)
+        validacao = spec.get('validacao') or {}
+        self.validador = VALIDADORES[validacao['funcao']] if validacao else None
+        self.confianca_valido = validacao.get('confianca_valido', self.confianca)
+        self.confianca_invalido = validacao.get('confianca_invalido')
+        self.manter_formatado = validacao.get('manter_formatado', True)
+        self.contexto = tuple(p.lower() for p in validacao.get('contexto', []))
+
+        self.hits = 0
+        self.tempo_ns = 0
+        self.chamadas = 0
+        self.validados = 0
+        self.rejeitados = 0
+        # Contadores já entregues por PatternRegistry.drenar (chamadas, hits, tempo_ns, rejeitados)
+        self.drenado = (0, 0, 0, 0)
+
+    @property
+    def chave(self) -> str:
+        return f"{self.pack}.{self.nome}"
+
+    def confianca_para(self, text: str, start: int, valor: str) -> Optional[float]:
+        """
+        Confiança do match após validação; None = descartar.
+
+        Dígito verificador correto sobe a confiança. Incorreto:
+        - mantém com confiança baixa se o valor está formatado (pontos, traços, espaços)
+          e o pacote permite, ou se uma palavra de contexto aparece logo antes;
+        - caso contrário descarta (ex: 11 dígitos soltos de um número de protocolo).
+        """
+        if self.validador is None:
+            return self.confianca
+        if self.validador(valor):
+            self.validados += 1
+            return self.confianca_valido
+
+        formatado = not valor.isdigit()
+        if self.confianca_invalido is not None:
+            if formatado and self.manter_formatado:
+                return self.confianca_invalido
+            if self.contexto:
+                # A palavra precisa se referir a ESTE número: perto e sem outro número no meio
+                anterior = text[max(0, start - 20):start].lower()
+                for palavra in self.contexto:
+                    pos = anterior.rfind(palavra)
+                    if pos != -1 and not any(c.isdigit() for c in anterior[pos + len(palavra):]):
+                        return self.confianca_invalido
+        self.rejeitados += 1
+        return None
+
+    def registrar(self, hits: int, tempo_ns: int):
+        self.hits += hits
+        self.tempo_ns += tempo_ns
+        self.chamadas += 1
+
+    def stats(self) -> Dict:
+        return {
+            'recognizer': self.chave,
+            'entidade': self.entidade,
+            'chamadas': self.chamadas,
+            'hits': self.hits,
+            'rejeitados_validacao': self.rejeitados,
+            'tempo_total_ms': round(self.tempo_ns / 1e6, 3),
+            'tempo_medio_us': round(self.tempo_ns / 1e3 / self.chamadas, 2) if self.chamadas else 0.0,
+        }
+
+
+class PatternRegistry:
+    """
+    Carrega pacotes de padrões (um arquivo por pacote) e os compila uma única vez.
+
+    Pacotes habilitados vêm de SIGILO_PATTERN_PACKS (ordem = precedência dentro de cada
+    família); arquivos são procurados em SIGILO_PATTERN_PACKS_DIR e depois nos pacotes
+    embutidos. YAML é aceito se o PyYAML estiver instalado.
+    """
+
+    def __init__(self, packs: Optional[str] = None, diretorio: Optional[str] = None):
+        packs = packs if packs is not None else os.getenv('SIGILO_PATTERN_PACKS', PACKS_PADRAO)
+        diretorio = diretorio if diretorio is not None else os.getenv('SIGILO_PATTERN_PACKS_DIR')
+        self.diretorios = [d for d in (diretorio, PACKS_DIR) if d]
+        self.recognizers: List[PatternRecognizer] = []
+        self._por_chave: Dict[str, PatternRecognizer] = {}
+        self._lock_drenagem = threading.Lock()
+        self._por_familia: Dict[str, List[PatternRecognizer]] = {}
+        self._por_gatilho: Dict[str, List[PatternRecognizer]] = {}
+        self._sem_gatilho: Set[PatternRecognizer] = set()
+
+        for nome in (p.strip() for p in packs.split(',')):
+            if nome:
+                self.carregar_pack(nome)
+
+    def _localizar(self, nome: str) -> str:
+        for diretorio in self.diretorios:
+            for ext in ('.json', '.yaml', '.yml'):
+                caminho = os.path.join(diretorio, nome + ext)
+                if os.path.exists(caminho):
+                    return caminho
+        raise FileNotFoundError(f"Pacote de padrões '{nome}' não encontrado em {self.diretorios}")
+
+    def carregar_pack(self, nome: str):
+        caminho = self._localizar(nome)
+        with open(caminho, encoding='utf-8') as f:
+            if caminho.endswith('.json'):
+                pack = json.load(f)
+            else:
+                import yaml
+                pack = yaml.safe_load(f)
+
+        inicio = time.perf_counter()
+        for spec in pack['recognizers']:
+            rec = PatternRecognizer(pack.get('nome', nome), spec)
+            self.recognizers.append(rec)
+            self._por_chave[rec.chave] = rec
+            self._por_familia.setdefault(rec.familia, []).append(rec)
+            for gatilho in rec.gatilhos:
+                self._por_gatilho.setdefault(gatilho, []).append(rec)
+            if not rec.gatilhos:
+                self._sem_gatilho.add(rec)
+        logger.info(
+            f"   🧩 Pacote '{nome}': {len(pack['recognizers'])} padrões compilados "
+            f"em {(time.perf_counter() - inicio) * 1000:.1f}ms"
+        )
+
+    def ativos(self, text: str) -> Set[PatternRecognizer]:
+        """
+        Pré-filtro: reconhecedores que podem casar com o texto.
+
+        Uma cópia casefold do texto e uma busca de substring por gatilho distinto
+        (mais rápido que uma alternação única em regex, que precisaria de lookahead
+        para achar gatilhos sobrepostos).
+        """
+        ativos = set(self._sem_gatilho)
+        if self._por_gatilho:
+            folded = text.casefold()
+            for gatilho, recs in self._por_gatilho.items():
+                if gatilho in folded:
+                    ativos.update(recs)
+        return ativos
+
+    def familia(self, familia: str) -> List[PatternRecognizer]:
+        return self._por_familia.get(familia, [])
+
+    def stats(self) -> List[Dict]:
+        """Acertos e tempo por reconhecedor, do mais caro para o mais barato"""
+        return sorted((r.stats() for r in self.recognizers), key=lambda s: s['tempo_total_ms'], reverse=True)
+
+    def drenar(self) -> Dict[str, List[int]]:
+        """
+        Contadores acumulados desde a drenagem anterior, só dos reconhecedores que mudaram:
+        {recognizer: [chamadas, hits, tempo_ns, rejeitados]}. Alimenta as métricas Prometheus
+        e leva ao processo pai o que os filhos do pool de detecção contaram (ver acumular).
+        """
+        deltas = {}
+        with self._lock_drenagem:
+            for rec in self.recognizers:
+                atual = (rec.chamadas, rec.hits, rec.tempo_ns, rec.rejeitados)
+                if atual != rec.drenado:
+                    deltas[rec.chave] = [a - d for a, d in zip(atual, rec.drenado)]
+                    rec.drenado = atual
+        return deltas
+
+    def acumular(self, deltas: Dict[str, List[int]]):
+        """Soma os contadores drenados em outro processo (entram na próxima drenagem deste)"""
+        with self._lock_drenagem:
+            for chave, (chamadas, hits, tempo_ns, rejeitados) in deltas.items():
+                rec = self._por_chave.get(chave)
+                if rec is None:
+                    continue
+                rec.chamadas += chamadas
+                rec.hits += hits
+                rec.tempo_ns += tempo_ns
+                rec.rejeitados += rejeitados
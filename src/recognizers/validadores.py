@@ -0,0 +1,101 @@
+"""Dígitos verificadores de documentos brasileiros, Luhn e plano de numeração telefônica (sem dependências)"""
+from typing import Callable, Dict, List
+
+_PESOS_CPF_1 = tuple(range(10, 1, -1))
+_PESOS_CPF_2 = tuple(range(11, 1, -1))
+_PESOS_CNPJ_1 = (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)
+_PESOS_CNPJ_2 = (6,) + _PESOS_CNPJ_1
+_PESOS_PIS = (3, 2, 9, 8, 7, 6, 5, 4, 3, 2)
+_PESOS_TITULO = (2, 3, 4, 5, 6, 7, 8, 9)
+# Luhn: valor de cada dígito quando dobrado (já com a soma dos algarismos)
+_LUHN_DOBRO = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+
+
+def _digitos(valor: str) -> List[int]:
+    return [ord(c) - 48 for c in valor if '0' <= c <= '9']
+
+
+def _soma(digitos: List[int], pesos: tuple) -> int:
+    return sum(d * p for d, p in zip(digitos, pesos))
+
+
+def cpf_valido(valor: str) -> bool:
+    d = _digitos(valor)
+    if len(d) != 11 or d.count(d[0]) == 11:
+        return False
+    dv1 = _soma(d, _PESOS_CPF_1) * 10 % 11 % 10
+    dv2 = _soma(d, _PESOS_CPF_2) * 10 % 11 % 10
+    return d[9] == dv1 and d[10] == dv2
+
+
+def cnpj_valido(valor: str) -> bool:
+    d = _digitos(valor)
+    if len(d) != 14 or d.count(d[0]) == 14:
+        return False
+    resto = _soma(d, _PESOS_CNPJ_1) % 11
+    dv1 = 0 if resto < 2 else 11 - resto
+    resto = _soma(d, _PESOS_CNPJ_2) % 11
+    dv2 = 0 if resto < 2 else 11 - resto
+    return d[12] == dv1 and d[13] == dv2
+
+
+def luhn_valido(valor: str) -> bool:
+    d = _digitos(valor)
+    if len(d) < 12:
+        return False
+    total = sum(d[-1::-2]) + sum(_LUHN_DOBRO[x] for x in d[-2::-2])
+    return total % 10 == 0
+
+
+def pis_valido(valor: str) -> bool:
+    d = _digitos(valor)
+    if len(d) != 11 or d.count(d[0]) == 11:
+        return False
+    dv = 11 - _soma(d, _PESOS_PIS) % 11
+    return d[10] == (0 if dv >= 10 else dv)
+
+
+def titulo_eleitor_valido(valor: str) -> bool:
+    d = _digitos(valor)
+    if len(d) != 12:
+        return False
+    uf = d[8] * 10 + d[9]
+    if not 1 <= uf <= 28:
+        return False
+    # SP (01) e MG (02): resto 0 vira dígito 1
+    sp_mg = uf in (1, 2)
+    resto = _soma(d, _PESOS_TITULO) % 11
+    dv1 = 1 if (resto == 0 and sp_mg) else resto % 10
+    resto = (d[8] * 7 + d[9] * 8 + dv1 * 9) % 11
+    dv2 = 1 if (resto == 0 and sp_mg) else resto % 10
+    return d[10] == dv1 and d[11] == dv2
+
+
+# DDDs em uso (plano de numeração da Anatel)
+_DDDS = frozenset((
+    11, 12, 13, 14, 15, 16, 17, 18, 19, 21, 22, 24, 27, 28, 31, 32, 33, 34, 35, 37, 38,
+    41, 42, 43, 44, 45, 46, 47, 48, 49, 51, 53, 54, 55, 61, 62, 63, 64, 65, 66, 67, 68, 69,
+    71, 73, 74, 75, 77, 79, 81, 82, 83, 84, 85, 86, 87, 88, 89, 91, 92, 93, 94, 95, 96, 97, 98, 99,
+))
+
+
+def telefone_valido(valor: str) -> bool:
+    """DDD existente + celular (9 e 8 dígitos) ou fixo (começa em 2-5, 8 dígitos)"""
+    d = _digitos(valor)
+    if len(d) in (12, 13) and d[0] == 5 and d[1] == 5:
+        d = d[2:]
+    if len(d) not in (10, 11) or d[0] * 10 + d[1] not in _DDDS:
+        return False
+    if len(d) == 11:
+        return d[2] == 9
+    return 2 <= d[2] <= 5
+
+
+VALIDADORES: Dict[str, Callable[[str], bool]] = {
+    'cpf': cpf_valido,
+    'cnpj': cnpj_valido,
+    'luhn': luhn_valido,
+    'pis': pis_valido,
+    'titulo_eleitor': titulo_eleitor_valido,
+    'telefone': telefone_valido,
+}
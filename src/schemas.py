@@ -3,13 +3,17 @@ from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from uuid import UUID
+import os
+
+# Textos longos são analisados em chunks pelo detector, então o limite pode ser alto
+TEXTO_MAX_CHARS = int(os.getenv('SIGILO_TEXTO_MAX_CHARS', '200000'))
 
 class PedidoLAIInput(BaseModel):
     """Input do pedido LAI"""
     texto: str = Field(
         ..., 
         min_length=10, 
-        max_length=10000,
+        max_length=TEXTO_MAX_CHARS,
         description="Texto integral do pedido de acesso à informação.",
         examples=["Solicito cópia do contrato 123/2023. Meu nome é João Silva, CPF 123.456.789-00."]
     )
@@ -46,7 +50,8 @@ class StatusResponse(BaseModel):
     status: str = Field(..., description="processing, completed, error")
     step: Optional[str] = Field(None, description="Etapa atual (ex: detecting, saving, generating_summary)")
     progress: int = Field(0, description="Progresso estimado (0-100)")
-    result: Optional[Dict[str, Any]] = Field(None, description="Resultado final (apenas quando status=completed)")
+    result: Optional[Dict[str, Any]] = Field(None, description="Resultado inline (apenas status legados ou erro); use result_url")
+    result_url: Optional[str] = Field(None, description="Endpoint do resultado final (apenas quando status=completed)")
     error: Optional[str] = None
     updated_at: datetime
 
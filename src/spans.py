@@ -0,0 +1,62 @@
+"""Representação compacta das entidades detectadas (Span)"""
+from typing import Any, Dict, Iterable, List
+
+# Ordem dos campos na forma compacta (tupla/lista) usada nas mensagens do Celery
+CAMPOS_SPAN = ('type', 'value', 'start', 'end', 'confidence', 'method')
+
+
+class Span:
+    """
+    Entidade detectada no texto.
+
+    Usa __slots__ (sem __dict__ por instância): é o tipo usado em todas as camadas
+    do detector. Conversão para dict só na borda (banco/API) e para lista compacta
+    nas mensagens entre tarefas.
+    """
+
+    __slots__ = CAMPOS_SPAN
+
+    def __init__(self, type: str, value: str, start: int, end: int, confidence: float, method: str):
+        self.type = type
+        self.value = value
+        self.start = start
+        self.end = end
+        self.confidence = confidence
+        self.method = method
+
+    def __repr__(self) -> str:
+        return f"Span({self.type}, {self.start}:{self.end}, {self.confidence:.2f}, {self.method})"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Span) and self.to_tuple() == other.to_tuple()
+
+    __hash__ = None
+
+    def to_tuple(self) -> tuple:
+        return (self.type, self.value, self.start, self.end, self.confidence, self.method)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(zip(CAMPOS_SPAN, self.to_tuple()))
+
+    @classmethod
+    def from_compacto(cls, item) -> 'Span':
+        """Aceita a forma compacta (lista/tupla) e o dict legado (mensagens antigas na fila)"""
+        if isinstance(item, dict):
+            return cls(*(item[c] for c in CAMPOS_SPAN))
+        return cls(*item)
+
+    def __reduce__(self):
+        # Pickle enxuto para o pool de processos (sem o estado genérico de __slots__)
+        return (Span, self.to_tuple())
+
+
+def spans_para_compacto(spans: Iterable[Span]) -> List[tuple]:
+    return [s.to_tuple() for s in spans]
+
+
+def spans_de_compacto(itens: Iterable) -> List[Span]:
+    return [Span.from_compacto(i) for i in itens]
+
+
+def spans_para_dicts(spans: Iterable[Span]) -> List[Dict[str, Any]]:
+    return [s.to_dict() for s in spans]
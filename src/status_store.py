@@ -0,0 +1,266 @@
+"""Status dos pedidos no Redis: hash por pedido, merge monotônico e codec versionado"""
+import json
+import os
+import hashlib
+import logging
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis.exceptions import NoScriptError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Configuração de Logs
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger("STATUS")
+
+# Valores msgpack começam com este marcador (nenhum JSON começa com \x00).
+# Valores sem marcador são JSON: gravados por versões antigas ou pelo codec json/orjson.
+MARCADOR_MSGPACK_V1 = b'\x00m1'
+
+STATUS_TTL_S = int(os.getenv('SIGILO_STATUS_TTL_S', '3600'))
+# Resultado final fica numa chave própria (resultado:{id}), lida uma vez pelo cliente
+RESULTADO_TTL_S = int(os.getenv('SIGILO_RESULTADO_TTL_S', '86400'))
+
+
+def _codec_configurado() -> str:
+    codec = os.getenv('SIGILO_STATUS_CODEC', 'orjson')
+    if codec == 'msgpack' and msgpack is None:
+        logger.warning("⚠️ SIGILO_STATUS_CODEC=msgpack sem msgpack instalado. Usando JSON.")
+        codec = 'orjson'
+    if codec == 'orjson' and orjson is None:
+        codec = 'json'
+    return codec
+
+
+CODEC = _codec_configurado()
+
+
+def codificar(valor: Any) -> bytes:
+    """
+    Serializa um valor de status. orjson gera JSON comum (legível por qualquer versão);
+    msgpack só deve ser ligado quando todas as réplicas da API já lerem o marcador.
+    """
+    if CODEC == 'msgpack':
+        return MARCADOR_MSGPACK_V1 + msgpack.packb(valor, default=str)
+    if CODEC == 'orjson':
+        return orjson.dumps(valor, default=str)
+    return json.dumps(valor, default=str).encode()
+
+
+def decodificar(bruto: Optional[bytes]) -> Any:
+    """Lê qualquer formato já gravado (JSON legado, orjson ou msgpack com marcador)"""
+    if bruto is None:
+        return None
+    if isinstance(bruto, str):
+        bruto = bruto.encode()
+    if bruto.startswith(MARCADOR_MSGPACK_V1):
+        if msgpack is None:
+            raise ValueError("Status gravado em msgpack, mas msgpack não está instalado")
+        return msgpack.unpackb(bruto[len(MARCADOR_MSGPACK_V1):])
+    if orjson is not None:
+        return orjson.loads(bruto)
+    return json.loads(bruto)
+
+
+def calcular_etag(corpo: bytes) -> str:
+    return '"' + hashlib.sha256(corpo).hexdigest()[:32] + '"'
+
+
+def para_json(bruto: bytes) -> bytes:
+    """Corpo JSON de um valor gravado; valores já em JSON são devolvidos sem re-serializar"""
+    if not bruto.startswith(MARCADOR_MSGPACK_V1):
+        return bruto
+    valor = decodificar(bruto)
+    return orjson.dumps(valor, default=str) if orjson is not None else json.dumps(valor, default=str).encode()
+
+
+# Merge monotônico do status (hash status:{id}).
+# KEYS[1] = chave | ARGV = ttl, progresso, status, campo1, valor1, ...
+# - progresso nunca regride (ramos paralelos do group não se sobrescrevem)
+# - estados terminais (completed/error) só são trocados por outro terminal; completed é final
+# - valor legado (string JSON inteira) é substituído pelo hash
+# Retorna 1 se aplicou, 0 se a atualização era antiga e foi descartada
+ATUALIZAR_STATUS_LUA = """
+local chave = KEYS[1]
+local progresso = tonumber(ARGV[2])
+local novo_status = ARGV[3]
+local terminal = {completed = true, error = true}
+
+if redis.call('TYPE', chave).ok == 'string' then
+    redis.call('DEL', chave)
+end
+
+local atual = redis.call('HMGET', chave, 'status', 'progress')
+if atual[1] == 'completed' and novo_status ~= 'completed' then
+    return 0
+end
+if not terminal[novo_status] then
+    if atual[1] and terminal[atual[1]] then
+        return 0
+    end
+    if progresso < (tonumber(atual[2]) or -1) then
+        return 0
+    end
+end
+
+redis.call('HSET', chave, 'status', novo_status, 'progress', progresso, unpack(ARGV, 4))
+redis.call('EXPIRE', chave, tonumber(ARGV[1]))
+return 1
+"""
+
+
+class EscritasAgrupadas:
+    """
+    Pipeline para juntar escritas de módulos diferentes (status, estado do pipeline) numa ida ao Redis.
+
+    Scripts entram como EVALSHA direto: com o Script do redis-py como client, cada execute()
+    mandaria antes um SCRIPT EXISTS, e o agrupamento não economizaria nada. Se o Redis perdeu
+    os scripts (reinício), só os comandos que voltaram NOSCRIPT rodam de novo, pelo Script.
+    """
+
+    def __init__(self, redis_client, transaction: bool = False):
+        self.pipe = redis_client.pipeline(transaction=transaction)
+        self._scripts: Dict[int, Tuple[Any, list, list]] = {}
+
+    def __len__(self) -> int:
+        return len(self.pipe)
+
+    def __getattr__(self, nome):
+        # Comandos comuns (setex, hset, expire...) vão direto ao pipeline
+        return getattr(self.pipe, nome)
+
+    def script(self, script, keys: list, args: list) -> int:
+        """Enfileira o script; devolve a posição da resposta"""
+        indice = len(self.pipe)
+        self._scripts[indice] = (script, keys, args)
+        self.pipe.evalsha(script.sha, len(keys), *keys, *args)
+        return indice
+
+    def executar(self, a_partir_de: int = 0) -> List[Any]:
+        """
+        Executa tudo e devolve as respostas a partir de `a_partir_de`, levantando a primeira falha entre elas.
+        Falhas dos comandos anteriores (escritas de outro módulo agrupadas aqui) só vão para o log.
+        """
+        respostas = self.pipe.execute(raise_on_error=False)
+        for indice, (script, keys, args) in self._scripts.items():
+            if isinstance(respostas[indice], NoScriptError):
+                try:
+                    respostas[indice] = script(keys=keys, args=args)
+                except Exception as e:
+                    respostas[indice] = e
+        for resposta in respostas[:a_partir_de]:
+            if isinstance(resposta, Exception):
+                logger.error(f"❌ Escrita agrupada no Redis falhou: {resposta}")
+        for resposta in respostas[a_partir_de:]:
+            if isinstance(resposta, Exception):
+                raise resposta
+        return respostas[a_partir_de:]
+
+
+class StatusStore:
+    """
+    Status de cada pedido como hash no Redis (status:{origem_id}).
+
+    Cada etapa grava só os campos que mudaram (HSET via script, uma ida ao Redis).
+    O resultado final NÃO fica no status: vai para resultado:{origem_id} e o status
+    guarda só o ETag dele, então o polling custa poucos bytes.
+    Para agrupar a escrita com outras numa só ida ao Redis, passe um EscritasAgrupadas em `pipe`.
+    """
+
+    def __init__(self, redis_client, ttl_s: int = STATUS_TTL_S):
+        self.redis = redis_client
+        self.ttl_s = ttl_s
+        self._script = redis_client.register_script(ATUALIZAR_STATUS_LUA)
+
+    def atualizar(
+        self,
+        origem_id,
+        status: str,
+        step: Optional[str] = None,
+        progress: int = 0,
+        result: Optional[Dict[str, Any]] = None,
+        pipe=None,
+        **campos,
+    ) -> bool:
+        campos['origem_id'] = str(origem_id)
+        campos['updated_at'] = datetime.utcnow().isoformat()
+        if step is not None:
+            campos['step'] = step
+        if result is not None:
+            campos['result'] = codificar(result)
+
+        args = [self.ttl_s, int(progress), status]
+        for campo, valor in campos.items():
+            args += [campo, valor]
+        if pipe is not None:
+            pipe.script(self._script, [f"status:{origem_id}"], args)
+            return True
+        return bool(self._script(keys=[f"status:{origem_id}"], args=args))
+
+    def criar(self, origem_id, step: str = 'queued', pipe=None) -> bool:
+        return self.atualizar(
+            origem_id, 'processing', step, 0, pipe=pipe,
+            created_at=datetime.utcnow().isoformat()
+        )
+
+    def concluir(self, origem_id, resultado: Dict[str, Any]) -> str:
+        """Grava o resultado e marca o status como completed (um único MULTI/EXEC)"""
+        corpo = codificar(resultado)
+        etag = calcular_etag(corpo)
+        pipe = EscritasAgrupadas(self.redis, transaction=True)
+        pipe.setex(f"resultado:{origem_id}", RESULTADO_TTL_S, corpo)
+        self.atualizar(origem_id, 'completed', 'finished', 100, pipe=pipe, result_etag=etag)
+        pipe.executar()
+        return etag
+
+    def etag_resultado(self, origem_id) -> Optional[str]:
+        try:
+            etag = self.redis.hget(f"status:{origem_id}", 'result_etag')
+        except Exception:
+            # Status legado (string) não tem ETag
+            return None
+        return etag.decode() if etag else None
+
+    def ler_resultado(self, origem_id) -> Optional[Tuple[bytes, str]]:
+        """(corpo JSON, ETag) do resultado, ou None se não estiver no Redis"""
+        bruto = self.redis.get(f"resultado:{origem_id}")
+        if bruto is None:
+            return None
+        return para_json(bruto), calcular_etag(bruto)
+
+    def ler(self, origem_id) -> Optional[Dict[str, Any]]:
+        """Um HGETALL; valores legados (string JSON) continuam legíveis"""
+        chave = f"status:{origem_id}"
+        try:
+            bruto = self.redis.hgetall(chave)
+        except Exception as e:
+            if 'WRONGTYPE' not in str(e):
+                raise
+            return decodificar(self.redis.get(chave))
+        if not bruto:
+            return None
+
+        dados = {}
+        for campo, valor in bruto.items():
+            campo = campo.decode()
+            if campo == 'result':
+                dados[campo] = decodificar(valor)
+            elif campo == 'progress':
+                dados[campo] = int(valor)
+            else:
+                dados[campo] = valor.decode()
+        return dados
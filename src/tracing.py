@@ -0,0 +1,230 @@
+"""Rastreamento distribuído (OpenTelemetry, opcional): API -> RabbitMQ -> workers -> Ollama/PostgreSQL"""
+import os
+import hashlib
+import logging
+import sys
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+try:
+    from opentelemetry import trace, propagate, context as otel_context
+except ImportError:
+    trace = None
+
+# Configuração de Logs
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger("TRACING")
+
+# '' = desligado | otlp (OTEL_EXPORTER_OTLP_ENDPOINT, padrão http://localhost:4318) | arquivo (JSON por linha)
+EXPORTADOR = os.getenv('SIGILO_TRACING_EXPORTER', '').strip().lower()
+# Fração dos pedidos rastreados na origem (API); workers seguem a decisão que vem no cabeçalho
+AMOSTRAGEM = float(os.getenv('SIGILO_TRACING_AMOSTRAGEM', '0.1'))
+ARQUIVO = os.getenv('SIGILO_TRACING_ARQUIVO', '/tmp/sigilo-traces.jsonl')
+
+# Atributos de URL perdem a query string (filtros de auditoria podem trazer e-mail, nome...)
+ATRIBUTOS_URL = ('http.url', 'url.full', 'http.target')
+ATRIBUTOS_REMOVIDOS = ('url.query',)
+
+_configurado = False
+
+
+def hash_texto(texto: str) -> str:
+    """Mesmo hash do registro de falha crítica do detector: permite correlacionar sem expor o texto"""
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+
+class _SpanVazio:
+    def set_attribute(self, *args):
+        pass
+
+    def is_recording(self) -> bool:
+        return False
+
+
+_SPAN_VAZIO = _SpanVazio()
+
+
+@contextmanager
+def span(nome: str, **atributos):
+    """Span filho do contexto atual; sem OpenTelemetry (ou sem configurar) não custa quase nada"""
+    if trace is None:
+        yield _SPAN_VAZIO
+        return
+    with trace.get_tracer('sigilo').start_as_current_span(nome, attributes=atributos or None) as s:
+        yield s
+
+
+def marcar(**atributos):
+    """Atributos no span corrente (ex: o span da tarefa Celery criado pela instrumentação)"""
+    if trace is None:
+        return
+    atual = trace.get_current_span()
+    if atual.is_recording():
+        for chave, valor in atributos.items():
+            atual.set_attribute(f"sigilo.{chave}", valor)
+
+
+def contexto_atual() -> Dict[str, str]:
+    """Contexto do trace serializado (traceparent) para atravessar processos fora do Celery"""
+    carrier: Dict[str, str] = {}
+    if trace is not None:
+        propagate.inject(carrier)
+    return carrier
+
+
+@contextmanager
+def contexto(carrier: Optional[Dict[str, str]]):
+    """Continua, neste processo, o trace recebido em `carrier`"""
+    if trace is None or not carrier:
+        yield
+        return
+    token = otel_context.attach(propagate.extract(carrier))
+    try:
+        yield
+    finally:
+        otel_context.detach(token)
+
+
+def _sanitizar(span_lido):
+    """
+    Cópia do span sem nada que possa carregar PII: query strings saem das URLs e mensagens
+    de exceção/status viram hash (erros do banco trazem os parâmetros da query).
+    """
+    from opentelemetry.sdk.trace import Event, ReadableSpan
+    from opentelemetry.trace import Status
+
+    atributos = {}
+    for chave, valor in (span_lido.attributes or {}).items():
+        if chave in ATRIBUTOS_REMOVIDOS:
+            continue
+        if chave in ATRIBUTOS_URL and isinstance(valor, str):
+            valor = valor.split('?', 1)[0]
+        atributos[chave] = valor
+
+    eventos = []
+    for evento in span_lido.events:
+        if evento.name == 'exception':
+            attrs = {
+                chave: valor for chave, valor in (evento.attributes or {}).items()
+                if chave not in ('exception.message', 'exception.stacktrace')
+            }
+            if evento.attributes and 'exception.message' in evento.attributes:
+                attrs['exception.message_sha256'] = hash_texto(str(evento.attributes['exception.message']))
+            evento = Event(evento.name, attrs, evento.timestamp)
+        eventos.append(evento)
+
+    status = span_lido.status
+    if status.description:
+        status = Status(status.status_code, f"sha256:{hash_texto(status.description)}")
+
+    return ReadableSpan(
+        name=span_lido.name, context=span_lido.context, parent=span_lido.parent, resource=span_lido.resource,
+        attributes=atributos, events=eventos, links=span_lido.links, kind=span_lido.kind, status=status,
+        start_time=span_lido.start_time, end_time=span_lido.end_time,
+        instrumentation_scope=span_lido.instrumentation_scope,
+    )
+
+
+def _exportador():
+    from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult, ConsoleSpanExporter
+
+    if EXPORTADOR == 'otlp':
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        destino = OTLPSpanExporter()
+    elif EXPORTADOR == 'arquivo':
+        # Várias réplicas/processos podem anexar ao mesmo arquivo: uma linha JSON por span
+        destino = ConsoleSpanExporter(
+            out=open(ARQUIVO, 'a', buffering=1),
+            formatter=lambda s: s.to_json(indent=None) + os.linesep,
+        )
+    else:
+        raise ValueError(f"SIGILO_TRACING_EXPORTER desconhecido: '{EXPORTADOR}' (use otlp ou arquivo)")
+
+    class ExportadorSemPII(SpanExporter):
+        """Toda saída de spans passa por _sanitizar, inclusive os das instrumentações automáticas"""
+
+        def export(self, spans):
+            try:
+                return destino.export([_sanitizar(s) for s in spans])
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao exportar spans: {e}")
+                return SpanExportResult.FAILURE
+
+        def shutdown(self):
+            destino.shutdown()
+
+        def force_flush(self, timeout_millis: int = 30000) -> bool:
+            return destino.force_flush(timeout_millis)
+
+    return ExportadorSemPII()
+
+
+def configurar(servico: str, app=None, engine=None) -> bool:
+    """
+    Liga o rastreamento neste processo (idempotente). Chamar antes do fork dos filhos:
+    o BatchSpanProcessor se reinicia sozinho em cada processo filho.
+
+    Instrumenta Celery (contexto nos cabeçalhos das mensagens), requests (Ollama), SQLAlchemy
+    (`engine`) e FastAPI (`app`). Redis fica de fora: a instrumentação grava os argumentos dos comandos.
+    """
+    global _configurado
+    if _configurado or not EXPORTADOR:
+        return _configurado
+    if trace is None:
+        logger.warning("⚠️ SIGILO_TRACING_EXPORTER definido sem opentelemetry instalado. Rastreamento desligado.")
+        return False
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+        provider = TracerProvider(
+            resource=Resource.create({'service.name': servico}),
+            sampler=ParentBased(TraceIdRatioBased(AMOSTRAGEM)),
+        )
+        provider.add_span_processor(BatchSpanProcessor(_exportador()))
+        trace.set_tracer_provider(provider)
+    except Exception as e:
+        logger.error(f"❌ Falha ao configurar o rastreamento: {e}")
+        return False
+
+    instrumentacoes = []
+    try:
+        from opentelemetry.instrumentation.celery import CeleryInstrumentor
+        CeleryInstrumentor().instrument()
+        instrumentacoes.append('celery')
+    except ImportError:
+        pass
+    try:
+        from opentelemetry.instrumentation.requests import RequestsInstrumentor
+        RequestsInstrumentor().instrument()
+        instrumentacoes.append('requests')
+    except ImportError:
+        pass
+    if engine is not None:
+        try:
+            from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+            SQLAlchemyInstrumentor().instrument(engine=engine)
+            instrumentacoes.append('sqlalchemy')
+        except ImportError:
+            pass
+    if app is not None:
+        try:
+            from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+            FastAPIInstrumentor.instrument_app(app, excluded_urls='metrics,health', exclude_spans=['receive', 'send'])
+            instrumentacoes.append('fastapi')
+        except ImportError:
+            pass
+
+    _configurado = True
+    logger.info(
+        f"🔭 Rastreamento ligado ({EXPORTADOR}, amostragem {AMOSTRAGEM:.0%}) para '{servico}': "
+        f"{', '.join(instrumentacoes) or 'só spans manuais'}"
+    )
+    return True
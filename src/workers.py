@@ -1,11 +1,28 @@
 """Workers Celery para processamento assíncrono"""
-from celery import group, chain
+from celery.signals import (
+    worker_init, worker_ready, worker_process_init, worker_process_shutdown, before_task_publish, task_prerun, task_postrun
+)
 from src.celery_app import celery_app
-from src.database import get_db
+from src.database import get_db, engine
 from src.models import PedidoProcessado, EntidadeDetectada
+from src.llm_client import resumo_e_fallback
+from src.spans import spans_para_compacto, spans_de_compacto
+from src.status_store import StatusStore, EscritasAgrupadas
+from src.pipeline_state import EstadoPipeline, SEM_ESTADO
+from src.queue_metrics import (
+    MetricasFila, PausaLote, CLASSE_INTERATIVO, CLASSE_LOTE, FILAS_POR_CLASSE, LOTE_PAUSA_INTERVALO_S,
+    profundidade_fila
+)
+from src import metrics, tracing
+from src.metrics import (
+    ESPERA_FILA, SERVICO_TAREFA, DETECCAO, CAMADA_DETECTOR, BANCO_COMMIT, STATUS_ESCRITA, observar, cronometrar
+)
 import redis
-import json
 import hashlib
+import time
+import gc
+import resource
+import threading
 from datetime import datetime
 from uuid import UUID
 import os
@@ -26,9 +43,21 @@ try:
 except Exception as e:
     logger.error(f"❌ Falha ao conectar Redis nos Workers: {e}")
 
+# Status dos pedidos (hash por pedido, merge monotônico do progresso)
+status_store = StatusStore(redis_client)
+
+# Junção dos ramos paralelos (banco + LLM) por contador no Redis, no lugar do chord
+pipeline_estado = EstadoPipeline(redis_client)
+RAMOS_PIPELINE = 2
+
+metricas_fila = MetricasFila(redis_client)
+
 # Variáveis globais para cache (Lazy Loading)
 _detector = None
+_detection_executor = None
 _llm_client = None
+_executor_lock = threading.Lock()
+_pool_deteccao_recusado = False
 
 def get_detector():
     global _detector
@@ -37,6 +66,184 @@ def get_detector():
         _detector = PIIDetectorLAI()
     return _detector
 
+def get_detection_executor():
+    """
+    Pool de processos para a detecção (SIGILO_DETECCAO_PROCESSOS > 0).
+    Deve ser criado no processo que já tem o detector carregado: os filhos o herdam via fork.
+    Desligado com o pool prefork do Celery (ver recusar_pool_deteccao_no_prefork).
+    """
+    global _detection_executor
+    processos = int(os.getenv('SIGILO_DETECCAO_PROCESSOS', '0'))
+    if _detection_executor is None and processos > 0 and not _pool_deteccao_recusado:
+        with _executor_lock:
+            if _detection_executor is None:
+                from src.detector_pool import DetectionExecutor
+                prefetch = int(os.getenv('SIGILO_DETECCAO_PREFETCH', '2'))
+                _detection_executor = DetectionExecutor(
+                    get_detector(), processos, max_pendentes=processos * prefetch,
+                    max_memoria_kb=int(os.getenv('SIGILO_WORKER_MAX_MEMORY_KB', '2000000')),
+                    max_tarefas=int(os.getenv('SIGILO_DETECCAO_MAX_TAREFAS', '0')),
+                )
+    if _detection_executor is not None and _detection_executor.pid != os.getpid():
+        return None  # herdado por fork (threads de gerência mortos): detecta direto neste processo
+    return _detection_executor
+
+def _rss_mb() -> float:
+    """Pico de memória residente do processo atual (MB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+@worker_init.connect
+def iniciar_rastreamento(**kwargs):
+    """Antes do preload: filhos do prefork e do pool de detecção herdam o provider já configurado"""
+    tracing.configurar('sigilo-worker', engine=engine)
+
+@worker_init.connect
+def recusar_pool_deteccao_no_prefork(sender=None, **kwargs):
+    """
+    O pool de processos da detecção é para o worker com --pool=threads. No prefork, um executor
+    criado no pai chegaria aos filhos com os threads de gerência mortos (submit travaria), e cada
+    filho já é um processo: a detecção roda direto nele.
+    """
+    global _pool_deteccao_recusado
+    if int(os.getenv('SIGILO_DETECCAO_PROCESSOS', '0')) <= 0 or sender is None:
+        return
+    from celery.concurrency import get_implementation
+    from celery.concurrency.prefork import TaskPool as PreforkPool
+    pool_cls = get_implementation(getattr(sender, 'pool_cls', None) or 'prefork')
+    if issubclass(pool_cls, PreforkPool):
+        _pool_deteccao_recusado = True
+        logger.warning(
+            "⚠️ SIGILO_DETECCAO_PROCESSOS ignorado com o pool prefork: use --pool=threads para o pool de "
+            "processos da detecção (a reciclagem por memória do prefork continua valendo)"
+        )
+
+@worker_init.connect
+def precarregar_detector(**kwargs):
+    """
+    Carrega o detector no processo PAI do worker, antes do fork dos filhos.
+    Os filhos herdam o modelo via copy-on-write, então reciclar um filho
+    não paga de novo o carregamento do spaCy/Presidio.
+    Ativado com SIGILO_PRELOAD_DETECTOR=1 (apenas no worker de detecção).
+    """
+    if os.getenv('SIGILO_PRELOAD_DETECTOR', '0') != '1':
+        return
+
+    inicio = time.perf_counter()
+    get_detector()
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+
+    # Tira os objetos do modelo do alcance do GC: evita que coletas nos filhos
+    # escrevam nos cabeçalhos dos objetos e quebrem o compartilhamento de páginas
+    gc.collect()
+    gc.freeze()
+    logger.info(f"⏱️ [PRELOAD] Detector carregado no processo pai em {duracao_ms:.0f}ms (pico RSS {_rss_mb():.0f}MB)")
+
+    # Pool de processos (opcional) criado já com o modelo em memória
+    get_detection_executor()
+
+@worker_init.connect
+def iniciar_metricas(**kwargs):
+    """Servidor de métricas no processo pai (SIGILO_METRICS_PORT); agrega os filhos do prefork"""
+    metrics.limpar_multiproc()
+    metrics.iniciar_servidor()
+
+@worker_ready.connect
+def pausar_lote_com_backlog_interativo(sender=None, **kwargs):
+    """
+    No worker que consome as duas classes, para de consumir o lote enquanto a fila interativa
+    tem backlog e volta quando ela esvazia (ver PausaLote). As mensagens de lote ficam no broker.
+    """
+    fila_interativa, fila_lote = FILAS_POR_CLASSE[CLASSE_INTERATIVO], FILAS_POR_CLASSE[CLASSE_LOTE]
+    consumidas = sender.app.amqp.queues.consume_from if sender is not None else None
+    if not consumidas or fila_interativa not in consumidas or fila_lote not in consumidas:
+        return
+
+    def vigiar():
+        pausa = PausaLote()
+        while True:
+            time.sleep(LOTE_PAUSA_INTERVALO_S)
+            acao = pausa.avaliar(profundidade_fila(celery_app, fila_interativa, max_idade_s=0))
+            # call_soon: cancelar/adicionar o consumidor roda no laço do próprio consumer, não neste thread
+            if acao == 'pausar':
+                sender.call_soon(sender.cancel_task_queue, fila_lote)
+                logger.info(f"⏸️ Backlog em '{fila_interativa}': consumo de '{fila_lote}' pausado")
+            elif acao == 'retomar':
+                sender.call_soon(sender.add_task_queue, fila_lote)
+                logger.info(f"▶️ '{fila_interativa}' sem backlog: consumo de '{fila_lote}' retomado")
+
+    threading.Thread(target=vigiar, name='pausa-lote', daemon=True).start()
+
+@worker_process_init.connect
+def registrar_inicio_filho(**kwargs):
+    """Mede o custo de (re)criação de um processo filho"""
+    logger.info(
+        f"⏱️ [FORK] Filho {os.getpid()} pronto. Detector pré-carregado: {_detector is not None} "
+        f"(pico RSS {_rss_mb():.0f}MB)"
+    )
+
+@worker_process_shutdown.connect
+def registrar_fim_filho(pid=None, **kwargs):
+    metrics.processo_encerrado(pid or os.getpid())
+
+# --- Métricas por fila: idade da mensagem mais antiga, espera e tempo de serviço ---
+_inicio_tarefas = {}
+
+# Cabeçalho com o instante de publicação (retries publicam de novo)
+CABECALHO_PUBLICACAO = 'sigilo_publicado_em'
+
+def _fila_da_tarefa(task) -> str:
+    return (getattr(task.request, 'delivery_info', None) or {}).get('routing_key') or 'desconhecida'
+
+def _espera_fila_s(task):
+    """Publicação -> agora, pelo cabeçalho; None em mensagens de versões anteriores"""
+    publicado_em = task.request.get(CABECALHO_PUBLICACAO)
+    return max(time.time() - publicado_em, 0.0) if publicado_em else None
+
+def _tempos_da_tarefa(task) -> dict:
+    """Tempos por estágio (ms) que seguem até a auditoria do pedido, começando pela espera na fila"""
+    espera = _espera_fila_s(task)
+    return {} if espera is None else {'espera_fila': round(espera * 1000, 2)}
+
+@before_task_publish.connect
+def registrar_publicacao(sender=None, headers=None, routing_key=None, **kwargs):
+    """
+    Vale para API e workers (quem publica): indexa a mensagem pela hora de publicação.
+    Antes do envio, e não depois: um consumidor rápido poderia remover a entrada antes dela existir.
+    """
+    if headers is not None:
+        headers[CABECALHO_PUBLICACAO] = time.time()
+    task_id = (headers or {}).get('id')
+    if not task_id or not routing_key:
+        return
+    try:
+        metricas_fila.registrar_publicacao(routing_key, task_id)
+    except Exception as e:
+        logger.warning(f"⚠️ Falha ao registrar publicação na fila '{routing_key}': {e}")
+
+@task_prerun.connect
+def registrar_inicio_tarefa(task_id=None, task=None, **kwargs):
+    _inicio_tarefas[task_id] = time.perf_counter()
+    fila = _fila_da_tarefa(task)
+    espera = _espera_fila_s(task)
+    if espera is not None:
+        observar(ESPERA_FILA, espera, fila=fila)
+    try:
+        metricas_fila.registrar_inicio(fila, task_id)
+    except Exception as e:
+        logger.warning(f"⚠️ Falha ao registrar início da tarefa {task_id}: {e}")
+
+@task_postrun.connect
+def registrar_fim_tarefa(task_id=None, task=None, **kwargs):
+    inicio = _inicio_tarefas.pop(task_id, None)
+    if inicio is None:
+        return
+    duracao = time.perf_counter() - inicio
+    observar(SERVICO_TAREFA, duracao, fila=_fila_da_tarefa(task))
+    try:
+        metricas_fila.registrar_servico(_fila_da_tarefa(task), duracao)
+    except Exception as e:
+        logger.warning(f"⚠️ Falha ao registrar tempo de serviço da tarefa {task_id}: {e}")
+
 def get_llm_client():
     global _llm_client
     if _llm_client is None:
@@ -44,33 +251,62 @@ def get_llm_client():
         _llm_client = OllamaClient()
     return _llm_client
 
-def atualizar_status(origem_id: UUID, status: str, step: str = None, progress: int = 0, result: dict = None):
-    """Atualiza status no Redis"""
+def atualizar_status(
+    origem_id: UUID, status: str, step: str = None, progress: int = 0, result: dict = None,
+    pipe: EscritasAgrupadas = None
+):
+    """
+    Atualiza status no Redis (apenas os campos da etapa; progresso nunca regride).
+    Com `pipe`, a escrita só é enfileirada e vai ao Redis junto com o próximo comando da tarefa.
+    """
     try:
         logger.info(f"🔄 [REDIS] Atualizando status ID {origem_id}: {status} ({progress}%) - Step: {step}")
-        data = {
-            'origem_id': str(origem_id),
-            'status': status,
-            'step': step,
-            'progress': progress,
-            'result': result,
-            'updated_at': datetime.utcnow().isoformat()
-        }
-        redis_client.setex(f"status:{origem_id}", 3600, json.dumps(data))
+        if pipe is not None:
+            status_store.atualizar(origem_id, status, step, progress, result, pipe=pipe)
+            return
+        with cronometrar(STATUS_ESCRITA, operacao='atualizar'):
+            aplicado = status_store.atualizar(origem_id, status, step, progress, result)
+        if not aplicado:
+            logger.info(f"⏭️ [REDIS] Status de {origem_id} já está adiante; '{step}' ignorado")
     except Exception as e:
         logger.error(f"❌ Erro ao atualizar status no Redis: {e}")
 
 @celery_app.task(name='src.workers.task_detectar_pii', bind=True)
-def task_detectar_pii(self, origem_id: str, texto: str, protocolo: str = None, usuario_id: str = None):
-    logger.info(f"🐰 [RABBITMQ] Mensagem recebida na fila 'deteccao'. ID: {origem_id}")
+def task_detectar_pii(
+    self, origem_id: str, texto: str, protocolo: str = None, usuario_id: str = None,
+    classe: str = CLASSE_INTERATIVO, enfileirado_em: float = None
+):
+    fila = FILAS_POR_CLASSE.get(classe, FILAS_POR_CLASSE[CLASSE_INTERATIVO])
+    logger.info(f"🐰 [RABBITMQ] Mensagem recebida na fila '{fila}'. ID: {origem_id}")
+    tracing.marcar(origem_id=origem_id, classe=classe)
+
+    if enfileirado_em:
+        try:
+            metricas_fila.registrar_espera(classe, time.time() - enfileirado_em)
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao registrar espera na fila: {e}")
+
+    tempos = _tempos_da_tarefa(self)
     try:
         origem_uuid = UUID(origem_id)
         atualizar_status(origem_uuid, 'processing', 'detecting', 25)
         
         logger.info(f"🕵️ Executando detector (Regex+Presidio)...")
-        detector = get_detector()
-        resultado = detector.detect(texto)
+        # Carga preguiçosa do detector fica fora da medição
+        detector = get_detection_executor() or get_detector()
+        with cronometrar(DETECCAO, tempos, 'deteccao'):
+            resultado = detector.detect(texto)
         logger.info(f"✅ Detecção concluída. Entidades: {resultado['entities_detected']}")
+        # Acertos/tempo por padrão regex (com o pool, os filhos já os devolveram ao detector deste processo)
+        metrics.registrar_padroes(get_detector().patterns.drenar())
+        # Com chunks, o tempo de cada camada é a soma dos chunks
+        tempos['camadas'] = {}
+        for camada, stats in resultado.get('layer_stats', {}).items():
+            if 'tempo_ms' in stats:
+                observar(CAMADA_DETECTOR, stats['tempo_ms'] / 1000, camada=camada)
+                tempos['camadas'][camada] = stats['tempo_ms']
+        # Spans viajam como listas compactas [type, value, start, end, confidence, method]
+        resultado['entities'] = spans_para_compacto(resultado['entities'])
         
         dados = {
             'origem_id': origem_id,
@@ -78,20 +314,19 @@ def task_detectar_pii(self, origem_id: str, texto: str, protocolo: str = None, u
             'protocolo': protocolo,
             'usuario_id': usuario_id,
             'resultado_deteccao': resultado,
-            'start_time': datetime.utcnow().isoformat()
+            'start_time': datetime.utcnow().isoformat(),
+            'tempos_ms': {'deteccao': tempos}
         }
         
-        atualizar_status(origem_uuid, 'processing', 'detected', 50)
+        pipe = EscritasAgrupadas(redis_client)
+        atualizar_status(origem_uuid, 'processing', 'detected', 50, pipe=pipe)
         
         logger.info(f"🔗 Disparando tasks paralelas (Banco + LLM)...")
-        workflow = chain(
-            group(
-                task_salvar_banco.s(dados),
-                task_gerar_resumo_llm.s(dados)
-            ),
-            task_gerar_dicionario.s()
-        )
-        workflow.apply_async()
+        # Sem chord: o último ramo a terminar (contador no Redis) faz a consolidação.
+        # O status 'detected' vai na mesma ida ao Redis
+        pipeline_estado.iniciar(origem_id, RAMOS_PIPELINE, pipe=pipe)
+        task_salvar_banco.delay(dados)
+        task_gerar_resumo_llm.delay(dados)
         
         return dados
         
@@ -109,49 +344,47 @@ def task_detectar_pii(self, origem_id: str, texto: str, protocolo: str = None, u
 def task_salvar_banco(self, dados: dict):
     origem_id = dados['origem_id']
     logger.info(f"🐰 [RABBITMQ] Mensagem recebida na fila 'banco'. ID: {origem_id}")
+    tracing.marcar(origem_id=origem_id)
+    tempos = _tempos_da_tarefa(self)
     try:
         origem_uuid = UUID(origem_id)
         resultado = dados['resultado_deteccao']
-        
-        atualizar_status(origem_uuid, 'processing', 'saving', 75)
-        
-        db = next(get_db())
-        texto_hash = hashlib.sha256(dados['texto'].encode()).hexdigest()
-        
-        pedido = PedidoProcessado(
-            origem_id=origem_uuid,
-            protocolo=dados.get('protocolo'),
-            texto_original_hash=texto_hash,
-            texto_anonimizado=resultado['anonymized_text'],
-            total_entidades=resultado['entities_detected'],
-            entidades_por_tipo=resultado['entity_types'],
-            nivel_risco=resultado['risk_level'],
-            usuario_id=dados.get('usuario_id'),
-            processed_at=datetime.utcnow()
-        )
-        db.add(pedido)
-        
-        for entidade in resultado.get('entities', []):
-            valor_hash = hashlib.sha256(entidade['value'].encode()).hexdigest()
-            ent_db = EntidadeDetectada(
-                pedido_origem_id=origem_uuid,
-                tipo=entidade['type'],
-                valor_hash=valor_hash,
-                confianca=entidade['confidence'],
-                posicao_inicio=entidade['start'],
-                posicao_fim=entidade['end'],
-                metodo_deteccao=entidade['method']
-            )
-            db.add(ent_db)
-        
-        db.commit()
-        logger.info(f"✅ [TASK 2A] Dados salvos no PostgreSQL com sucesso!")
-        
-        atualizar_status(origem_uuid, 'processing', 'saved', 85)
+
+        # Em retry após falha na consolidação, as entidades já estão gravadas
+        pipe = None
+        if not pipeline_estado.ramo_concluido(origem_id, 'banco'):
+            atualizar_status(origem_uuid, 'processing', 'saving', 75)
+
+            db = next(get_db())
+            # Só as entidades; a linha do pedido é inserida completa na consolidação
+            for entidade in spans_de_compacto(resultado.get('entities', [])):
+                valor_hash = hashlib.sha256(entidade.value.encode()).hexdigest()
+                ent_db = EntidadeDetectada(
+                    pedido_origem_id=origem_uuid,
+                    tipo=entidade.type,
+                    valor_hash=valor_hash,
+                    confianca=entidade.confidence,
+                    posicao_inicio=entidade.start,
+                    posicao_fim=entidade.end,
+                    metodo_deteccao=entidade.method
+                )
+                db.add(ent_db)
+
+            with cronometrar(BANCO_COMMIT, tempos, 'commit_entidades', operacao='entidades'):
+                db.commit()
+            logger.info(f"✅ [TASK 2A] Entidades salvas no PostgreSQL com sucesso!")
+
+            # Vai ao Redis junto com o registro do ramo
+            pipe = EscritasAgrupadas(redis_client)
+            atualizar_status(origem_uuid, 'processing', 'saved', 85, pipe=pipe)
+
+        _concluir_ramo(dados, 'banco', pipe=pipe, tempos_banco=tempos)
         return dados
         
     except Exception as e:
         logger.error(f"❌ [TASK 2A] Erro ao salvar no banco: {e}")
+        if self.request.retries >= self.max_retries:
+            atualizar_status(UUID(origem_id), 'error', 'saving_failed', 0, {'error': str(e)})
         # Retry automático
         raise self.retry(exc=e)
 
@@ -164,94 +397,227 @@ def task_salvar_banco(self, dados: dict):
 def task_gerar_resumo_llm(self, dados: dict):
     origem_id = dados['origem_id']
     logger.info(f"🐰 [RABBITMQ] Mensagem recebida na fila 'llm'. ID: {origem_id}")
+    tracing.marcar(origem_id=origem_id)
+    # Em retry após falha na consolidação, o resumo já está no estado do pipeline
+    ja_concluido = pipeline_estado.ramo_concluido(origem_id, 'llm')
+    tempos = _tempos_da_tarefa(self)
+    pipe = None
     try:
-        origem_uuid = UUID(origem_id)
-        resultado = dados['resultado_deteccao']
-        
-        atualizar_status(origem_uuid, 'processing', 'generating_summary', 75)
-        
-        logger.info("🤖 Chamando OllamaClient...")
-        llm_client = get_llm_client()
-        resumo = llm_client.gerar_resumo_lai(
-            texto_anonimizado=resultado['anonymized_text'],
-            entidades_detectadas=resultado['entity_types']
-        )
-        logger.info("✅ [TASK 2B] Resumo LLM gerado com sucesso!")
-        
-        dados['resumo_llm'] = resumo
-        atualizar_status(origem_uuid, 'processing', 'summary_generated', 85)
-        return dados
+        if not ja_concluido:
+            origem_uuid = UUID(origem_id)
+            resultado = dados['resultado_deteccao']
+
+            atualizar_status(origem_uuid, 'processing', 'generating_summary', 75)
+
+            logger.info("🤖 Chamando OllamaClient...")
+            llm_client = get_llm_client()
+            resumo = llm_client.gerar_resumo_lai(
+                texto_anonimizado=resultado['anonymized_text'],
+                entidades_detectadas=resultado['entity_types'],
+                tempos=tempos
+            )
+            logger.info("✅ [TASK 2B] Resumo LLM gerado com sucesso!")
+
+            dados['resumo_llm'] = resumo
+            # Fallback (breaker aberto, timeout...) fica marcado para reprocessamento posterior
+            dados['resumo_pendente'] = resumo_e_fallback(resumo)
+            # Vai ao Redis junto com o registro do ramo
+            pipe = EscritasAgrupadas(redis_client)
+            atualizar_status(origem_uuid, 'processing', 'summary_generated', 85, pipe=pipe)
         
     except Exception as e:
         logger.error(f"❌ [TASK 2B] Erro no LLM: {e}")
-        # Se for erro de conexão, tenta de novo. Se for timeout, usa fallback.
-        if "Connection refused" in str(e):
+        llm_client = get_llm_client()
+        # Se for erro de conexão, tenta de novo (exceto com o breaker aberto: falha rápido).
+        if "Connection refused" in str(e) and not llm_client.breaker.esta_aberto():
              raise self.retry(exc=e)
 
-        llm_client = get_llm_client()
         dados['resumo_llm'] = llm_client._fallback_resumo()
-        return dados
+        dados['resumo_pendente'] = True
+
+    try:
+        if ja_concluido:
+            _concluir_ramo(dados, 'llm')
+        else:
+            _concluir_ramo(
+                dados, 'llm', pipe=pipe,
+                resumo_llm=dados['resumo_llm'], resumo_pendente=dados['resumo_pendente'], tempos_llm=tempos
+            )
+    except Exception as e:
+        if self.request.retries >= self.max_retries:
+            atualizar_status(UUID(origem_id), 'error', 'output_generation_failed', 0, {'error': str(e)})
+        raise self.retry(exc=e)
+    return dados
+
+def _concluir_ramo(dados: dict, ramo: str, pipe: EscritasAgrupadas = None, **contribuicao):
+    """Registra o fim de um ramo (com as escritas enfileiradas em `pipe`); se for o último, consolida aqui mesmo"""
+    origem_id = dados['origem_id']
+    estado = pipeline_estado.concluir_ramo(origem_id, ramo, pipe=pipe, **contribuicao)
+    if estado == SEM_ESTADO:
+        # Pedido disparado antes da junção por contador: o chord chama task_gerar_dicionario
+        return
+    if estado is None:
+        logger.info(f"⏳ Ramo '{ramo}' concluído; aguardando os demais ramos de {origem_id}")
+        return
+
+    try:
+        tempos = {'banco': estado.get('tempos_banco'), 'llm': estado.get('tempos_llm')}
+        with tracing.span('pipeline.consolidar', **{'sigilo.origem_id': origem_id, 'sigilo.ramo': ramo}):
+            _consolidar(dados, estado.get('resumo_llm') or {}, estado.get('resumo_pendente', True), tempos)
+    except Exception:
+        # Libera para que o retry deste ramo tente consolidar de novo
+        pipeline_estado.liberar_consolidacao(origem_id)
+        raise
+    pipeline_estado.finalizar(origem_id)
+
+def _consolidar(dados: dict, resumo_llm: dict, resumo_pendente: bool, tempos: dict = None, legado: bool = False) -> dict:
+    """Monta o dicionário de saída, grava a linha completa do pedido (um INSERT) e publica o resultado"""
+    origem_uuid = UUID(dados['origem_id'])
+    logger.info(f"📊 Consolidando ID: {origem_uuid}")
+
+    # Tempos por estágio (ms): detecção vem nos dados, banco/LLM nas contribuições dos ramos
+    tempos_ms = dict(dados.get('tempos_ms') or {})
+    tempos_ms.update({estagio: t for estagio, t in (tempos or {}).items() if t})
+
+    resultado = dados['resultado_deteccao']
+    start_time = datetime.fromisoformat(dados['start_time'])
+    agora = datetime.utcnow()
+    tempo_ms = int((agora - start_time).total_seconds() * 1000)
+
+    dicionario_saida = {
+        'origem_id': dados['origem_id'],
+        'protocolo': dados.get('protocolo'),
+        'texto_anonimizado': resultado['anonymized_text'],
+        'resumo_inteligente': resumo_llm,
+        'estatisticas': {
+            'total_entidades': resultado['entities_detected'],
+            'por_tipo': resultado['entity_types'],
+            'nivel_risco': resultado['risk_level']
+        },
+        'processamento': {
+            'tempo_ms': tempo_ms,
+            'timestamp': agora.isoformat()
+        },
+        'auditoria': {
+            'usuario_id': dados.get('usuario_id'),
+            'timestamp_inicio': dados['start_time'],
+            'timestamp_fim': agora.isoformat(),
+            'etapas': [
+                {'step': 'deteccao', 'status': 'completed'},
+                {'step': 'resumo_llm', 'status': 'completed'},
+                {'step': 'banco', 'status': 'completed'},
+                {'step': 'dicionario', 'status': 'completed'}
+            ],
+            'tempos_ms': tempos_ms,
+            'conformidade': {'lgpd': True, 'ia_local': True}
+        }
+    }
+
+    colunas = dict(
+        protocolo=dados.get('protocolo'),
+        texto_original_hash=hashlib.sha256(dados['texto'].encode()).hexdigest(),
+        texto_anonimizado=resultado['anonymized_text'],
+        total_entidades=resultado['entities_detected'],
+        entidades_por_tipo=resultado['entity_types'],
+        nivel_risco=resultado['risk_level'],
+        usuario_id=dados.get('usuario_id'),
+        processed_at=agora,
+        tempo_processamento_ms=tempo_ms,
+        auditoria=dicionario_saida['auditoria'],
+        resumo_llm=resumo_llm,
+        resumo_pendente=resumo_pendente,
+    )
+
+    db = next(get_db())
+    pedido = None
+    if legado:
+        # Chords antigos: a versão anterior do ramo banco já pode ter inserido a linha
+        pedido = db.query(PedidoProcessado).filter_by(origem_id=origem_uuid).first()
+    if pedido:
+        for coluna, valor in colunas.items():
+            setattr(pedido, coluna, valor)
+    else:
+        db.add(PedidoProcessado(origem_id=origem_uuid, **colunas))
+    with cronometrar(BANCO_COMMIT, operacao='pedido'):
+        db.commit()
+    logger.info("💾 Pedido gravado com auditoria e resumo.")
+
+    # Resultado em chave própria; o status (consultado no polling) guarda só o ETag
+    try:
+        with cronometrar(STATUS_ESCRITA, operacao='concluir'):
+            status_store.concluir(origem_uuid, dicionario_saida)
+    except Exception as e:
+        logger.error(f"❌ Erro ao gravar resultado no Redis: {e}")
+
+    logger.info(f"🏁 [CONSOLIDAÇÃO] Processo FINALIZADO com sucesso para ID: {origem_uuid}")
+    return dicionario_saida
 
 @celery_app.task(name='src.workers.task_gerar_dicionario')
 def task_gerar_dicionario(resultados_anteriores: list):
+    """Legado: consolida chords enfileirados antes da junção por contador no Redis"""
     logger.info(f"🐰 [RABBITMQ] Mensagem recebida na fila 'dicionario'.")
+    dados = resultados_anteriores[0]
     try:
         dados_com_resumo = next((r for r in resultados_anteriores if 'resumo_llm' in r), None)
-        dados = resultados_anteriores[0]
-        
         resumo_llm = dados_com_resumo.get('resumo_llm', {}) if dados_com_resumo else {}
-        origem_uuid = UUID(dados['origem_id'])
-        
-        logger.info(f"📊 Consolidando ID: {origem_uuid}")
-        
-        resultado = dados['resultado_deteccao']
-        start_time = datetime.fromisoformat(dados['start_time'])
-        tempo_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
-        
-        dicionario_saida = {
-            'origem_id': dados['origem_id'],
-            'protocolo': dados.get('protocolo'),
-            'texto_anonimizado': resultado['anonymized_text'],
-            'resumo_inteligente': resumo_llm,
-            'estatisticas': {
-                'total_entidades': resultado['entities_detected'],
-                'por_tipo': resultado['entity_types'],
-                'nivel_risco': resultado['risk_level']
-            },
-            'processamento': {
-                'tempo_ms': tempo_ms,
-                'timestamp': datetime.utcnow().isoformat()
-            },
-            'auditoria': {
-                'usuario_id': dados.get('usuario_id'),
-                'timestamp_inicio': dados['start_time'],
-                'timestamp_fim': datetime.utcnow().isoformat(),
-                'etapas': [
-                    {'step': 'deteccao', 'status': 'completed'},
-                    {'step': 'resumo_llm', 'status': 'completed'},
-                    {'step': 'banco', 'status': 'completed'},
-                    {'step': 'dicionario', 'status': 'completed'}
-                ],
-                'conformidade': {'lgpd': True, 'ia_local': True}
-            }
-        }
-        
-        atualizar_status(origem_uuid, 'completed', 'finished', 100, dicionario_saida)
-        
-        # Atualiza banco
-        db = next(get_db())
-        pedido = db.query(PedidoProcessado).filter_by(origem_id=origem_uuid).first()
-        if pedido:
-            pedido.tempo_processamento_ms = tempo_ms
-            pedido.auditoria = dicionario_saida['auditoria']
-            pedido.resumo_llm = resumo_llm
-            db.commit()
-            logger.info("💾 Banco atualizado com auditoria e resumo.")
-            
-        logger.info(f"🏁 [TASK 3] Processo FINALIZADO com sucesso para ID: {origem_uuid}")
-        return dicionario_saida
-        
+        resumo_pendente = dados_com_resumo.get('resumo_pendente', False) if dados_com_resumo else True
+        return _consolidar(dados, resumo_llm, resumo_pendente, legado=True)
+
     except Exception as e:
         logger.error(f"❌ [TASK 3] Erro na consolidação: {e}")
         atualizar_status(UUID(dados['origem_id']), 'error', 'output_generation_failed', 0, {'error': str(e)})
-        raise
\ No newline at end of file
+        raise
+
+@celery_app.task(name='src.workers.task_reprocessar_resumos', ignore_result=True)
+def task_reprocessar_resumos():
+    """
+    Reprocessa pedidos que ficaram com resumo de fallback (resumo_pendente).
+    Roda em lotes pequenos, agendada pelo beat nas horas ociosas, para não
+    segurar a fila 'llm' dos pedidos interativos.
+    """
+    # Evita execuções sobrepostas (beat + disparo manual)
+    if not redis_client.set('reprocessamento:lock', 1, nx=True, ex=600):
+        logger.info("⏸️ [REPROCESSAMENTO] Já existe uma execução em andamento.")
+        return
+
+    try:
+        lote = int(os.getenv('SIGILO_REPROCESSAMENTO_LOTE', '10'))
+        intervalo = 60.0 / float(os.getenv('SIGILO_REPROCESSAMENTO_POR_MINUTO', '10'))
+        llm_client = get_llm_client()
+
+        db = next(get_db())
+        # Usa o índice de resumo_pendente; só carrega as colunas necessárias
+        pendentes = (
+            db.query(PedidoProcessado.id, PedidoProcessado.texto_anonimizado, PedidoProcessado.entidades_por_tipo)
+            .filter(PedidoProcessado.resumo_pendente.is_(True))
+            .order_by(PedidoProcessado.id)
+            .limit(lote)
+            .all()
+        )
+        logger.info(f"🔁 [REPROCESSAMENTO] {len(pendentes)} pedidos com resumo de fallback no lote.")
+
+        atualizacoes = []
+        for pedido_id, texto_anonimizado, entidades_por_tipo in pendentes:
+            if llm_client.breaker.esta_aberto():
+                logger.warning("⚡ [REPROCESSAMENTO] Breaker do Ollama aberto. Interrompendo lote.")
+                break
+
+            inicio = time.monotonic()
+            resumo = llm_client.gerar_resumo_lai(
+                texto_anonimizado=texto_anonimizado,
+                entidades_detectadas=entidades_por_tipo or {}
+            )
+            if resumo_e_fallback(resumo):
+                # Ollama ainda indisponível: mantém pendente para a próxima execução
+                break
+
+            atualizacoes.append({'id': pedido_id, 'resumo_llm': resumo, 'resumo_pendente': False})
+            time.sleep(max(0.0, intervalo - (time.monotonic() - inicio)))
+
+        if atualizacoes:
+            db.bulk_update_mappings(PedidoProcessado, atualizacoes)
+            with cronometrar(BANCO_COMMIT, operacao='reprocessamento'):
+                db.commit()
+        logger.info(f"✅ [REPROCESSAMENTO] {len(atualizacoes)} resumos atualizados.")
+    finally:
+        redis_client.delete('reprocessamento:lock')
\ No newline at end of file
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Teste de carga local do pipeline completo (API -> detecção -> banco + LLM -> consolidação),
+sem serviços externos:
+- Redis: fakeredis (servidor em memória compartilhado por API e workers)
+- RabbitMQ: Celery com transporte em memória e um worker de threads no mesmo processo
+- Ollama: stub HTTP local com latência configurável
+- PostgreSQL: SQLite em arquivo temporário
+
+Envia pedidos a POST /detectar-pii numa taxa de chegada fixa (ou Poisson) e mede p50/p95/p99
+por estágio (POST, espera em cada fila, execução de cada tarefa, ponta a ponta, GET /resultado),
+vazão e RSS. O resultado vai para JSON; --comparar mostra a diferença para uma execução anterior.
+
+Tudo roda num único processo: os números servem para comparar versões do código, não para
+dimensionar produção (sem rede, sem broker real, GIL compartilhado entre API e workers).
+
+Requer requirements-dev.txt. Execute:
+    python tests/benchmark_carga.py --taxa 5 --pedidos 200 --saida tests/resultados_carga.json
+    python tests/benchmark_carga.py --taxa 5 --pedidos 200 --comparar tests/resultados_carga.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+FILAS = ["deteccao", "deteccao_lote", "banco", "llm", "dicionario"]
+
+AMOSTRAS = [
+    "Meu nome é João Silva, CPF 529.982.247-25, moro na Rua das Flores, nº 12, Asa Sul. "
+    "Solicito cópia do contrato 2024/045 da Secretaria de Obras. Telefone: (61) 99876-5432.",
+    "Solicito a relação de servidores lotados na Administração Regional de Taguatinga em 2023, "
+    "com cargos e datas de posse. Contato: maria.souza@exemplo.com.",
+    "Prezados, requeiro informações sobre a licitação 12/2024. Sou Ana Pereira, RG 1.234.567 SSP/DF, "
+    "CNPJ da empresa 11.222.333/0001-81, telefone (61) 3333-4444.",
+    "Gostaria de saber o andamento do processo 00040-00012345/2024-11 sobre a reforma da escola "
+    "classe 10 do Gama. Não incluo dados pessoais.",
+]
+
+RESUMO_STUB = {
+    "categoria": "Contrato",
+    "subcategoria": "Cópia de documentos",
+    "prioridade": "Media",
+    "assunto_principal": "Pedido de cópia de contrato administrativo",
+    "palavras_chave": ["contrato", "cópia", "obras"],
+    "requer_analise_juridica": False,
+    "prazo_sugerido": "Normal",
+    "orgao_competente_sugerido": None,
+}
+
+
+# --- Stand-ins ---------------------------------------------------------------
+
+def iniciar_stub_ollama(latencia_ms: float, variacao_ms: float) -> ThreadingHTTPServer:
+    """Servidor HTTP com a mesma interface de /api/generate do Ollama"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            espera = max(0.0, random.gauss(latencia_ms, variacao_ms)) / 1000
+            time.sleep(espera)
+            corpo = json.dumps({
+                "model": "stub",
+                "response": json.dumps(RESUMO_STUB, ensure_ascii=False),
+                "done": True,
+                "prompt_eval_duration": int(espera * 0.3 * 1e9),
+                "eval_duration": int(espera * 0.7 * 1e9),
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def do_GET(self):
+            corpo = b'{"models": [{"name": "stub"}]}'
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def preparar_ambiente(args, url_ollama: str):
+    """Variáveis e fakes precisam existir antes de importar src.* (que conectam no import)"""
+    banco = os.path.join(tempfile.mkdtemp(prefix="sigilo-carga-"), "carga.db")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{banco}",
+        "AUTH_PROVIDER": "mock",
+        "OLLAMA_URL": url_ollama,
+        "CELERY_BROKER_URL": "memory://",
+        "CELERY_RESULT_BACKEND": "cache+memory://",
+        "SIGILO_RATE_LIMIT_TIERS": "user=1000000/second",
+    })
+
+    import fakeredis
+    import redis
+
+    servidor = fakeredis.FakeServer()
+    redis.from_url = lambda *a, **k: fakeredis.FakeRedis(server=servidor)
+
+
+# --- Coleta ------------------------------------------------------------------
+
+class Coletor:
+    """Durações por estágio (segundos), alimentadas pelos sinais do Celery e pelo cliente"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.duracoes = {}
+        self.publicadas = {}
+        self.iniciadas = {}
+        self.enviados = {}
+        self.concluidos = {}
+
+    def adicionar(self, estagio: str, duracao_s: float):
+        with self.lock:
+            self.duracoes.setdefault(estagio, []).append(duracao_s)
+
+    def conectar(self, workers):
+        from celery.signals import before_task_publish, task_prerun, task_postrun
+
+        # before_*: com o worker no mesmo processo a tarefa pode começar antes do after_task_publish
+        @before_task_publish.connect(weak=False)
+        def _publicada(headers=None, routing_key=None, **kwargs):
+            self.publicadas[(headers or {}).get("id")] = (routing_key, time.perf_counter())
+
+        @task_prerun.connect(weak=False)
+        def _inicio(task_id=None, **kwargs):
+            agora = time.perf_counter()
+            self.iniciadas[task_id] = agora
+            publicada = self.publicadas.pop(task_id, None)
+            if publicada:
+                self.adicionar(f"fila:{publicada[0]}", agora - publicada[1])
+
+        @task_postrun.connect(weak=False)
+        def _fim(task_id=None, task=None, **kwargs):
+            inicio = self.iniciadas.pop(task_id, None)
+            if inicio is not None:
+                self.adicionar(f"tarefa:{task.name.rsplit('.', 1)[-1]}", time.perf_counter() - inicio)
+
+        # Fim do pipeline = consolidação gravou o resultado
+        concluir_original = workers.status_store.concluir
+
+        def concluir(origem_id, resultado):
+            etag = concluir_original(origem_id, resultado)
+            with self.lock:
+                self.concluidos[str(origem_id)] = time.perf_counter()
+            return etag
+
+        workers.status_store.concluir = concluir
+
+
+class MonitorRSS(threading.Thread):
+    def __init__(self, intervalo_s: float = 0.25):
+        super().__init__(daemon=True)
+        self.intervalo_s = intervalo_s
+        self.pico_mb = rss_mb()
+        self.parar = threading.Event()
+
+    def run(self):
+        while not self.parar.wait(self.intervalo_s):
+            self.pico_mb = max(self.pico_mb, rss_mb())
+
+
+def rss_mb() -> float:
+    """RSS atual (Linux: /proc/self/status); fora do Linux, o pico via getrusage"""
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentis(valores):
+    if not valores:
+        return {"n": 0}
+    ordenados = sorted(valores)
+
+    def p(q):
+        return round(ordenados[min(len(ordenados) - 1, int(round(q / 100 * (len(ordenados) - 1))))] * 1000, 2)
+
+    return {
+        "n": len(ordenados),
+        "p50_ms": p(50),
+        "p95_ms": p(95),
+        "p99_ms": p(99),
+        "media_ms": round(sum(ordenados) / len(ordenados) * 1000, 2),
+        "max_ms": round(ordenados[-1] * 1000, 2),
+    }
+
+
+def _commit_atual():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(__file__), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+# --- Execução ----------------------------------------------------------------
+
+def executar(args):
+    stub = iniciar_stub_ollama(args.ollama_ms, args.ollama_variacao_ms)
+    preparar_ambiente(args, f"http://127.0.0.1:{stub.server_port}")
+
+    logging.disable(logging.INFO)
+    import src.api as api
+    import src.workers as workers
+    from celery.contrib.testing.worker import start_worker
+    from fastapi.testclient import TestClient
+    from src.database import engine
+    from src.models import Base
+
+    # Tabelas criadas aqui: o lifespan da API aplica migrações específicas do PostgreSQL
+    Base.metadata.create_all(bind=engine)
+    # O transporte em memória consulta as filas a cada polling_interval (padrão 1s)
+    workers.celery_app.conf.broker_transport_options = {"polling_interval": 0.01}
+    # Sem limite de prefetch: fora do AMQP o worker usa o synloop, que com o prefetch cheio só
+    # reavalia a cada 2s. A espera continua medida (as mensagens aguardam no pool de threads).
+    workers.celery_app.conf.worker_prefetch_multiplier = 0
+    coletor = Coletor()
+    coletor.conectar(workers)
+
+    # Carga do modelo fora da medição
+    detector = workers.get_detector()
+    modo = "presidio" if getattr(detector, "presidio_available", False) else "regex"
+
+    rnd = random.Random(args.semente)
+    textos = [" ".join(rnd.choice(AMOSTRAS) for _ in range(args.tamanho)) for _ in range(args.pedidos)]
+    cabecalhos = {"Authorization": "Bearer mock-carga"}
+    erros = []
+
+    rss_inicio = rss_mb()
+    monitor = MonitorRSS()
+    monitor.start()
+
+    with start_worker(
+        workers.celery_app, pool="threads", concurrency=args.concorrencia,
+        perform_ping_check=False, loglevel="WARNING", queues=FILAS,
+    ):
+        cliente = TestClient(api.app)
+
+        def enviar(i: int):
+            inicio = time.perf_counter()
+            try:
+                resposta = cliente.post("/detectar-pii", json={"texto": textos[i], "protocolo": f"CARGA-{i}"}, headers=cabecalhos)
+                coletor.adicionar("api:post", time.perf_counter() - inicio)
+                if resposta.status_code != 202:
+                    erros.append(f"POST {resposta.status_code}")
+                    return
+                with coletor.lock:
+                    coletor.enviados[resposta.json()["origem_id"]] = inicio
+            except Exception as e:
+                erros.append(f"POST {e}")
+
+        print(f"🧪 {args.pedidos} pedidos a {args.taxa}/s ({'Poisson' if args.poisson else 'intervalo fixo'}) | "
+              f"detector {modo} | {args.concorrencia} threads no worker | Ollama stub {args.ollama_ms}ms")
+
+        inicio_carga = time.perf_counter()
+        proxima = inicio_carga
+        atraso_max = 0.0
+        with ThreadPoolExecutor(max_workers=args.clientes) as clientes:
+            for i in range(args.pedidos):
+                agora = time.perf_counter()
+                if proxima > agora:
+                    time.sleep(proxima - agora)
+                else:
+                    atraso_max = max(atraso_max, agora - proxima)
+                clientes.submit(enviar, i)
+                proxima += rnd.expovariate(args.taxa) if args.poisson else 1 / args.taxa
+
+        # Espera a consolidação de tudo que foi aceito
+        limite = time.perf_counter() + args.timeout
+        while time.perf_counter() < limite:
+            with coletor.lock:
+                pendentes = set(coletor.enviados) - set(coletor.concluidos)
+            if not pendentes:
+                break
+            time.sleep(0.05)
+        fim_carga = time.perf_counter()
+
+        for origem_id, enviado in list(coletor.enviados.items()):
+            concluido = coletor.concluidos.get(origem_id)
+            if concluido is None:
+                erros.append(f"timeout {origem_id}")
+                continue
+            coletor.adicionar("ponta_a_ponta", concluido - enviado)
+            inicio = time.perf_counter()
+            resposta = cliente.get(f"/resultado/{origem_id}", headers=cabecalhos)
+            coletor.adicionar("api:resultado", time.perf_counter() - inicio)
+            if resposta.status_code != 200:
+                erros.append(f"GET /resultado {resposta.status_code}")
+
+    monitor.parar.set()
+    stub.shutdown()
+
+    concluidos = len(coletor.concluidos)
+    duracao = max(fim_carga - inicio_carga, 1e-9)
+    return {
+        "gerado_em": datetime.utcnow().isoformat(),
+        "commit": _commit_atual(),
+        "config": vars(args),
+        "ambiente": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "detector": modo,
+        },
+        "pedidos": {"enviados": args.pedidos, "aceitos": len(coletor.enviados), "concluidos": concluidos, "erros": len(erros)},
+        "exemplos_erro": erros[:10],
+        "duracao_s": round(duracao, 3),
+        "vazao_rps": round(concluidos / duracao, 3),
+        "atraso_max_gerador_ms": round(atraso_max * 1000, 2),
+        "estagios": {nome: percentis(v) for nome, v in sorted(coletor.duracoes.items())},
+        "rss_mb": {"inicio": round(rss_inicio, 1), "pico": round(monitor.pico_mb, 1), "fim": round(rss_mb(), 1)},
+    }
+
+
+def imprimir(resultado, anterior=None):
+    def delta(atual, antigo):
+        if not antigo:
+            return ""
+        return f" ({100 * (atual - antigo) / antigo:+.1f}%)"
+
+    base = (anterior or {}).get("estagios", {})
+    print(f"\n   {'estágio':<28}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)")
+    for nome, est in resultado["estagios"].items():
+        if not est["n"]:
+            continue
+        antigo = base.get(nome, {})
+        print(f"   {nome:<28}{est['n']:>6}{est['p50_ms']:>10.1f}{est['p95_ms']:>10.1f}{est['p99_ms']:>10.1f}"
+              f"{delta(est['p95_ms'], antigo.get('p95_ms'))}")
+
+    pedidos = resultado["pedidos"]
+    print(f"\n   concluídos {pedidos['concluidos']}/{pedidos['enviados']} | erros {pedidos['erros']} | "
+          f"vazão {resultado['vazao_rps']:.2f} req/s{delta(resultado['vazao_rps'], (anterior or {}).get('vazao_rps'))}")
+    rss = resultado["rss_mb"]
+    print(f"   RSS início {rss['inicio']:.0f}MB | pico {rss['pico']:.0f}MB"
+          f"{delta(rss['pico'], (anterior or {}).get('rss_mb', {}).get('pico'))} | fim {rss['fim']:.0f}MB")
+    if resultado["atraso_max_gerador_ms"] > 100:
+        print(f"   ⚠️ Gerador atrasou até {resultado['atraso_max_gerador_ms']:.0f}ms: aumente --clientes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga local do pipeline SIGILO")
+    parser.add_argument("--taxa", type=float, default=5.0, help="pedidos por segundo")
+    parser.add_argument("--pedidos", type=int, default=100)
+    parser.add_argument("--poisson", action="store_true", help="chegadas Poisson em vez de intervalo fixo")
+    parser.add_argument("--tamanho", type=int, default=2, help="amostras concatenadas por texto")
+    parser.add_argument("--concorrencia", type=int, default=4, help="threads do worker Celery")
+    parser.add_argument("--clientes", type=int, default=16, help="threads que enviam os POSTs")
+    parser.add_argument("--ollama-ms", type=float, default=600.0, help="latência média do stub do Ollama")
+    parser.add_argument("--ollama-variacao-ms", type=float, default=100.0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="espera máxima pela conclusão (s)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", help="grava o resultado em JSON")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+
+    resultado = executar(args)
+    imprimir(resultado, anterior)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultado salvo em {args.saida}")
+
+    return 1 if resultado["pedidos"]["erros"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
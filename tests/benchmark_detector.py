@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Benchmark do PIIDetectorLAI.detect() com gate de regressão de vazão e de qualidade.
+
+Sobre o corpus sintético de tests/corpus_lai.py (tamanhos e densidades de PII variados):
+- vazão de detect() (docs/s e KB/s, total e por tamanho de documento)
+- tempo de cada camada (_detect_with_presidio, _detect_with_regex, _detect_*_contextual,
+  _detect_with_gliner) e do pré-filtro de gatilhos, chamadas diretamente na ordem do pipeline
+- precisão, recall e F1 por tipo, comparando com as anotações do corpus
+  (entidade prevista conta como acerto se for do mesmo tipo e se sobrepuser à anotada)
+
+Modos: regex (Presidio/GLiNER desligados) e presidio (se o modelo spaCy estiver instalado).
+A vazão é também normalizada por uma referência de CPU medida na mesma execução, para que
+um baseline gravado numa máquina sirva de comparação razoável em outra do mesmo tipo.
+
+Gate (código de saída 1 se falhar):
+- precisão/recall abaixo dos mínimos (--min-precisao/--min-recall, por padrão os do modo regex)
+- com --baseline: vazão normalizada caiu mais que --tolerancia, ou precisão/recall caíram
+  mais que --tolerancia-qualidade
+
+Execute:
+    python tests/benchmark_detector.py --salvar tests/baseline_detector.json
+    python tests/benchmark_detector.py --baseline tests/baseline_detector.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+import warnings
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+logging.disable(logging.INFO)
+warnings.filterwarnings("ignore")
+
+from corpus_lai import TIPOS_AVALIADOS, gerar_corpus  # noqa: E402
+
+# Tipos do Presidio -> tipos do SIGILO (os demais ficam fora da avaliação)
+TIPOS_PRESIDIO = {
+    "PERSON": "PESSOA",
+    "EMAIL_ADDRESS": "EMAIL",
+    "PHONE_NUMBER": "TELEFONE",
+    "LOCATION": "ENDERECO",
+}
+
+CAMADAS = ["presidio", "prefiltro", "regex", "contextual_nomes", "contextual_enderecos", "contextual_telefones", "gliner"]
+
+
+def referencia_cpu(repeticoes: int = 3) -> float:
+    """Operações/s de uma carga fixa de regex + Python puro (normaliza a vazão entre máquinas)"""
+    padrao = re.compile(r"\b\d{3}\.\d{3}\.\d{3}-\d{2}\b|\b[A-Z][a-z]+\s+[A-Z][a-z]+\b")
+    texto = "Requerente Maria Souza, CPF 529.982.247-25, solicita cópia do contrato. " * 200
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for _ in range(50):
+            sum(1 for _ in padrao.finditer(texto))
+            sorted(texto.split())
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return 50 / melhor
+
+
+def _tipo(tipo: str) -> str:
+    return TIPOS_PRESIDIO.get(tipo, tipo)
+
+
+def avaliar(corpus, previstos):
+    """TP/FP/FN por tipo: cada anotação casa com no máximo uma previsão do mesmo tipo que a sobreponha"""
+    contagem = defaultdict(lambda: {"tp": 0, "fp": 0, "fn": 0})
+    for doc, spans in zip(corpus, previstos):
+        livres = [(_tipo(s.type), s.start, s.end) for s in spans if _tipo(s.type) in TIPOS_AVALIADOS]
+        for tipo, inicio, fim in doc["entidades"]:
+            achou = next((p for p in livres if p[0] == tipo and p[1] < fim and inicio < p[2]), None)
+            if achou:
+                livres.remove(achou)
+                contagem[tipo]["tp"] += 1
+            else:
+                contagem[tipo]["fn"] += 1
+        for tipo, _, _ in livres:
+            contagem[tipo]["fp"] += 1
+
+    def metricas(c):
+        p = c["tp"] / (c["tp"] + c["fp"]) if c["tp"] + c["fp"] else 1.0
+        r = c["tp"] / (c["tp"] + c["fn"]) if c["tp"] + c["fn"] else 1.0
+        f1 = 2 * p * r / (p + r) if p + r else 0.0
+        return {**c, "precisao": round(p, 4), "recall": round(r, 4), "f1": round(f1, 4)}
+
+    total = {"tp": 0, "fp": 0, "fn": 0}
+    for c in contagem.values():
+        for k in total:
+            total[k] += c[k]
+    return metricas(total), {tipo: metricas(c) for tipo, c in sorted(contagem.items())}
+
+
+def medir_camadas(detector, corpus):
+    """Tempo (ms) de cada camada por documento, com as entidades acumuladas como no _detect_layers"""
+    tempos = defaultdict(list)
+    for doc in corpus:
+        texto = doc["texto"]
+        existentes = []
+
+        inicio = time.perf_counter()
+        existentes += detector._detect_with_presidio(texto)
+        tempos["presidio"].append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        ativos = detector.patterns.ativos(texto)
+        tempos["prefiltro"].append(time.perf_counter() - inicio)
+
+        for camada, familia, detectar in (
+            ("regex", None, detector._detect_with_regex),
+            ("contextual_nomes", "nome", detector._detect_names_contextual),
+            ("contextual_enderecos", "endereco", detector._detect_addresses_contextual),
+            ("contextual_telefones", "telefone", detector._detect_phones_contextual),
+        ):
+            inicio = time.perf_counter()
+            # Famílias sem padrão ativo não são chamadas, como no _detect_layers
+            if familia is None or not ativos.isdisjoint(detector.patterns.familia(familia)):
+                existentes += detectar(texto, existentes, ativos)
+            tempos[camada].append(time.perf_counter() - inicio)
+
+        if detector.gliner_available:
+            inicio = time.perf_counter()
+            existentes += detector._detect_with_gliner(texto, existentes)
+            tempos["gliner"].append(time.perf_counter() - inicio)
+
+    resumo = {}
+    for camada in CAMADAS:
+        valores = sorted(tempos.get(camada, []))
+        if not valores:
+            continue
+        resumo[camada] = {
+            "total_ms": round(sum(valores) * 1000, 2),
+            "p50_ms": round(valores[len(valores) // 2] * 1000, 3),
+            "p95_ms": round(valores[min(len(valores) - 1, int(0.95 * len(valores)))] * 1000, 3),
+        }
+    return resumo
+
+
+def executar_modo(detector, corpus, repeticoes: int):
+    # Aquecimento (compilação de regex, caches do spaCy)
+    for doc in corpus[:5]:
+        detector.detect(doc["texto"])
+
+    total_kb = sum(len(d["texto"]) for d in corpus) / 1024
+
+    # Melhor de N passadas: reduz ruído de agendamento sem esconder regressões reais.
+    # A normalização usa a referência de CPU medida antes e depois de cada passada (mediana das
+    # razões): mudanças de frequência/carga da máquina afetam as duas medições juntas
+    melhor, previstos = float("inf"), None
+    por_tamanho = defaultdict(float)
+    normalizados, referencias = [], []
+    for _ in range(repeticoes):
+        ref_antes = referencia_cpu()
+        tempos_doc = []
+        resultado = []
+        inicio_total = time.perf_counter()
+        for doc in corpus:
+            inicio = time.perf_counter()
+            resultado.append(detector.detect(doc["texto"])["entities"])
+            tempos_doc.append(time.perf_counter() - inicio)
+        total = time.perf_counter() - inicio_total
+        referencias.append((ref_antes + referencia_cpu()) / 2)
+        normalizados.append(total_kb / total / referencias[-1])
+        if total < melhor:
+            melhor, previstos = total, resultado
+            por_tamanho = defaultdict(float)
+            for doc, t in zip(corpus, tempos_doc):
+                por_tamanho[doc["frases"]] += t
+
+    qtd_por_tamanho = defaultdict(int)
+    for doc in corpus:
+        qtd_por_tamanho[doc["frases"]] += 1
+
+    geral, por_tipo = avaliar(corpus, previstos)
+    kb_s = total_kb / melhor
+    return {
+        "documentos": len(corpus),
+        "kb": round(total_kb, 1),
+        "docs_s": round(len(corpus) / melhor, 2),
+        "kb_s": round(kb_s, 2),
+        "kb_s_normalizado": round(sorted(normalizados)[len(normalizados) // 2], 5),
+        "referencia_cpu_ops_s": round(sorted(referencias)[len(referencias) // 2], 2),
+        "docs_s_por_tamanho": {
+            str(frases): round(qtd_por_tamanho[frases] / t, 2) for frases, t in sorted(por_tamanho.items())
+        },
+        "camadas": medir_camadas(detector, corpus),
+        "qualidade": geral,
+        "qualidade_por_tipo": por_tipo,
+    }
+
+
+def verificar(resultado, args, baseline):
+    falhas = []
+    for modo, r in resultado["modos"].items():
+        q = r["qualidade"]
+        if q["precisao"] < args.min_precisao:
+            falhas.append(f"[{modo}] precisão {q['precisao']:.3f} < mínimo {args.min_precisao}")
+        if q["recall"] < args.min_recall:
+            falhas.append(f"[{modo}] recall {q['recall']:.3f} < mínimo {args.min_recall}")
+
+        base = (baseline or {}).get("modos", {}).get(modo)
+        if not base:
+            continue
+        limite = base["kb_s_normalizado"] * (1 - args.tolerancia)
+        if r["kb_s_normalizado"] < limite:
+            falhas.append(
+                f"[{modo}] vazão normalizada {r['kb_s_normalizado']:.5f} < {limite:.5f} "
+                f"(baseline {base['kb_s_normalizado']:.5f} - {args.tolerancia:.0%})"
+            )
+        for metrica in ("precisao", "recall"):
+            anterior = base["qualidade"][metrica]
+            if q[metrica] < anterior - args.tolerancia_qualidade:
+                falhas.append(f"[{modo}] {metrica} caiu de {anterior:.3f} para {q[metrica]:.3f}")
+    return falhas
+
+
+def imprimir(resultado, baseline):
+    for modo, r in resultado["modos"].items():
+        base = (baseline or {}).get("modos", {}).get(modo, {})
+        delta = ""
+        if base:
+            delta = f" ({100 * (r['kb_s_normalizado'] / base['kb_s_normalizado'] - 1):+.1f}% vs baseline)"
+        print(f"\n🧪 Modo {modo}: {r['documentos']} docs, {r['kb']}KB -> {r['docs_s']} docs/s, {r['kb_s']} KB/s{delta}")
+        print("   docs/s por tamanho (frases): " + ", ".join(f"{k}: {v}" for k, v in r["docs_s_por_tamanho"].items()))
+        print(f"   {'camada':<22}{'total':>10}{'p50':>9}{'p95':>9}  (ms)")
+        for camada, c in r["camadas"].items():
+            print(f"   {camada:<22}{c['total_ms']:>10.1f}{c['p50_ms']:>9.3f}{c['p95_ms']:>9.3f}")
+        q = r["qualidade"]
+        print(f"   qualidade: P={q['precisao']:.3f} R={q['recall']:.3f} F1={q['f1']:.3f} (tp={q['tp']} fp={q['fp']} fn={q['fn']})")
+        for tipo, t in r["qualidade_por_tipo"].items():
+            print(f"      {tipo:<16} P={t['precisao']:.3f} R={t['recall']:.3f} (tp={t['tp']} fp={t['fp']} fn={t['fn']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark e gate de regressão do detector")
+    parser.add_argument("--documentos", type=int, default=120)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--modos", default="regex,presidio", help="regex, presidio ou ambos (separados por vírgula)")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior (--salvar) para o gate")
+    parser.add_argument("--salvar", help="grava o resultado em JSON (serve de baseline)")
+    parser.add_argument("--tolerancia", type=float, default=0.15, help="queda máxima de vazão normalizada")
+    parser.add_argument("--tolerancia-qualidade", type=float, default=0.01, help="queda máxima de precisão/recall")
+    parser.add_argument("--min-precisao", type=float, default=0.40)
+    parser.add_argument("--min-recall", type=float, default=0.85)
+    args = parser.parse_args()
+
+    from src.detector import PIIDetectorLAI
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    corpus = gerar_corpus(args.documentos, args.semente)
+    detector = PIIDetectorLAI()
+    presidio, gliner = detector.presidio_available, detector.gliner_available
+    resultado = {
+        "gerado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "corpus": {"documentos": args.documentos, "semente": args.semente},
+        "modos": {},
+    }
+    for modo in [m.strip() for m in args.modos.split(",") if m.strip()]:
+        if modo == "regex":
+            detector.presidio_available, detector.gliner_available = False, False
+        elif modo == "presidio":
+            if not presidio:
+                print("⚠️ Modo presidio ignorado: Presidio/spaCy não disponível neste ambiente")
+                continue
+            detector.presidio_available, detector.gliner_available = presidio, gliner
+        else:
+            parser.error(f"modo desconhecido: {modo}")
+        resultado["modos"][modo] = executar_modo(detector, corpus, args.repeticoes)
+
+    imprimir(resultado, baseline)
+
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultado salvo em {args.salvar}")
+
+    falhas = verificar(resultado, args, baseline)
+    if falhas:
+        print("\n❌ Gate de regressão falhou:")
+        for falha in falhas:
+            print(f"   - {falha}")
+        return 1
+    print("\n✅ Gate de regressão OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
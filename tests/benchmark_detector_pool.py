@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Benchmark de vazão do pool de processos de detecção (DetectionExecutor).
+Simula o worker Celery com pool de threads: N threads submetem textos ao executor.
+Execute: python tests/benchmark_detector_pool.py [qtd_textos]
+"""
+
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+logging.disable(logging.INFO)
+
+from src.detector import PIIDetectorLAI  # noqa: E402
+from src.detector_pool import DetectionExecutor  # noqa: E402
+
+PROCESSOS = [1, 2, 4, 8]
+
+TEXTO_BASE = (
+    "Meu nome é João Silva, CPF 123.456.789-00, moro na Rua das Flores, nº 12. "
+    "Solicito cópia do contrato 2024/045 da Secretaria de Obras e informações sobre a licitação. "
+    "Telefone: (61) 99876-5432, email joao.silva@email.com. "
+)
+
+
+def main():
+    qtd = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    textos = [TEXTO_BASE * (1 + i % 4) for i in range(qtd)]
+    documento_longo = TEXTO_BASE * 600
+
+    detector = PIIDetectorLAI()
+    modo = "Presidio" if detector.presidio_available else "regex-only"
+    print(f"🧪 Pool de detecção ({modo}) | {qtd} textos | documento longo de {len(documento_longo)} chars | {os.cpu_count()} CPUs")
+
+    # Referência: processo único, sem pool
+    inicio = time.perf_counter()
+    for t in textos:
+        detector.detect(t)
+    base = qtd / (time.perf_counter() - inicio)
+    inicio = time.perf_counter()
+    detector.detect(documento_longo)
+    base_longo_ms = (time.perf_counter() - inicio) * 1000
+    print(f"   sem pool    {base:>8.1f} textos/s   doc longo {base_longo_ms:>8.1f}ms")
+
+    for processos in PROCESSOS:
+        executor = DetectionExecutor(detector, processos, max_pendentes=processos * 2)
+        with ThreadPoolExecutor(max_workers=processos) as threads:
+            inicio = time.perf_counter()
+            list(threads.map(executor.detect, textos))
+            vazao = qtd / (time.perf_counter() - inicio)
+        inicio = time.perf_counter()
+        executor.detect(documento_longo)
+        longo_ms = (time.perf_counter() - inicio) * 1000
+        executor.shutdown()
+        print(f"   {processos} processo(s) {vazao:>8.1f} textos/s   doc longo {longo_ms:>8.1f}ms   ({vazao / base:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
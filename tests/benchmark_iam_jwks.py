@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark da validação de tokens Keycloak: JWT local (JWKS em cache) vs Introspection.
+Sobe um IdP stub local (JWKS + introspection), sem depender de um Keycloak real.
+Execute: python tests/benchmark_iam_jwks.py [iteracoes]
+"""
+
+import base64
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwt
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+REALM = "sigilo-realm"
+KID = "stub-key-1"
+
+
+def _b64(n: int) -> str:
+    raw = n.to_bytes((n.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def gerar_chave():
+    chave = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = chave.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    pub = chave.public_key().public_numbers()
+    jwk = {"kty": "RSA", "kid": KID, "use": "sig", "alg": "RS256", "n": _b64(pub.n), "e": _b64(pub.e)}
+    return pem, jwk
+
+
+def subir_idp_stub(jwk: dict):
+    """IdP mínimo: /certs devolve o JWKS e /token/introspect aceita qualquer token"""
+    contadores = {"certs": 0, "introspect": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def _json(self, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.endswith("/protocol/openid-connect/certs"):
+                contadores["certs"] += 1
+                return self._json({"keys": [jwk]})
+            self.send_response(404)
+            self.end_headers()
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.path.endswith("/protocol/openid-connect/token/introspect"):
+                contadores["introspect"] += 1
+                return self._json({"active": True, "sub": "user-stub", "realm_access": {"roles": ["user"]}})
+            self.send_response(404)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, contadores
+
+
+def medir(nome: str, fn, iteracoes: int) -> dict:
+    fn()  # aquecimento (carrega JWKS / cliente Keycloak)
+    tempos = []
+    for _ in range(iteracoes):
+        inicio = time.perf_counter()
+        fn()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    resultado = {
+        "p50_ms": round(tempos[len(tempos) // 2], 3),
+        "p99_ms": round(tempos[int(len(tempos) * 0.99) - 1], 3),
+        "media_ms": round(sum(tempos) / len(tempos), 3),
+    }
+    print(f"   {nome:<28} p50={resultado['p50_ms']:.3f}ms  p99={resultado['p99_ms']:.3f}ms  média={resultado['media_ms']:.3f}ms")
+    return resultado
+
+
+def main():
+    iteracoes = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    pem, jwk = gerar_chave()
+    server, contadores = subir_idp_stub(jwk)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    os.environ.update({
+        "AUTH_PROVIDER": "keycloak",
+        "KEYCLOAK_URL": base_url,
+        "KEYCLOAK_REALM": REALM,
+        "KEYCLOAK_CLIENT_ID": "sigilo-backend",
+        "KEYCLOAK_CLIENT_SECRET": "stub",
+    })
+    from src.iam.iam_man import IAMManager
+
+    agora = int(time.time())
+    token_jwt = jwt.encode(
+        {"sub": "user-stub", "iss": f"{base_url}/realms/{REALM}", "iat": agora, "exp": agora + 3600,
+         "realm_access": {"roles": ["user"]}},
+        pem.decode(),
+        algorithm="RS256",
+        headers={"kid": KID},
+    )
+    token_opaco = "opaco-" + "x" * 40
+
+    iam = IAMManager()
+    print(f"🔐 Benchmark IAM Keycloak ({iteracoes} iterações) contra IdP stub em {base_url}")
+    local = medir("JWT local (JWKS em cache)", lambda: iam._validate_keycloak(token_jwt), iteracoes)
+    remoto = medir("Introspection (HTTP)", lambda: iam._validate_keycloak(token_opaco), iteracoes)
+    print(f"   Requisições ao IdP: certs={contadores['certs']} introspect={contadores['introspect']}")
+    print(f"🚀 Speedup p50: {remoto['p50_ms'] / max(local['p50_ms'], 1e-9):.1f}x")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark de serialização com payloads realistas:
+- mensagem Celery entre detecção e banco/LLM (texto + entidades compactas), via kombu
+- valor de status no Redis com o dicionário de saída completo, via src.status_store
+Execute: python tests/benchmark_serializacao.py [iteracoes]
+"""
+
+import importlib
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+logging.disable(logging.CRITICAL)
+
+from kombu.serialization import dumps, loads, prepare_accept_content  # noqa: E402
+
+ACEITOS = prepare_accept_content(["json", "msgpack"])
+
+LINHA = (
+    "Requerente: Maria Souza, CPF 529.982.247-25, email maria.souza@exemplo.com, "
+    "telefone (61) 99999-8888. Solicito cópia integral do contrato 2024/099 e aditivos.\n"
+)
+
+
+def _payloads(linhas: int):
+    texto = LINHA * linhas
+    entidades = []
+    for i in range(linhas):
+        base = i * len(LINHA)
+        entidades += [
+            ("PESSOA", "Maria Souza", base + 12, base + 23, 0.85, "contextual"),
+            ("CPF", "529.982.247-25", base + 29, base + 43, 0.99, "regex"),
+            ("EMAIL", "maria.souza@exemplo.com", base + 51, base + 74, 0.95, "regex"),
+        ]
+    anonimizado = texto.replace("Maria Souza", "<PESSOA>").replace("529.982.247-25", "<CPF>")
+    agora = datetime.utcnow().isoformat()
+    mensagem = {
+        "origem_id": "3f2b7c1e-0000-4000-8000-000000000000",
+        "texto": texto,
+        "protocolo": "LAI-2024-0001",
+        "usuario_id": "user-123",
+        "resultado_deteccao": {
+            "anonymized_text": anonimizado,
+            "entities": entidades,
+            "entities_detected": len(entidades),
+            "entity_types": {"PESSOA": linhas, "CPF": linhas, "EMAIL": linhas},
+            "risk_level": "alto",
+        },
+        "start_time": agora,
+    }
+    status = {
+        "origem_id": mensagem["origem_id"],
+        "status": "completed",
+        "step": "finished",
+        "progress": 100,
+        "result": {
+            "origem_id": mensagem["origem_id"],
+            "texto_anonimizado": anonimizado,
+            "resumo_inteligente": {"assunto": "Contratos", "resumo": "Pedido de cópia de contrato. " * 10},
+            "estatisticas": {"total_entidades": len(entidades), "por_tipo": {"CPF": linhas}, "nivel_risco": "alto"},
+            "auditoria": {"usuario_id": "user-123", "timestamp_inicio": agora, "timestamp_fim": agora},
+        },
+        "updated_at": agora,
+    }
+    return mensagem, status
+
+
+def _medir(codificar, decodificar, iteracoes: int, tamanho=len):
+    bruto = codificar()
+    inicio = time.perf_counter()
+    for _ in range(iteracoes):
+        codificar()
+    enc = (time.perf_counter() - inicio) * 1000 / iteracoes
+    inicio = time.perf_counter()
+    for _ in range(iteracoes):
+        decodificar(bruto)
+    dec = (time.perf_counter() - inicio) * 1000 / iteracoes
+    return tamanho(bruto), enc, dec
+
+
+def main():
+    iteracoes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    for linhas in (5, 200):
+        mensagem, status = _payloads(linhas)
+        print(f"🧪 Payload com {linhas * 3} entidades ({iteracoes} iterações)")
+
+        for serializer in ("json", "msgpack"):
+            try:
+                def codificar():
+                    return dumps(mensagem, serializer=serializer)
+
+                # dumps -> (content_type, encoding, corpo); o consumidor aceita os dois formatos
+                tamanho, enc, dec = _medir(
+                    codificar,
+                    lambda b: loads(b[2], b[0], b[1], accept=ACEITOS),
+                    iteracoes,
+                    tamanho=lambda b: len(b[2]),
+                )
+            except Exception as e:
+                print(f"   celery {serializer:<8} indisponível: {e}")
+                continue
+            print(f"   celery {serializer:<8} {tamanho / 1024:8.1f}KB  codifica={enc:7.3f}ms  decodifica={dec:7.3f}ms")
+
+        for codec in ("json", "orjson", "msgpack"):
+            os.environ["SIGILO_STATUS_CODEC"] = codec
+            import src.status_store as status_store
+            status_store = importlib.reload(status_store)
+            if status_store.CODEC != codec:
+                print(f"   status {codec:<8} indisponível (usando {status_store.CODEC})")
+                continue
+            tamanho, enc, dec = _medir(lambda: status_store.codificar(status), status_store.decodificar, iteracoes)
+            print(f"   status {codec:<8} {tamanho / 1024:8.1f}KB  codifica={enc:7.3f}ms  decodifica={dec:7.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
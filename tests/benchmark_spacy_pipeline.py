@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark do pipeline spaCy usado pelo Presidio: completo vs. enxuto (SIGILO_SPACY_EXCLUDE).
+Cada configuração roda em um subprocesso limpo para medir carga e memória sem interferência.
+Execute (na imagem heavy): python tests/benchmark_spacy_pipeline.py [modelo] [iteracoes]
+"""
+
+import json
+import subprocess
+import sys
+
+TEXTOS = [
+    "Solicito cópia do contrato 2024/99. Meu nome é Maria Souza, CPF 123.456.789-00, telefone (21) 98765-4321.",
+    "Solicito informações sobre a licitação de obras da Secretaria de Educação referentes ao exercício de 2023.",
+    "Denunciante: Carlos Santos, residente na Rua das Flores 123, email carlos@email.com.",
+]
+
+CONFIGURACOES = {
+    "completo": [],
+    "enxuto": ["parser"],
+    # Só para comparação: sem lemas o reforço por contexto do Presidio não atua
+    "sem_lemas": ["parser", "tagger", "attribute_ruler", "lemmatizer"],
+}
+
+MEDIR = r"""
+import json, sys, time
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for linha in f:
+            if linha.startswith('VmRSS:'):
+                return int(linha.split()[1]) / 1024
+    return 0.0
+
+modelo, excluir, iteracoes, textos = sys.argv[1], json.loads(sys.argv[2]), int(sys.argv[3]), json.loads(sys.argv[4])
+import spacy
+rss_antes = rss_mb()
+inicio = time.perf_counter()
+nlp = spacy.load(modelo, exclude=excluir)
+carga_ms = (time.perf_counter() - inicio) * 1000
+docs = [nlp(t) for t in textos]
+tokens = [tok for doc in docs for tok in doc if tok.is_alpha]
+com_lema = sum(1 for tok in tokens if tok.lemma_) / max(len(tokens), 1)
+inicio = time.perf_counter()
+for _ in range(iteracoes):
+    for t in textos:
+        nlp(t)
+por_texto_ms = (time.perf_counter() - inicio) * 1000 / (iteracoes * len(textos))
+print(json.dumps({
+    'pipeline': nlp.pipe_names,
+    'carga_ms': round(carga_ms, 1),
+    'rss_modelo_mb': round(rss_mb() - rss_antes, 1),
+    'por_texto_ms': round(por_texto_ms, 3),
+    'com_lema': round(com_lema, 2),
+}))
+"""
+
+
+def main():
+    modelo = sys.argv[1] if len(sys.argv) > 1 else "en_core_web_lg"
+    iteracoes = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    print(f"🧪 Benchmark spaCy '{modelo}' ({iteracoes} iterações x {len(TEXTOS)} textos)")
+    resultados = {}
+    for nome, excluir in CONFIGURACOES.items():
+        saida = subprocess.run(
+            [sys.executable, "-c", MEDIR, modelo, json.dumps(excluir), str(iteracoes), json.dumps(TEXTOS)],
+            capture_output=True, text=True, check=True,
+        )
+        r = json.loads(saida.stdout.strip().splitlines()[-1])
+        resultados[nome] = r
+        print(f"   {nome:<9} carga={r['carga_ms']:>8.1f}ms  RSS={r['rss_modelo_mb']:>7.1f}MB  "
+              f"por texto={r['por_texto_ms']:.3f}ms  lemas={r['com_lema']:.0%}  pipeline={r['pipeline']}")
+
+    completo, enxuto = resultados["completo"], resultados["enxuto"]
+    print(f"📉 Carga: -{100 * (1 - enxuto['carga_ms'] / completo['carga_ms']):.0f}% | "
+          f"RSS: -{100 * (1 - enxuto['rss_modelo_mb'] / max(completo['rss_modelo_mb'], 1e-9)):.0f}% | "
+          f"Análise: -{100 * (1 - enxuto['por_texto_ms'] / completo['por_texto_ms']):.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark da representação das entidades em documentos com muitas entidades:
+memória (dict vs Span) e custo de serialização da mensagem do Celery
+(JSON com dicts, JSON compacto, msgpack compacto).
+Execute: python tests/benchmark_spans.py [linhas] [iteracoes]
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+logging.disable(logging.CRITICAL)
+
+from src.spans import Span, spans_para_compacto, spans_para_dicts, spans_de_compacto  # noqa: E402
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+LINHA = (
+    "Requerente: Maria Souza, CPF 529.982.247-25, email maria.souza@exemplo.com, "
+    "telefone (61) 99999-8888, CEP 70000-000, nascida em 01/02/1990.\n"
+)
+
+
+def _memoria(fabrica) -> float:
+    tracemalloc.start()
+    objetos = fabrica()
+    atual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objetos
+    return atual / 1024
+
+
+def _tempo_ms(fn, iteracoes: int) -> float:
+    fn()
+    inicio = time.perf_counter()
+    for _ in range(iteracoes):
+        fn()
+    return (time.perf_counter() - inicio) * 1000 / iteracoes
+
+
+def main():
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    iteracoes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    from src.detector import PIIDetectorLAI
+    os.environ.setdefault("SIGILO_CHUNK_TAMANHO", "1000000")
+    texto = LINHA * linhas
+    spans = PIIDetectorLAI().detect(texto)["entities"]
+    print(f"🧪 Documento com {len(texto)} chars e {len(spans)} entidades ({iteracoes} iterações)")
+
+    tuplas = [s.to_tuple() for s in spans]
+    kb_dicts = _memoria(lambda: [dict(zip(("type", "value", "start", "end", "confidence", "method"), t)) for t in tuplas])
+    kb_spans = _memoria(lambda: [Span(*t) for t in tuplas])
+    print(f"   memória  dicts={kb_dicts:8.1f}KB  Span={kb_spans:8.1f}KB  (-{100 * (1 - kb_spans / kb_dicts):.0f}%)")
+
+    formatos = {
+        "json dicts": (lambda: json.dumps(spans_para_dicts(spans)), json.loads),
+        "json compacto": (lambda: json.dumps(spans_para_compacto(spans)), json.loads),
+    }
+    if msgpack is not None:
+        formatos["msgpack compacto"] = (lambda: msgpack.packb(spans_para_compacto(spans)), msgpack.unpackb)
+    else:
+        print("   (msgpack não instalado: formato binário não medido)")
+
+    for nome, (codificar, decodificar) in formatos.items():
+        payload = codificar()
+        enc_ms = _tempo_ms(codificar, iteracoes)
+        dec_ms = _tempo_ms(lambda: spans_de_compacto(decodificar(payload)), iteracoes)
+        print(f"   {nome:<17} {len(payload) / 1024:8.1f}KB  codifica={enc_ms:7.3f}ms  decodifica={dec_ms:7.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark do custo dos validadores de dígito verificador por match (camada regex).
+Mede cada validador isolado e a camada regex completa com e sem validação.
+Execute: python tests/benchmark_validadores.py [iteracoes]
+"""
+
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+logging.disable(logging.CRITICAL)
+
+from src.recognizers.validadores import VALIDADORES  # noqa: E402
+from src.recognizers.registry import PatternRegistry  # noqa: E402
+
+AMOSTRAS = {
+    "cpf": ["529.982.247-25", "52998224725", "123.456.789-00", "12345678900"],
+    "cnpj": ["11.222.333/0001-81", "11222333000181", "12.345.678/0001-90", "12345678901234"],
+    "luhn": ["4111 1111 1111 1111", "5500-0000-0000-0004", "1234 5678 9012 3456"],
+    "pis": ["120.54898.86-6", "123.45678.90-1"],
+    "titulo_eleitor": ["0043 5687 0906", "1234 5678 9012"],
+}
+
+TEXTO = (
+    "Processo 12345678901234, protocolo 00012345678. Requerente CPF 529.982.247-25, "
+    "CNPJ 11.222.333/0001-81, cartão 4111 1111 1111 1111, PIS 120.54898.86-6, "
+    "título 0043 5687 0906, telefone 61999998888, contrato 98765432100. "
+) * 20
+
+
+def _camada_regex(registry: PatternRegistry, texto: str, validar: bool) -> int:
+    total = 0
+    for rec in registry.familia("regex"):
+        for match in rec.regex.finditer(texto):
+            if not validar or rec.confianca_para(texto, match.start(rec.grupo), match.group(rec.grupo)) is not None:
+                total += 1
+    return total
+
+
+def main():
+    iteracoes = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    print(f"🧪 Validadores isolados ({iteracoes} chamadas por amostra)")
+    for nome, amostras in AMOSTRAS.items():
+        validador = VALIDADORES[nome]
+        inicio = time.perf_counter_ns()
+        for _ in range(iteracoes):
+            for valor in amostras:
+                validador(valor)
+        por_match_us = (time.perf_counter_ns() - inicio) / 1e3 / (iteracoes * len(amostras))
+        print(f"   {nome:<15} {por_match_us:.2f}µs/match")
+
+    registry = PatternRegistry("br_documentos")
+    repeticoes = max(iteracoes // 200, 10)
+    resultados = {}
+    for validar in (False, True):
+        _camada_regex(registry, TEXTO, validar)
+        inicio = time.perf_counter_ns()
+        for _ in range(repeticoes):
+            matches = _camada_regex(registry, TEXTO, validar)
+        resultados[validar] = ((time.perf_counter_ns() - inicio) / 1e6 / repeticoes, matches)
+
+    (sem_ms, sem_n), (com_ms, com_n) = resultados[False], resultados[True]
+    print(f"🧪 Camada regex em {len(TEXTO)} chars ({repeticoes} repetições)")
+    print(f"   sem validação: {sem_ms:.3f}ms ({sem_n} matches)")
+    print(f"   com validação: {com_ms:.3f}ms ({com_n} matches aceitos)")
+    print(f"📈 Overhead: +{com_ms - sem_ms:.3f}ms por texto "
+          f"({(com_ms - sem_ms) * 1e3 / max(sem_n, 1):.2f}µs por match) | "
+          f"{sem_n - com_n} falsos positivos descartados")
+
+
+if __name__ == "__main__":
+    main()
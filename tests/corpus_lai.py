@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Gerador de corpus sintético de pedidos LAI com anotações (tipo, início, fim) de cada dado pessoal.
+
+Os textos misturam frases de pedido sem dado pessoal, frases com PII em formatos usuais
+(CPF/CNPJ com dígito verificador válido, telefones com e sem DDD, e-mails, endereços, nomes
+com e sem contexto) e "iscas" que não são PII (protocolos, leis, valores, datas de eventos).
+Tamanho (nº de frases) e densidade (fração de frases com PII) são parâmetros.
+
+Casos que o detector atual não cobre (endereços no padrão do DF, nome só na assinatura)
+entram de propósito: o recall medido é o real, não o do formato que os padrões já conhecem.
+
+Uso como módulo: gerar_corpus(...) / gerar_documento(...)
+Uso direto (JSONL): python tests/corpus_lai.py [qtd] [semente] > corpus.jsonl
+"""
+
+import json
+import random
+import re
+import sys
+from typing import Dict, List, Tuple
+
+PRENOMES = [
+    "Ana", "Maria", "José", "João", "Francisco", "Antônio", "Carlos", "Paulo", "Pedro", "Lucas",
+    "Luiza", "Fernanda", "Juliana", "Patrícia", "Aline", "Marcos", "Rafael", "Gabriel", "Beatriz", "Camila",
+]
+SOBRENOMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes",
+    "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa",
+]
+LOGRADOUROS = ["Rua", "Avenida", "Alameda", "Travessa"]
+NOMES_VIA = ["das Flores", "Central", "dos Ipês", "Goiás", "São Paulo", "das Acácias", "Brasil", "do Sol"]
+SIGLAS_DF = ["SQS", "SQN", "QNL", "QNM", "SHIS QI", "CLN"]
+DOMINIOS = ["gmail.com", "hotmail.com", "exemplo.com.br", "yahoo.com.br", "outlook.com"]
+ORGAOS = [
+    "Secretaria de Saúde", "Secretaria de Educação", "Administração Regional de Taguatinga",
+    "Departamento de Estradas de Rodagem", "Secretaria de Obras", "Companhia Energética de Brasília",
+]
+
+# Frases sem dado pessoal (pedido em si); {ORGAO}/{ANO}/{NUM} são preenchidos, não anotados
+FRASES_NEUTRAS = [
+    "Solicito cópia integral do contrato {NUM}/{ANO} firmado com o órgão {ORGAO}.",
+    "Requeiro a relação de servidores lotados no órgão {ORGAO} em {ANO}, com cargos e datas de posse.",
+    "Gostaria de saber o andamento do processo 00040-000{NUM}/{ANO}-11.",
+    "Com base na Lei nº 12.527/2011, peço informações sobre os gastos com diárias em {ANO}.",
+    "Peço a planilha de medições da obra de reforma da escola classe {NUM} e os aditivos assinados.",
+    "Quais foram os valores pagos, acima de R$ 1.500,00, a empresas de limpeza em {ANO}?",
+    "Solicito as atas das reuniões do conselho realizadas entre 15/03/{ANO} e 30/06/{ANO}.",
+    "Desejo receber a resposta em formato eletrônico, de preferência em planilha aberta.",
+    "Informo que o pedido anterior, protocolo LAI-{ANO}-{NUM}, não foi respondido no prazo legal.",
+]
+
+# Frases com PII: {TIPO} vira um valor gerado e anotado
+FRASES_PII = [
+    "Meu nome é {PESSOA} e moro no Distrito Federal.",
+    "Requerente: {PESSOA}.",
+    "Sou a Sra. {PESSOA}, mãe de aluno da rede pública.",
+    "Meu CPF é {CPF}.",
+    "Para identificação, informo o CPF {CPF_DIGITOS}.",
+    "CNPJ da empresa requerente: {CNPJ}.",
+    "Contato pelo e-mail {EMAIL}.",
+    "Telefone para contato: {TELEFONE}.",
+    "Celular {TELEFONE_DIGITOS}, também com WhatsApp.",
+    "Resido na {ENDERECO}.",
+    "Endereço: {ENDERECO_DF}.",
+    "CEP {CEP}, Brasília/DF.",
+    "Nascido em {DATA_NASCIMENTO}, conforme documento anexo.",
+    "RG {RG} SSP/DF.",
+    "Atenciosamente,\n{PESSOA_ASSINATURA}",
+]
+
+# Tipo do slot -> tipo anotado
+TIPO_ANOTADO = {
+    "CPF_DIGITOS": "CPF",
+    "TELEFONE_DIGITOS": "TELEFONE",
+    "ENDERECO_DF": "ENDERECO",
+    "PESSOA_ASSINATURA": "PESSOA",
+}
+
+TIPOS_AVALIADOS = {"PESSOA", "CPF", "CNPJ", "EMAIL", "TELEFONE", "ENDERECO", "CEP", "DATA_NASCIMENTO", "RG"}
+
+_SLOT = re.compile(r"\{(\w+)\}")
+
+
+def _digitos_verificadores(base: List[int], pesos_1: List[int], pesos_2: List[int]) -> List[int]:
+    def dv(nums, pesos):
+        resto = sum(n * p for n, p in zip(nums, pesos)) % 11
+        return 0 if resto < 2 else 11 - resto
+
+    d1 = dv(base, pesos_1)
+    return [d1, dv(base + [d1], pesos_2)]
+
+
+def gerar_cpf(rnd: random.Random, formatado: bool = True) -> str:
+    base = [rnd.randint(0, 9) for _ in range(9)]
+    if len(set(base)) == 1:
+        base[0] = (base[0] + 1) % 10
+    n = base + _digitos_verificadores(base, list(range(10, 1, -1)), list(range(11, 1, -1)))
+    s = "".join(map(str, n))
+    return f"{s[:3]}.{s[3:6]}.{s[6:9]}-{s[9:]}" if formatado else s
+
+
+def gerar_cnpj(rnd: random.Random) -> str:
+    base = [rnd.randint(0, 9) for _ in range(8)] + [0, 0, 0, 1]
+    n = base + _digitos_verificadores(base, [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2], [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+    s = "".join(map(str, n))
+    return f"{s[:2]}.{s[2:5]}.{s[5:8]}/{s[8:12]}-{s[12:]}"
+
+
+def gerar_nome(rnd: random.Random) -> str:
+    partes = [rnd.choice(PRENOMES)] + rnd.sample(SOBRENOMES, rnd.choice([1, 2]))
+    return " ".join(partes)
+
+
+def gerar_telefone(rnd: random.Random, formatado: bool = True) -> str:
+    ddd = rnd.choice(["61", "62", "11", "21"])
+    celular = rnd.random() < 0.7
+    numero = ("9" + "".join(str(rnd.randint(0, 9)) for _ in range(8))) if celular else \
+        (str(rnd.randint(2, 5)) + "".join(str(rnd.randint(0, 9)) for _ in range(7)))
+    if not formatado:
+        return ddd + numero
+    meio = len(numero) - 4
+    return rnd.choice([
+        f"({ddd}) {numero[:meio]}-{numero[meio:]}",
+        f"{ddd} {numero[:meio]}-{numero[meio:]}",
+        f"+55 {ddd} {numero[:meio]}-{numero[meio:]}",
+    ])
+
+
+def _valor(tipo: str, rnd: random.Random) -> str:
+    if tipo in ("PESSOA", "PESSOA_ASSINATURA"):
+        return gerar_nome(rnd)
+    if tipo == "CPF":
+        return gerar_cpf(rnd)
+    if tipo == "CPF_DIGITOS":
+        return gerar_cpf(rnd, formatado=False)
+    if tipo == "CNPJ":
+        return gerar_cnpj(rnd)
+    if tipo == "EMAIL":
+        nome = gerar_nome(rnd).lower().split()
+        usuario = f"{nome[0]}.{nome[-1]}".translate(str.maketrans("áâãéêíóôõúç", "aaaeeiooouc"))
+        return f"{usuario}{rnd.randint(1, 99)}@{rnd.choice(DOMINIOS)}"
+    if tipo == "TELEFONE":
+        return gerar_telefone(rnd)
+    if tipo == "TELEFONE_DIGITOS":
+        return gerar_telefone(rnd, formatado=False)
+    if tipo == "ENDERECO":
+        return f"{rnd.choice(LOGRADOUROS)} {rnd.choice(NOMES_VIA)}, nº {rnd.randint(1, 2000)}"
+    if tipo == "ENDERECO_DF":
+        return f"{rnd.choice(SIGLAS_DF)} {rnd.randint(1, 416)} Bloco {rnd.choice('ABCDEFGHIJK')} apartamento {rnd.randint(101, 606)}"
+    if tipo == "CEP":
+        return f"7{rnd.randint(0, 2999):04d}-{rnd.randint(0, 999):03d}"
+    if tipo == "DATA_NASCIMENTO":
+        return f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/{rnd.randint(1940, 2005)}"
+    if tipo == "RG":
+        return f"{rnd.randint(1, 99)}.{rnd.randint(0, 999):03d}.{rnd.randint(0, 999):03d}-{rnd.choice('0123456789X')}"
+    raise ValueError(f"Slot desconhecido: {tipo}")
+
+
+def _preencher_neutro(frase: str, rnd: random.Random) -> str:
+    return (frase.replace("{ORGAO}", rnd.choice(ORGAOS))
+            .replace("{ANO}", str(rnd.randint(2018, 2025)))
+            .replace("{NUM}", str(rnd.randint(1, 9999))))
+
+
+def gerar_documento(rnd: random.Random, frases: int, densidade: float) -> Dict:
+    """Um pedido com `frases` frases, das quais ~`densidade` trazem PII"""
+    partes: List[str] = []
+    entidades: List[Tuple[str, int, int]] = []
+    tamanho = 0
+
+    for i in range(frases):
+        if i:
+            partes.append(" ")
+            tamanho += 1
+        if rnd.random() < densidade:
+            modelo = rnd.choice(FRASES_PII)
+            fim_anterior = 0
+            for slot in _SLOT.finditer(modelo):
+                literal = modelo[fim_anterior:slot.start()]
+                valor = _valor(slot.group(1), rnd)
+                partes += [literal, valor]
+                inicio = tamanho + len(literal)
+                entidades.append((TIPO_ANOTADO.get(slot.group(1), slot.group(1)), inicio, inicio + len(valor)))
+                tamanho = inicio + len(valor)
+                fim_anterior = slot.end()
+            partes.append(modelo[fim_anterior:])
+            tamanho += len(modelo) - fim_anterior
+        else:
+            frase = _preencher_neutro(rnd.choice(FRASES_NEUTRAS), rnd)
+            partes.append(frase)
+            tamanho += len(frase)
+
+    return {"texto": "".join(partes), "entidades": entidades, "frases": frases, "densidade": densidade}
+
+
+def gerar_corpus(qtd: int, semente: int = 42, frases=(3, 20, 120), densidades=(0.1, 0.5)) -> List[Dict]:
+    """`qtd` documentos distribuídos igualmente entre as combinações de tamanho x densidade"""
+    rnd = random.Random(semente)
+    combinacoes = [(f, d) for f in frases for d in densidades]
+    return [gerar_documento(rnd, *combinacoes[i % len(combinacoes)]) for i in range(qtd)]
+
+
+if __name__ == "__main__":
+    qtd = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    semente = int(sys.argv[2]) if len(sys.argv) > 2 else 42
+    for doc in gerar_corpus(qtd, semente):
+        print(json.dumps(doc, ensure_ascii=False))
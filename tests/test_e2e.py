@@ -72,7 +72,18 @@ def test_fluxo_completo():
     
     # 3. Valida resultado
     print("🔍 [3/3] Validando resultados...")
-    resultado = status_final['result']
+    # Resultado completo fica em endpoint próprio (o status só traz o progresso)
+    resultado_response = requests.get(
+        f"{BASE_URL}/resultado/{origem_id}",
+        headers=AUTH_HEADER
+    )
+    resultado = resultado_response.json()
+
+    # Revalidação com ETag: resultado inalterado não é baixado de novo
+    revalidacao = requests.get(
+        f"{BASE_URL}/resultado/{origem_id}",
+        headers={**AUTH_HEADER, "If-None-Match": resultado_response.headers.get("ETag", "")}
+    )
     
     # Validações
     erros = []
@@ -91,6 +102,10 @@ def test_fluxo_completo():
     if not resultado.get('resumo_inteligente'):
         erros.append("Resumo LLM não gerado")
     
+    # Cache (ETag)
+    if revalidacao.status_code != 304:
+        erros.append(f"ETag não revalidou (status {revalidacao.status_code})")
+
     # Auditoria
     if not resultado['auditoria']['conformidade']['lgpd']:
         erros.append("Flag LGPD false")
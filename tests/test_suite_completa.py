@@ -225,7 +225,11 @@ def executar_teste(test: TestCase) -> Dict:
             status_data = status_response.json()
             
             if status_data['status'] == 'completed':
-                resultado = status_data['result']
+                resultado = requests.get(
+                    f"{BASE_URL}/resultado/{origem_id}",
+                    headers=AUTH_HEADER,
+                    timeout=5
+                ).json()
                 print(" ✅")
                 break
             elif status_data['status'] == 'error':
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Equivalência entre a detecção por chunks e a detecção do texto inteiro.
+
+Roda detect() sobre o corpus sintético de tests/corpus_lai.py duas vezes por documento:
+sem chunks e com chunks pequenos (para que os documentos do corpus sejam de fato divididos).
+As entidades, o nível de risco e o texto anonimizado devem ser os mesmos.
+
+A única diferença aceita vem de entidades mais longas que a sobreposição entre chunks
+(ex: o padrão guloso 'Endereço: ...'): nenhum chunk as vê inteiras. Elas são contadas à parte.
+
+Código de saída 1 se houver qualquer outra diferença.
+Execute: python tests/verificar_chunks.py [--tamanhos 1000,2000,4000]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+logging.disable(logging.INFO)
+warnings.filterwarnings("ignore")
+
+from corpus_lai import gerar_corpus  # noqa: E402
+
+
+def _spans(resultado):
+    return {e.to_tuple() for e in resultado["entities"]}
+
+
+def comparar(detector, corpus, tamanho: int):
+    """(documentos divididos, diferenças explicadas por entidades longas, diferenças inesperadas)"""
+    divididos, longas, inesperadas = 0, 0, []
+    for numero, doc in enumerate(corpus):
+        texto = doc["texto"]
+        if len(texto) <= tamanho:
+            continue
+        divididos += 1
+
+        detector.chunk_tamanho = len(texto) + 1
+        inteiro = detector.detect(texto)
+        detector.chunk_tamanho = tamanho
+        detector.chunk_sobreposicao = sobreposicao = min(300, tamanho // 4)
+        chunks = detector.detect(texto)
+
+        a, b = _spans(inteiro), _spans(chunks)
+        if a == b and inteiro["risk_level"] == chunks["risk_level"] \
+                and inteiro["anonymized_text"] == chunks["anonymized_text"]:
+            continue
+
+        # Diferença tolerada: toda entidade divergente é (ou encosta em) uma entidade maior que a sobreposição
+        compridas = [s for s in a | b if s[3] - s[2] > sobreposicao]
+        if a != b and all(
+            any(c[2] < s[3] and s[2] < c[3] for c in compridas) for s in a ^ b
+        ):
+            longas += 1
+        else:
+            inesperadas.append((numero, sorted(a - b), sorted(b - a), inteiro["risk_level"], chunks["risk_level"]))
+    return divididos, longas, inesperadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detecção por chunks x texto inteiro sobre o corpus sintético")
+    parser.add_argument("--documentos", type=int, default=120)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--tamanhos", default="1000,2000,4000", help="SIGILO_CHUNK_TAMANHO a testar")
+    args = parser.parse_args()
+
+    from src.detector import PIIDetectorLAI
+
+    corpus = gerar_corpus(args.documentos, args.semente)
+    # Modo regex ou Presidio, conforme o que estiver instalado
+    detector = PIIDetectorLAI()
+
+    falhou = False
+    for tamanho in [int(t) for t in args.tamanhos.split(",") if t.strip()]:
+        divididos, longas, inesperadas = comparar(detector, corpus, tamanho)
+        print(f"🧪 chunks de {tamanho}: {divididos} docs divididos, {len(inesperadas)} diferentes"
+              f" (+{longas} só por entidades maiores que a sobreposição)")
+        for numero, faltando, sobrando, risco_inteiro, risco_chunks in inesperadas[:5]:
+            print(f"   doc {numero}: risco {risco_inteiro} x {risco_chunks}")
+            for s in faltando:
+                print(f"      - só no texto inteiro: {s[0]} {s[2]}:{s[3]}")
+            for s in sobrando:
+                print(f"      + só nos chunks:       {s[0]} {s[2]}:{s[3]}")
+        falhou = falhou or bool(inesperadas)
+
+    if falhou:
+        print("\n❌ Detecção por chunks diverge do texto inteiro")
+        return 1
+    print("\n✅ Detecção por chunks equivalente ao texto inteiro")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())